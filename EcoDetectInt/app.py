@@ -4,12 +4,25 @@ Flujo completo: Carga imagen → Roboflow → Cálculo IA → Resultados
 """
 from flask import Flask, render_template, request, jsonify
 import os
+import sys
 from werkzeug.utils import secure_filename
 import requests
 from inference_sdk import InferenceHTTPClient
 import json
 from pathlib import Path
 
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional: sin él se usa JSON con FastAPI
+    msgpack = None
+
+# Caché local de resultados compartida con la CLI (roboflow-api-detection/cache_detecciones.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'roboflow-api-detection'))
+from cache_detecciones import CacheDetecciones, clave_deteccion
+from imagenes_workflow import nombre_salida, procesar_imagenes_salida, sin_imagenes
+from postprocesamiento import normalizar_clase, postprocesar, resolver_clase
+from preprocesamiento import escalar_resultado, preprocesar_imagen
+
 app = Flask(__name__)
 
 # Configuración
@@ -28,12 +41,47 @@ ROBOFLOW_WORKFLOW_ID = "detect-count-and-visualize-3"
 
 # Configuración FastAPI
 FASTAPI_URL = "http://localhost:8000/calcular-impacto"
+TIPO_MSGPACK = "application/msgpack"
 RECOMPENSAS_API_URL = "http://localhost:8001"
 
 # Filtros de detección
 CONFIDENCE_MIN = 0.85
 AREA_MIN = 5000
 
+# Supresión de no máximos después de los filtros: umbral de IoU (ej. 0.5) o None (desactivada, por defecto,
+# así el conteo y los puntos no cambian respecto de los análisis anteriores). Modo: "por_clase" o "agnostico"
+IOU_NMS = None
+MODO_NMS = "por_clase"
+
+# Mapeo de clases del modelo a categorías del conteo (coincidencia exacta o parcial)
+MAPEO_CLASES = {
+    'botella_plastico': 'botella_plastico',
+    'botella_plastica': 'botella_plastico',
+    'plastic': 'botella_plastico',
+    'plastico': 'botella_plastico',
+    'pet': 'botella_plastico',
+    'botella_vidrio': 'botella_vidrio',
+    'glass': 'botella_vidrio',
+    'vidrio': 'botella_vidrio',
+    'lata_aluminio': 'lata_aluminio',
+    'lata': 'lata_aluminio',
+    'can': 'lata_aluminio',
+    'aluminum': 'lata_aluminio',
+    'aluminio': 'lata_aluminio'
+}
+CATEGORIAS_CONTEO = ("botella_plastico", "botella_vidrio", "lata_aluminio")
+
+# Preprocesamiento antes de enviar a Roboflow (lado mayor en píxeles, 0 para la original; calidad JPEG)
+LADO_MAX_ENVIO = 1280
+CALIDAD_JPEG_ENVIO = 85
+
+# Imagen anotada en base64 que devuelve el workflow: la interfaz no la usa, así que no se guarda en memoria
+# ("descartar", "externalizar" o "conservar")
+MODO_OUTPUT_IMAGE = "descartar"
+
+# Caché local de resultados del workflow (carpeta en ECODETECT_CACHE_DIR)
+cache_detecciones = CacheDetecciones()
+
 def allowed_file(filename):
     """Verifica si el archivo es una imagen válida"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -47,24 +95,46 @@ def conectar_roboflow():
     return client
 
 def detectar_objetos(imagen_path):
-    """Detecta objetos usando Roboflow Workflow"""
+    """Detecta objetos usando Roboflow Workflow (consulta primero la caché local)"""
     try:
+        # Misma clave que la CLI (deteccion_workflow.clave_cache): la entrada no guarda la output_image,
+        # así que no depende de MODO_OUTPUT_IMAGE y ambas comparten la caché
+        clave = clave_deteccion(
+            imagen_path, ROBOFLOW_WORKFLOW_ID, confidence_min=CONFIDENCE_MIN, area_min=AREA_MIN,
+            lado_max=LADO_MAX_ENVIO, calidad_jpeg=CALIDAD_JPEG_ENVIO
+        )
+        result = cache_detecciones.obtener(clave) if MODO_OUTPUT_IMAGE != "conservar" else None
+        if result is not None:
+            print(f"♻️  Resultado de Roboflow tomado de la caché local")
+            return procesar_imagenes_salida(
+                result, MODO_OUTPUT_IMAGE, nombre_salida(imagen_path), app.config['UPLOAD_FOLDER']
+            )
+        
         client = conectar_roboflow()
         
+        # Imagen reducida y recodificada: la subida pesa menos
+        preprocesada = preprocesar_imagen(imagen_path, LADO_MAX_ENVIO, CALIDAD_JPEG_ENVIO)
         result = client.run_workflow(
             workspace_name=ROBOFLOW_WORKSPACE,
             workflow_id=ROBOFLOW_WORKFLOW_ID,
-            images={"image": imagen_path},
+            images={"image": preprocesada.base64},
             use_cache=False
         )
         
-        return result
+        # Coordenadas de vuelta a la imagen original (AREA_MIN se mide sobre ella);
+        # en la caché se guarda sin la output_image, que se descarta apenas se recibe
+        result = escalar_resultado(result, preprocesada)
+        if result:
+            cache_detecciones.guardar(clave, sin_imagenes(result))
+        return procesar_imagenes_salida(
+            result, MODO_OUTPUT_IMAGE, nombre_salida(imagen_path), app.config['UPLOAD_FOLDER']
+        )
     except Exception as e:
         print(f"Error en detección Roboflow: {e}")
         return None
 
-def extraer_y_filtrar_predicciones(resultado_workflow):
-    """Extrae y filtra predicciones de Roboflow"""
+def obtener_predicciones(resultado_workflow):
+    """Obtiene las predicciones (sin filtrar) del resultado de Roboflow"""
     predicciones = []
     
     if not resultado_workflow:
@@ -90,59 +160,33 @@ def extraer_y_filtrar_predicciones(resultado_workflow):
     except Exception as e:
         print(f"Error extrayendo predicciones: {e}")
     
-    # Filtrar por confianza y área
-    predicciones_filtradas = []
-    for pred in predicciones:
-        confidence = pred.get('confidence', 0)
-        if confidence < CONFIDENCE_MIN:
-            continue
-        
-        width = pred.get('width', 0)
-        height = pred.get('height', 0)
-        area = width * height
-        
-        if area < AREA_MIN:
-            continue
-        
-        predicciones_filtradas.append(pred)
+    return predicciones
+
+def analizar_predicciones(resultado_workflow):
+    """
+    Extrae, filtra por confianza y área, descarta duplicadas (NMS), clasifica y cuenta
+    las predicciones en una sola pasada
     
-    return predicciones_filtradas
+    Returns:
+        ResultadoPostproceso: predicciones filtradas, conteo por tipo y estadísticas de descarte
+    """
+    return postprocesar(
+        obtener_predicciones(resultado_workflow), MAPEO_CLASES, CONFIDENCE_MIN, AREA_MIN, CATEGORIAS_CONTEO,
+        iou_nms=IOU_NMS, modo_nms=MODO_NMS
+    )
+
+def extraer_y_filtrar_predicciones(resultado_workflow):
+    """Extrae y filtra predicciones de Roboflow"""
+    return analizar_predicciones(resultado_workflow).predicciones
 
 def contar_por_tipo(predicciones):
     """Cuenta objetos por tipo"""
-    conteo = {
-        "botella_plastico": 0,
-        "botella_vidrio": 0,
-        "lata_aluminio": 0
-    }
-    
-    mapeo_clases = {
-        'botella_plastico': 'botella_plastico',
-        'botella_plastica': 'botella_plastico',
-        'plastic': 'botella_plastico',
-        'plastico': 'botella_plastico',
-        'pet': 'botella_plastico',
-        'botella_vidrio': 'botella_vidrio',
-        'glass': 'botella_vidrio',
-        'vidrio': 'botella_vidrio',
-        'lata_aluminio': 'lata_aluminio',
-        'lata': 'lata_aluminio',
-        'can': 'lata_aluminio',
-        'aluminum': 'lata_aluminio',
-        'aluminio': 'lata_aluminio'
-    }
-    
-    for pred in predicciones:
-        clase = pred.get('class', '').lower().replace(' ', '_')
-        
-        if clase in mapeo_clases:
-            conteo[mapeo_clases[clase]] += 1
-        else:
-            for clave, categoria in mapeo_clases.items():
-                if clave in clase or clase in clave:
-                    conteo[categoria] += 1
-                    break
-    
+    mapeo = tuple(MAPEO_CLASES.items())
+    conteo = dict.fromkeys(CATEGORIAS_CONTEO, 0)
+    for pred in predicciones or []:
+        categoria = resolver_clase(normalizar_clase(pred.get('class', '')), mapeo)
+        if categoria in conteo:
+            conteo[categoria] += 1
     return conteo
 
 def calcular_impacto_ambiental(conteo):
@@ -160,15 +204,25 @@ def calcular_impacto_ambiental(conteo):
         if not detecciones:
             return None
         
-        # Hacer petición a FastAPI
-        response = requests.post(
-            FASTAPI_URL,
-            json={"detecciones": detecciones},
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
+        # Hacer petición a FastAPI (en MessagePack si está disponible: más compacto y rápido de leer)
+        if msgpack is not None:
+            response = requests.post(
+                FASTAPI_URL,
+                data=msgpack.packb({"detecciones": detecciones}, use_bin_type=True),
+                headers={"Content-Type": TIPO_MSGPACK, "Accept": f"{TIPO_MSGPACK}, application/json;q=0.5"},
+                timeout=10
+            )
+        else:
+            response = requests.post(
+                FASTAPI_URL,
+                json={"detecciones": detecciones},
+                headers={"Content-Type": "application/json"},
+                timeout=10
+            )
         
         if response.status_code == 200:
+            if response.headers.get("Content-Type", "").startswith(TIPO_MSGPACK):
+                return msgpack.unpackb(response.content, raw=False)
             return response.json()
         else:
             print(f"Error en FastAPI: {response.status_code}")
@@ -212,8 +266,9 @@ def analizar_imagen():
         if not resultado_roboflow:
             return jsonify({'error': 'Error en la detección de objetos'}), 500
         
-        # PASO 2: Extraer y filtrar predicciones
-        predicciones = extraer_y_filtrar_predicciones(resultado_roboflow)
+        # PASO 2: Extraer, filtrar y contar predicciones (una sola pasada)
+        analisis = analizar_predicciones(resultado_roboflow)
+        predicciones = analisis.predicciones
         
         if not predicciones:
             return jsonify({
@@ -223,8 +278,8 @@ def analizar_imagen():
                 'mensaje': 'No se detectaron objetos reciclables'
             }), 200
         
-        # PASO 3: Contar por tipo
-        conteo = contar_por_tipo(predicciones)
+        # PASO 3: Conteo por tipo
+        conteo = analisis.conteo
         
         # PASO 4: Calcular impacto ambiental con FastAPI
         print(f"📊 Calculando impacto ambiental...")
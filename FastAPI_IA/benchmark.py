@@ -0,0 +1,282 @@
+"""
+benchmark.py
+Benchmarks reproducibles del calculador y de los endpoints del microservicio.
+Genera un JSON con ops/s, percentiles de latencia (p50/p95/p99) y memoria máxima (RSS)
+que se puede comparar entre commits para detectar regresiones.
+
+Uso:
+    python benchmark.py --salida base.json
+    python benchmark.py --salida nuevo.json --comparar base.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Medir el cálculo y no la caché de respuestas (se puede sobrescribir con la variable de entorno)
+os.environ.setdefault("TAMANO_CACHE_RESPUESTAS", "0")
+
+from calculos import MATERIALES, cargar_calculador
+
+DIRECTORIO = Path(__file__).resolve().parent
+
+# Semilla fija para que los datos de entrada sean los mismos en cada ejecución
+SEMILLA = 1234
+
+# Tamaños de lista y niveles de concurrencia para /calcular-impacto
+TAMANOS_LISTA = (1, 10, 100)
+CONCURRENCIAS = (1, 16, 64)
+
+
+def _percentil(ordenados: list, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def resumir(latencias: list, duracion_total: float, operaciones: int) -> dict:
+    """
+    Resume una serie de latencias (en segundos).
+
+    Args:
+        latencias: Latencia de cada llamada
+        duracion_total: Tiempo total de la medición
+        operaciones: Operaciones realizadas (filas o peticiones)
+    """
+    ordenados = sorted(latencias)
+    return {
+        "iteraciones": len(latencias),
+        "ops_s": round(operaciones / duracion_total, 2),
+        "p50_us": round(_percentil(ordenados, 50) * 1e6, 2),
+        "p95_us": round(_percentil(ordenados, 95) * 1e6, 2),
+        "p99_us": round(_percentil(ordenados, 99) * 1e6, 2)
+    }
+
+
+def medir(funcion, iteraciones: int, operaciones_por_llamada: int = 1, calentamiento: int = 10) -> dict:
+    """Ejecuta una función varias veces midiendo la latencia de cada llamada"""
+    for _ in range(calentamiento):
+        funcion()
+
+    latencias = []
+    inicio_total = time.perf_counter()
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append(time.perf_counter() - inicio)
+    duracion = time.perf_counter() - inicio_total
+
+    return resumir(latencias, duracion, iteraciones * operaciones_por_llamada)
+
+
+def generar_detecciones(rng: random.Random, cantidad: int) -> list:
+    """Genera una lista de detecciones aleatorias (reproducible con la semilla)"""
+    return [
+        {"material": rng.choice(MATERIALES), "cantidad": rng.randint(1, 50)}
+        for _ in range(cantidad)
+    ]
+
+
+def benchmark_calculador(factor: float) -> dict:
+    """Mide los métodos de CalculadorAmbiental: individual, múltiple y por lote"""
+    rng = random.Random(SEMILLA)
+    resultados = {}
+
+    # Sin caché LRU para medir el cálculo en sí
+    calculador = cargar_calculador(tamano_cache=0)
+    detecciones = generar_detecciones(rng, 10)
+    resultados["calculador.procesar_deteccion"] = medir(
+        lambda: calculador.procesar_deteccion("botella_plastico", 3), int(20000 * factor)
+    )
+    resultados["calculador.procesar_multiples_detecciones[10]"] = medir(
+        lambda: calculador.procesar_multiples_detecciones(detecciones), int(5000 * factor),
+        operaciones_por_llamada=10
+    )
+
+    calculador_cache = cargar_calculador()
+    resultados["calculador.procesar_deteccion(cache)"] = medir(
+        lambda: calculador_cache.procesar_deteccion("botella_plastico", 3), int(20000 * factor)
+    )
+
+    filas = 1_000_000
+    generador = np.random.default_rng(SEMILLA)
+    materiales = generador.integers(0, len(MATERIALES), filas)
+    cantidades = generador.integers(1, 50, filas)
+    grupos = np.sort(generador.integers(0, filas // 5, filas))
+    resultados["calculador.procesar_lote[1M]"] = medir(
+        lambda: calculador.procesar_lote(materiales, cantidades, grupos), max(3, int(10 * factor)),
+        operaciones_por_llamada=filas, calentamiento=1
+    )
+
+    return resultados
+
+
+async def _benchmark_endpoint(cliente, tamano: int, concurrencia: int, total: int) -> dict:
+    """Envía `total` peticiones a /calcular-impacto con `concurrencia` clientes simultáneos"""
+    rng = random.Random(SEMILLA + tamano)
+    cuerpos = [{"detecciones": generar_detecciones(rng, tamano)} for _ in range(total)]
+    latencias = []
+    siguiente = iter(cuerpos)
+
+    async def trabajador():
+        for cuerpo in siguiente:
+            inicio = time.perf_counter()
+            respuesta = await cliente.post("/calcular-impacto", json=cuerpo)
+            latencias.append(time.perf_counter() - inicio)
+            if respuesta.status_code != 200:
+                raise RuntimeError(f"Respuesta inesperada {respuesta.status_code}: {respuesta.text}")
+
+    inicio_total = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return resumir(latencias, time.perf_counter() - inicio_total, total)
+
+
+async def benchmark_endpoints(factor: float) -> dict:
+    """Mide /calcular-impacto con un cliente ASGI en proceso (sin red)"""
+    import httpx
+    import main
+
+    resultados = {}
+    async with main.lifespan(main.app):
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+            # Calentamiento
+            await _benchmark_endpoint(cliente, 1, 1, 50)
+
+            for tamano in TAMANOS_LISTA:
+                for concurrencia in CONCURRENCIAS:
+                    total = max(concurrencia * 4, int(2000 * factor))
+                    nombre = f"endpoint./calcular-impacto[lista={tamano},concurrencia={concurrencia}]"
+                    resultados[nombre] = await _benchmark_endpoint(cliente, tamano, concurrencia, total)
+
+    return resultados
+
+
+def benchmark_arranque(repeticiones: int) -> dict:
+    """Mide el arranque de main.py (importación + lifespan) en procesos nuevos"""
+    codigo = (
+        "import asyncio, main\n"
+        "async def arrancar():\n"
+        "    async with main.lifespan(main.app):\n"
+        "        pass\n"
+        "asyncio.run(arrancar())\n"
+    )
+    duraciones = []
+    rss_max_kb = 0
+
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(
+            [sys.executable, "-c", codigo], cwd=DIRECTORIO,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        # wait4 entrega también el uso de recursos del proceso hijo (RSS máximo)
+        _, estado, uso = os.wait4(proceso.pid, 0)
+        duraciones.append(time.perf_counter() - inicio)
+        proceso.returncode = os.waitstatus_to_exitcode(estado)
+        if proceso.returncode != 0:
+            raise RuntimeError("El arranque de main.py falló")
+        rss_max_kb = max(rss_max_kb, uso.ru_maxrss)
+
+    resultado = resumir(duraciones, sum(duraciones), repeticiones)
+    resultado["rss_max_mb"] = round(rss_max_kb / 1024, 2)
+    return resultado
+
+
+def version_commit() -> str:
+    """Commit actual de git (si está disponible)"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=DIRECTORIO, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def comparar(base: dict, nuevo: dict, tolerancia: float) -> list:
+    """
+    Compara dos resultados y retorna las regresiones encontradas.
+    Es regresión si ops/s baja o p99 sube más que la tolerancia.
+    """
+    regresiones = []
+    for nombre, medicion in nuevo["benchmarks"].items():
+        anterior = base["benchmarks"].get(nombre)
+        if anterior is None:
+            continue
+
+        if medicion["ops_s"] < anterior["ops_s"] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: ops/s {anterior['ops_s']} -> {medicion['ops_s']}")
+        if medicion["p99_us"] > anterior["p99_us"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p99 {anterior['p99_us']} us -> {medicion['p99_us']} us")
+
+    return regresiones
+
+
+def logging_silencioso():
+    """Evita que los logs por petición de main.py distorsionen las mediciones"""
+    import logging
+    logging.disable(logging.INFO)
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmarks del microservicio de cálculo ambiental")
+    parser.add_argument("--salida", default="benchmark_resultados.json", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="Resultados base (JSON) contra los que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.10,
+                        help="Variación permitida antes de marcar una regresión (por defecto 0.10 = 10%%)")
+    parser.add_argument("--rapido", action="store_true", help="Menos iteraciones (para pruebas rápidas)")
+    args = parser.parse_args()
+
+    factor = 0.1 if args.rapido else 1.0
+    logging_silencioso()
+
+    print("⏱️  Calculador...")
+    benchmarks = benchmark_calculador(factor)
+    print("⏱️  Endpoints...")
+    benchmarks.update(asyncio.run(benchmark_endpoints(factor)))
+    print("⏱️  Arranque de main.py...")
+    benchmarks["arranque.main"] = benchmark_arranque(3 if args.rapido else 10)
+
+    resultados = {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": version_commit(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "rss_max_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        "benchmarks": benchmarks
+    }
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'Benchmark':<70} {'ops/s':>14} {'p50 us':>10} {'p99 us':>10}")
+    for nombre, medicion in benchmarks.items():
+        print(f"{nombre:<70} {medicion['ops_s']:>14} {medicion['p50_us']:>10} {medicion['p99_us']:>10}")
+    print(f"\n💾 Resultados guardados en: {args.salida} (RSS máximo {resultados['rss_max_mb']} MB)")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(base, resultados, args.tolerancia)
+        if regresiones:
+            print(f"\n❌ Regresiones respecto a {base.get('commit', args.comparar)}:")
+            for regresion in regresiones:
+                print(f"   • {regresion}")
+            sys.exit(1)
+        print(f"\n✅ Sin regresiones respecto a {base.get('commit', args.comparar)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+cache.py
+Caché LRU acotada en memoria (con expiración opcional) y contadores de aciertos, fallos y desalojos
+"""
+
+import time
+from collections import OrderedDict
+
+# Valor centinela para distinguir "no está en caché" de un valor None guardado
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """Caché LRU (menos usado recientemente) con capacidad máxima y TTL opcional"""
+
+    def __init__(self, capacidad: int = 1024, ttl_segundos: float = None):
+        """
+        Args:
+            capacidad: Máximo de entradas guardadas (0 desactiva la caché)
+            ttl_segundos: Tiempo de vida de cada entrada (None = sin expiración)
+        """
+        if capacidad < 0:
+            raise ValueError("La capacidad de la caché no puede ser negativa")
+
+        self.capacidad = capacidad
+        self.ttl_segundos = ttl_segundos
+        # clave -> (valor, instante de expiración o None)
+        self._entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.expirados = 0
+
+    def obtener(self, clave, defecto=None):
+        """
+        Busca una clave y la marca como usada recientemente.
+
+        Returns:
+            El valor guardado o `defecto` si no existe
+        """
+        entrada = self._entradas.get(clave, _AUSENTE)
+        if entrada is _AUSENTE:
+            self.fallos += 1
+            return defecto
+
+        valor, expira = entrada
+        if expira is not None and time.monotonic() >= expira:
+            del self._entradas[clave]
+            self.expirados += 1
+            self.fallos += 1
+            return defecto
+
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        """Guarda un valor, desalojando la entrada menos usada si se supera la capacidad"""
+        if self.capacidad == 0:
+            return
+
+        expira = time.monotonic() + self.ttl_segundos if self.ttl_segundos is not None else None
+        self._entradas[clave] = (valor, expira)
+        self._entradas.move_to_end(clave)
+
+        if len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+            self.desalojos += 1
+
+    def limpiar(self):
+        """Elimina todas las entradas (los contadores se conservan)"""
+        self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def estadisticas(self) -> dict:
+        """Retorna el estado y los contadores de la caché"""
+        consultas = self.aciertos + self.fallos
+        return {
+            "capacidad": self.capacidad,
+            "ttl_segundos": self.ttl_segundos,
+            "entradas": len(self._entradas),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "expirados": self.expirados,
+            "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0
+        }
@@ -3,8 +3,21 @@ calculos.py
 Contiene toda la lógica de cálculo ambiental y la regresión lineal
 """
 
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
 import numpy as np
-from sklearn.linear_model import LinearRegression
+
+from cache import CacheLRU
+
+# Tamaño por defecto de la caché LRU de procesar_deteccion
+TAMANO_CACHE = 1024
+
+# Artefacto con los coeficientes entrenados (scikit-learn solo se usa al reentrenar)
+RUTA_ARTEFACTO = Path(__file__).with_name("modelos_entrenados.json")
+VERSION_ARTEFACTO = 1
 
 # Pesos promedio en gramos por unidad
 PESOS_PROMEDIO = {
@@ -35,20 +48,120 @@ PUNTOS_BASE = {
     "lata_aluminio": 11
 }
 
+# Orden fijo de materiales: define la fila de cada material en la tabla de coeficientes
+MATERIALES = tuple(PESOS_PROMEDIO.keys())
+
+# Cantidad máxima por detección: mantiene los cálculos dentro de int64 (NumPy) y de los
+# enteros de 64 bits de JSON/MessagePack, también al sumar los totales
+CANTIDAD_MAXIMA = 1_000_000
+
+# Columnas de la tabla compilada de coeficientes (una fila por material)
+COLUMNAS_TABLA = ("coeficiente", "intercepto", "factor_co2", "factor_energia", "puntos_base")
+
+
+def _redondear(valor: float, decimales: int) -> float:
+    """
+    Redondea igual que numpy (escala, rint y desescala).
+    Mantiene los mismos resultados que cuando los valores eran np.float64.
+    """
+    escala = 10.0 ** decimales
+    return round(valor * escala) / escala
+
+
+def codificar_materiales(materiales) -> np.ndarray:
+    """
+    Convierte nombres de materiales en sus IDs numéricos (posición en MATERIALES).
+    
+    Args:
+        materiales: Secuencia o arreglo de nombres de materiales
+    
+    Returns:
+        Arreglo int64 con el ID de cada material
+    """
+    nombres = np.asarray(materiales)
+    unicos, inverso = np.unique(nombres, return_inverse=True)
+    
+    desconocidos = [str(m) for m in unicos if m not in MATERIALES]
+    if desconocidos:
+        raise ValueError(f"Material desconocido: {', '.join(desconocidos)}")
+    
+    ids_unicos = np.array([MATERIALES.index(m) for m in unicos], dtype=np.int64)
+    return ids_unicos[inverso.reshape(-1)]
+
+
+def _checksum_artefacto(artefacto: dict) -> str:
+    """Calcula el SHA-256 del contenido relevante de un artefacto (JSON canónico)"""
+    contenido = {
+        "version": artefacto["version"],
+        "pesos_promedio": artefacto["pesos_promedio"],
+        "coeficientes": artefacto["coeficientes"]
+    }
+    canonico = json.dumps(contenido, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def version_factores() -> str:
+    """
+    Calcula una marca de versión de las tablas de factores
+    (PESOS_PROMEDIO, FACTOR_CO2, FACTOR_ENERGIA, PUNTOS_BASE).
+    Cambia cada vez que se modifica algún factor.
+    """
+    tablas = [PESOS_PROMEDIO, FACTOR_CO2, FACTOR_ENERGIA, PUNTOS_BASE]
+    canonico = json.dumps(tablas, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()[:16]
+
+
+def cargar_calculador(ruta=RUTA_ARTEFACTO, reentrenar: bool = False,
+                      tamano_cache: int = TAMANO_CACHE) -> "CalculadorAmbiental":
+    """
+    Obtiene un calculador listo para usar.
+    
+    Args:
+        ruta: Ruta del artefacto de coeficientes
+        reentrenar: Si es True, entrena con scikit-learn y sobrescribe el artefacto
+        tamano_cache: Máximo de resultados guardados en la caché de procesar_deteccion
+    
+    Returns:
+        Instancia de CalculadorAmbiental
+    """
+    if reentrenar:
+        calculador = CalculadorAmbiental(tamano_cache=tamano_cache)
+        calculador.guardar_artefacto(ruta)
+        return calculador
+    
+    return CalculadorAmbiental.desde_artefacto(ruta, tamano_cache=tamano_cache)
+
 
 class CalculadorAmbiental:
     """Clase para calcular métricas ambientales usando regresión lineal"""
     
-    def __init__(self):
+    def __init__(self, coeficientes: dict = None, tamano_cache: int = TAMANO_CACHE):
+        """
+        Args:
+            coeficientes: Diccionario {material: (coeficiente, intercepto)} ya entrenado.
+                          Si no se indica, se entrenan los modelos con scikit-learn.
+            tamano_cache: Máximo de resultados guardados en la caché de procesar_deteccion
+                          (0 la desactiva)
+        """
         # Inicializar modelos de regresión lineal para cada tipo de material
         self.modelos_peso = {}
-        self._entrenar_modelos()
+        self.checksum = None
+        self.cache = CacheLRU(tamano_cache)
+        if coeficientes is None:
+            coeficientes = self._entrenar_modelos()
+        self._compilar_coeficientes(coeficientes)
     
-    def _entrenar_modelos(self):
+    def _entrenar_modelos(self) -> dict:
         """
         Entrena modelos de regresión lineal determinística.
         La regresión lineal permite ajustar el peso según la cantidad de elementos.
+        
+        Returns:
+            Diccionario {material: (coeficiente, intercepto)} de los modelos entrenados
         """
+        # Importación diferida: solo se necesita scikit-learn al entrenar
+        from sklearn.linear_model import LinearRegression
+        
         for material, peso_unitario in PESOS_PROMEDIO.items():
             # Crear datos de entrenamiento: cantidad de elementos vs peso total
             # Simulamos datos lineales: 1 elemento = peso_unitario, 2 elementos = 2*peso_unitario, etc.
@@ -60,6 +173,174 @@ class CalculadorAmbiental:
             modelo.fit(X_train, y_train)
             
             self.modelos_peso[material] = modelo
+        
+        return {
+            material: (float(modelo.coef_[0]), float(modelo.intercept_))
+            for material, modelo in self.modelos_peso.items()
+        }
+    
+    def _compilar_coeficientes(self, coeficientes: dict):
+        """
+        Compila los coeficientes de los modelos en una tabla densa.
+        Cada fila contiene coeficiente, intercepto y factores del material,
+        así el cálculo se hace con aritmética simple sin llamar a predict().
+        """
+        faltantes = [material for material in MATERIALES if material not in coeficientes]
+        if faltantes:
+            raise ValueError(f"Faltan coeficientes para: {', '.join(faltantes)}")
+        
+        self.coeficientes = {material: tuple(coeficientes[material]) for material in MATERIALES}
+        self.version_factores = version_factores()
+        self.materiales = list(MATERIALES)
+        self.indice_material = {material: i for i, material in enumerate(self.materiales)}
+        self._usar_tabla(np.array([
+            [
+                self.coeficientes[material][0],
+                self.coeficientes[material][1],
+                FACTOR_CO2[material],
+                FACTOR_ENERGIA[material],
+                PUNTOS_BASE[material]
+            ]
+            for material in self.materiales
+        ], dtype=np.float64))
+    
+    def _usar_tabla(self, tabla: np.ndarray):
+        """
+        Fija la tabla de coeficientes de la que leen todos los cálculos.
+        El camino por lote la indexa directamente y el escalar usa una copia
+        de sus filas en floats de Python (evita indexar numpy por ítem); las dos
+        se reemplazan juntas, así nunca leen factores distintos.
+        """
+        self.tabla_coeficientes = tabla
+        self._filas = {
+            material: tuple(float(v) for v in tabla[i])
+            for material, i in self.indice_material.items()
+        }
+    
+    def _fila(self, material: str) -> tuple:
+        """Fila de la tabla de un material (columnas de COLUMNAS_TABLA)"""
+        fila = self._filas.get(material)
+        if fila is None:
+            raise ValueError(f"Material desconocido: {material}")
+        return fila
+    
+    def coeficientes_material(self, material: str) -> dict:
+        """
+        Coeficientes y factores con los que se calcula un material.
+        
+        Returns:
+            Diccionario con las columnas de COLUMNAS_TABLA
+        
+        Raises:
+            ValueError: Si el material no existe
+        """
+        valores = dict(zip(COLUMNAS_TABLA, self._fila(material)))
+        valores["puntos_base"] = int(valores["puntos_base"])
+        return valores
+    
+    def recargar_factores(self):
+        """
+        Vuelve a compilar la tabla con los factores actuales e invalida la caché.
+        Debe llamarse después de modificar FACTOR_CO2, FACTOR_ENERGIA o PUNTOS_BASE;
+        hasta entonces todos los cálculos siguen usando la tabla anterior.
+        Un calculador creado con desde_tabla pasa a usar su propia copia (la tabla
+        compartida no cambia: para los demás workers hay que reiniciar servidor.py).
+        """
+        self._compilar_coeficientes(self.coeficientes)
+        self.cache.limpiar()
+    
+    @classmethod
+    def desde_artefacto(cls, ruta=RUTA_ARTEFACTO, tamano_cache: int = TAMANO_CACHE) -> "CalculadorAmbiental":
+        """
+        Crea un calculador con los coeficientes guardados en un artefacto,
+        sin importar scikit-learn ni reentrenar.
+        
+        Args:
+            ruta: Ruta del archivo de artefacto
+            tamano_cache: Máximo de resultados guardados en la caché de procesar_deteccion
+        
+        Returns:
+            Instancia de CalculadorAmbiental
+        
+        Raises:
+            FileNotFoundError: Si el artefacto no existe
+            ValueError: Si la versión, el checksum o los pesos del artefacto no coinciden
+        """
+        with open(ruta, encoding="utf-8") as f:
+            artefacto = json.load(f)
+        
+        if artefacto.get("version") != VERSION_ARTEFACTO:
+            raise ValueError(
+                f"Versión de artefacto no soportada: {artefacto.get('version')} "
+                f"(se esperaba {VERSION_ARTEFACTO})"
+            )
+        
+        if artefacto.get("checksum") != _checksum_artefacto(artefacto):
+            raise ValueError(f"Checksum inválido en el artefacto: {ruta}")
+        
+        if artefacto["pesos_promedio"] != PESOS_PROMEDIO:
+            raise ValueError("El artefacto fue entrenado con otros PESOS_PROMEDIO, es necesario reentrenar")
+        
+        calculador = cls(coeficientes={
+            material: (valores["coeficiente"], valores["intercepto"])
+            for material, valores in artefacto["coeficientes"].items()
+        }, tamano_cache=tamano_cache)
+        calculador.checksum = artefacto["checksum"]
+        return calculador
+    
+    @classmethod
+    def desde_tabla(cls, tabla: np.ndarray, checksum: str = None,
+                    tamano_cache: int = TAMANO_CACHE) -> "CalculadorAmbiental":
+        """
+        Crea un calculador que usa una tabla de coeficientes ya compilada
+        (por ejemplo, la tabla de solo lectura en memoria compartida de servidor.py).
+        
+        Args:
+            tabla: Tabla con una fila por material y las columnas de COLUMNAS_TABLA
+            checksum: Checksum del artefacto del que proviene la tabla
+            tamano_cache: Máximo de resultados guardados en la caché de procesar_deteccion
+        
+        Returns:
+            Instancia de CalculadorAmbiental
+        
+        Raises:
+            ValueError: Si los factores de la tabla no coinciden con los de este módulo
+        """
+        calculador = cls(coeficientes={
+            material: (float(tabla[i, 0]), float(tabla[i, 1]))
+            for i, material in enumerate(MATERIALES)
+        }, tamano_cache=tamano_cache)
+        
+        if not np.array_equal(calculador.tabla_coeficientes, tabla):
+            raise ValueError("Los factores de la tabla compartida no coinciden con los de calculos.py")
+        
+        # Usar la tabla recibida en lugar de la copia recién compilada (en todos los cálculos)
+        calculador._usar_tabla(tabla)
+        calculador.checksum = checksum
+        return calculador
+    
+    def guardar_artefacto(self, ruta=RUTA_ARTEFACTO):
+        """
+        Guarda los coeficientes entrenados en un artefacto versionado con checksum.
+        
+        Args:
+            ruta: Ruta del archivo de artefacto
+        """
+        artefacto = {
+            "version": VERSION_ARTEFACTO,
+            "fecha_entrenamiento": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "pesos_promedio": PESOS_PROMEDIO,
+            "coeficientes": {
+                material: {"coeficiente": coeficiente, "intercepto": intercepto}
+                for material, (coeficiente, intercepto) in self.coeficientes.items()
+            }
+        }
+        artefacto["checksum"] = _checksum_artefacto(artefacto)
+        
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(artefacto, f, indent=2, ensure_ascii=False)
+        
+        self.checksum = artefacto["checksum"]
     
     def calcular_peso_estimado(self, material: str, cantidad: int) -> float:
         """
@@ -72,14 +353,11 @@ class CalculadorAmbiental:
         Returns:
             Peso estimado en gramos
         """
-        if material not in self.modelos_peso:
-            raise ValueError(f"Material desconocido: {material}")
-        
-        # Predecir peso usando el modelo entrenado
-        X_pred = np.array([[cantidad]])
-        peso_estimado = self.modelos_peso[material].predict(X_pred)[0]
+        # Evaluar la regresión con los coeficientes compilados
+        coeficiente, intercepto = self._fila(material)[:2]
+        peso_estimado = cantidad * coeficiente + intercepto
         
-        return round(peso_estimado, 2)
+        return _redondear(peso_estimado, 2)
     
     def calcular_co2_evitado(self, material: str, peso_gramos: float) -> float:
         """
@@ -93,8 +371,8 @@ class CalculadorAmbiental:
             CO2 evitado en kilogramos
         """
         peso_kg = peso_gramos / 1000
-        co2_evitado = peso_kg * FACTOR_CO2[material]
-        return round(co2_evitado, 3)
+        co2_evitado = peso_kg * self._fila(material)[2]
+        return _redondear(co2_evitado, 3)
     
     def calcular_energia_ahorrada(self, material: str, peso_gramos: float) -> float:
         """
@@ -108,8 +386,8 @@ class CalculadorAmbiental:
             Energía ahorrada en kWh
         """
         peso_kg = peso_gramos / 1000
-        energia_ahorrada = peso_kg * FACTOR_ENERGIA[material]
-        return round(energia_ahorrada, 3)
+        energia_ahorrada = peso_kg * self._fila(material)[3]
+        return _redondear(energia_ahorrada, 3)
     
     def calcular_puntos_ecologicos(self, material: str, cantidad: int, peso_gramos: float) -> int:
         """
@@ -125,7 +403,7 @@ class CalculadorAmbiental:
             Puntos ecológicos ganados
         """
         # Puntos base por cantidad
-        puntos_base = PUNTOS_BASE[material] * cantidad
+        puntos_base = int(self._fila(material)[4]) * cantidad
         
         # Bonus por peso (más peso = más puntos)
         bonus_peso = int(peso_gramos / 100)  # 1 punto extra por cada 100g
@@ -136,6 +414,7 @@ class CalculadorAmbiental:
     def procesar_deteccion(self, material: str, cantidad: int) -> dict:
         """
         Procesa una detección completa y retorna todas las métricas.
+        Los resultados se guardan en una caché LRU por (material, cantidad, versión de factores).
         
         Args:
             material: Tipo de material detectado
@@ -144,15 +423,23 @@ class CalculadorAmbiental:
         Returns:
             Diccionario con todas las métricas calculadas
         """
-        # Calcular peso usando regresión lineal
-        peso_estimado = self.calcular_peso_estimado(material, cantidad)
+        clave = (material, cantidad, self.version_factores)
+        resultado = self.cache.obtener(clave)
+        if resultado is not None:
+            return dict(resultado)
+        
+        coeficiente, intercepto, factor_co2, factor_energia, puntos_base = self._fila(material)
+        
+        # Calcular peso usando los coeficientes de la regresión lineal
+        peso_estimado = _redondear(cantidad * coeficiente + intercepto, 2)
         
         # Calcular métricas ambientales
-        co2_evitado = self.calcular_co2_evitado(material, peso_estimado)
-        energia_ahorrada = self.calcular_energia_ahorrada(material, peso_estimado)
-        puntos_ecologicos = self.calcular_puntos_ecologicos(material, cantidad, peso_estimado)
+        peso_kg = peso_estimado / 1000
+        co2_evitado = _redondear(peso_kg * factor_co2, 3)
+        energia_ahorrada = _redondear(peso_kg * factor_energia, 3)
+        puntos_ecologicos = max(int(puntos_base) * cantidad + int(peso_estimado / 100), cantidad)
         
-        return {
+        resultado = {
             "material": material,
             "cantidad": cantidad,
             "peso_estimado_gramos": peso_estimado,
@@ -160,6 +447,9 @@ class CalculadorAmbiental:
             "energia_ahorrada_kwh": energia_ahorrada,
             "puntos_ecologicos": puntos_ecologicos
         }
+        self.cache.guardar(clave, resultado)
+        
+        return dict(resultado)
     
     def procesar_multiples_detecciones(self, detecciones: list) -> dict:
         """
@@ -195,10 +485,171 @@ class CalculadorAmbiental:
         
         return {
             "resumen_total": {
-                "peso_total_gramos": round(peso_total, 2),
-                "co2_total_evitado_kg": round(co2_total, 3),
-                "energia_total_ahorrada_kwh": round(energia_total, 3),
+                "peso_total_gramos": _redondear(peso_total, 2),
+                "co2_total_evitado_kg": _redondear(co2_total, 3),
+                "energia_total_ahorrada_kwh": _redondear(energia_total, 3),
                 "puntos_ecologicos_totales": puntos_totales
             },
             "desglose_por_material": resultados_individuales
-        }
\ No newline at end of file
+        }
+    
+    def procesar_lote(self, materiales, cantidades, grupos=None, total_grupos: int = None) -> dict:
+        """
+        Procesa un lote de detecciones de forma vectorizada con NumPy.
+        Produce los mismos valores redondeados que procesar_deteccion.
+        
+        Args:
+            materiales: Arreglo de IDs de material (posición en MATERIALES) o de nombres
+            cantidades: Arreglo paralelo con la cantidad de cada detección
+            grupos: Arreglo opcional con el ID de solicitud (0..n-1) de cada detección,
+                    para obtener totales por solicitud
+            total_grupos: Cantidad de solicitudes (por defecto max(grupos) + 1)
+        
+        Returns:
+            Diccionario de columnas NumPy con las métricas por detección y,
+            si se indican grupos, los totales por solicitud en "totales"
+        """
+        ids = np.asarray(materiales)
+        if ids.dtype.kind in ("U", "S", "O"):
+            ids = codificar_materiales(ids)
+        ids = ids.astype(np.int64, copy=False).reshape(-1)
+        cantidades = np.asarray(cantidades, dtype=np.int64).reshape(-1)
+        
+        if ids.shape != cantidades.shape:
+            raise ValueError("Los arreglos de materiales y cantidades deben tener la misma longitud")
+        if ids.size and (ids.min() < 0 or ids.max() >= len(self.materiales)):
+            raise ValueError("ID de material desconocido en el lote")
+        
+        # Seleccionar la fila de coeficientes de cada detección
+        filas = self.tabla_coeficientes[ids]
+        
+        peso = np.round(cantidades * filas[:, 0] + filas[:, 1], 2)
+        peso_kg = peso / 1000
+        co2 = np.round(peso_kg * filas[:, 2], 3)
+        energia = np.round(peso_kg * filas[:, 3], 3)
+        puntos = filas[:, 4].astype(np.int64) * cantidades + np.trunc(peso / 100).astype(np.int64)
+        puntos = np.maximum(puntos, cantidades)
+        
+        resultado = {
+            "material": ids,
+            "cantidad": cantidades,
+            "peso_estimado_gramos": peso,
+            "co2_evitado_kg": co2,
+            "energia_ahorrada_kwh": energia,
+            "puntos_ecologicos": puntos
+        }
+        
+        if grupos is not None:
+            grupos = np.asarray(grupos, dtype=np.int64).reshape(-1)
+            if grupos.shape != ids.shape:
+                raise ValueError("El arreglo de grupos debe tener la misma longitud que el lote")
+            if total_grupos is None:
+                total_grupos = int(grupos.max()) + 1 if grupos.size else 0
+            
+            resultado["totales"] = self._totalizar_por_grupo(resultado, grupos, total_grupos)
+        
+        return resultado
+    
+    def _totalizar_por_grupo(self, columnas: dict, grupos: np.ndarray, total_grupos: int) -> dict:
+        """
+        Suma las métricas de un lote por grupo.
+        bincount acumula en el mismo orden que el bucle de procesar_multiples_detecciones,
+        así los totales redondeados coinciden.
+        """
+        def sumar(columna):
+            return np.bincount(grupos, weights=columnas[columna], minlength=total_grupos)
+        
+        return {
+            "peso_total_gramos": np.round(sumar("peso_estimado_gramos"), 2),
+            "co2_total_evitado_kg": np.round(sumar("co2_evitado_kg"), 3),
+            "energia_total_ahorrada_kwh": np.round(sumar("energia_ahorrada_kwh"), 3),
+            "puntos_ecologicos_totales": sumar("puntos_ecologicos").astype(np.int64)
+        }
+    
+    def procesar_columnas(self, materiales, cantidades) -> dict:
+        """
+        Procesa detecciones en formato columnar (arreglos paralelos) de forma vectorizada.
+        
+        Args:
+            materiales: Arreglo con el nombre del material de cada detección
+            cantidades: Arreglo paralelo con la cantidad de cada detección
+        
+        Returns:
+            Diccionario con el mismo formato que procesar_multiples_detecciones
+        """
+        lote = self.procesar_lote(codificar_materiales(materiales), cantidades)
+        totales = self._totalizar_por_grupo(lote, np.zeros(len(lote["cantidad"]), dtype=np.int64), 1)
+        
+        # Pasar columnas a tipos de Python una sola vez (los nombres ya se validaron al codificarlos)
+        desglose = [
+            {
+                "material": material,
+                "cantidad": cantidad,
+                "peso_estimado_gramos": peso,
+                "co2_evitado_kg": co2,
+                "energia_ahorrada_kwh": energia,
+                "puntos_ecologicos": puntos
+            }
+            for material, cantidad, peso, co2, energia, puntos in zip(
+                materiales,
+                lote["cantidad"].tolist(),
+                lote["peso_estimado_gramos"].tolist(),
+                lote["co2_evitado_kg"].tolist(),
+                lote["energia_ahorrada_kwh"].tolist(),
+                lote["puntos_ecologicos"].tolist()
+            )
+        ]
+        
+        return {
+            "resumen_total": {clave: valores[0].item() for clave, valores in totales.items()},
+            "desglose_por_material": desglose
+        }
+    
+    def procesar_multiples_solicitudes(self, solicitudes: list) -> dict:
+        """
+        Procesa varias solicitudes en una sola pasada vectorizada.
+        
+        Args:
+            solicitudes: Lista de listas de detecciones (diccionarios con 'material' y 'cantidad')
+        
+        Returns:
+            Diccionario con el resumen total de todas las solicitudes y una lista
+            "resultados" con el mismo formato que procesar_multiples_detecciones
+        """
+        materiales = [det["material"] for detecciones in solicitudes for det in detecciones]
+        cantidades = [det["cantidad"] for detecciones in solicitudes for det in detecciones]
+        longitudes = [len(detecciones) for detecciones in solicitudes]
+        grupos = np.repeat(np.arange(len(solicitudes), dtype=np.int64), longitudes)
+        
+        lote = self.procesar_lote(codificar_materiales(materiales), cantidades, grupos, len(solicitudes))
+        general = self._totalizar_por_grupo(lote, np.zeros_like(grupos), 1)
+        
+        # Pasar columnas a tipos de Python una sola vez
+        columnas = {clave: valores.tolist() for clave, valores in lote.items() if clave != "totales"}
+        totales = {clave: valores.tolist() for clave, valores in lote["totales"].items()}
+        
+        resultados = []
+        inicio = 0
+        for i, longitud in enumerate(longitudes):
+            fin = inicio + longitud
+            desglose = [
+                {
+                    "material": self.materiales[columnas["material"][j]],
+                    "cantidad": columnas["cantidad"][j],
+                    "peso_estimado_gramos": columnas["peso_estimado_gramos"][j],
+                    "co2_evitado_kg": columnas["co2_evitado_kg"][j],
+                    "energia_ahorrada_kwh": columnas["energia_ahorrada_kwh"][j],
+                    "puntos_ecologicos": columnas["puntos_ecologicos"][j]
+                }
+                for j in range(inicio, fin)
+            ]
+            resultados.append({
+                "resumen_total": {clave: valores[i] for clave, valores in totales.items()},
+                "desglose_por_material": desglose
+            })
+            inicio = fin
+        
+        return {
+            "resumen_total": {clave: valores[0].item() for clave, valores in general.items()},
+            "resultados": resultados
+        }
@@ -0,0 +1,192 @@
+"""
+calculos_ndjson.py
+Procesamiento en streaming de detecciones en formato NDJSON (un JSON por línea).
+Lee los registros de forma incremental, los calcula por bloques acotados con
+CalculadorAmbiental.procesar_lote y emite una línea de resultado por registro,
+así la memoria se mantiene constante sin importar el tamaño de la entrada.
+
+Uso como CLI:
+    python calculos_ndjson.py detecciones.ndjson --salida resultados.ndjson
+    cat detecciones.ndjson | python calculos_ndjson.py > resultados.ndjson
+
+Cada línea de entrada: {"id": "opcional", "material": "botella_plastico", "cantidad": 3}
+"""
+
+import argparse
+import json
+import sys
+
+from calculos import CANTIDAD_MAXIMA, CalculadorAmbiental, MATERIALES, cargar_calculador
+
+# Cantidad de registros que se calculan juntos en cada bloque
+TAMANO_BLOQUE = 10000
+
+
+def parsear_registro(linea: str) -> dict:
+    """
+    Convierte una línea NDJSON en un registro de detección validado.
+
+    Args:
+        linea: Texto de la línea (sin salto de línea)
+
+    Returns:
+        Diccionario con 'material', 'cantidad' y opcionalmente 'id'
+
+    Raises:
+        ValueError: Si la línea no es JSON válido o el registro es inválido
+    """
+    try:
+        registro = json.loads(linea)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido: {e.msg}")
+
+    if not isinstance(registro, dict):
+        raise ValueError("Cada línea debe ser un objeto JSON")
+
+    material = registro.get("material")
+    cantidad = registro.get("cantidad")
+
+    if material not in MATERIALES:
+        raise ValueError(f"Material desconocido: {material}")
+    if not isinstance(cantidad, int) or isinstance(cantidad, bool) or cantidad <= 0:
+        raise ValueError("La cantidad debe ser un entero mayor a 0")
+    if cantidad > CANTIDAD_MAXIMA:
+        raise ValueError(f"La cantidad no puede superar {CANTIDAD_MAXIMA}")
+
+    return registro
+
+
+def procesar_bloque(calculador: CalculadorAmbiental, lineas: list) -> list:
+    """
+    Calcula un bloque de líneas NDJSON y retorna las líneas de resultado.
+
+    Args:
+        calculador: Instancia de CalculadorAmbiental
+        lineas: Lista de tuplas (numero_linea, texto)
+
+    Returns:
+        Lista de líneas de salida (con salto de línea), en el mismo orden de entrada
+    """
+    salida = [None] * len(lineas)
+    validos = []
+
+    for posicion, (numero, texto) in enumerate(lineas):
+        try:
+            validos.append((posicion, parsear_registro(texto)))
+        except ValueError as e:
+            salida[posicion] = json.dumps(
+                {"linea": numero, "error": str(e)}, ensure_ascii=False
+            ) + "\n"
+
+    if validos:
+        lote = calculador.procesar_lote(
+            [registro["material"] for _, registro in validos],
+            [registro["cantidad"] for _, registro in validos]
+        )
+        columnas = {clave: valores.tolist() for clave, valores in lote.items()}
+
+        for j, (posicion, registro) in enumerate(validos):
+            resultado = {"id": registro["id"]} if "id" in registro else {}
+            resultado.update({
+                "material": registro["material"],
+                "cantidad": columnas["cantidad"][j],
+                "peso_estimado_gramos": columnas["peso_estimado_gramos"][j],
+                "co2_evitado_kg": columnas["co2_evitado_kg"][j],
+                "energia_ahorrada_kwh": columnas["energia_ahorrada_kwh"][j],
+                "puntos_ecologicos": columnas["puntos_ecologicos"][j]
+            })
+            salida[posicion] = json.dumps(resultado, ensure_ascii=False) + "\n"
+
+    return salida
+
+
+def procesar_flujo(lineas, calculador: CalculadorAmbiental, tamano_bloque: int = TAMANO_BLOQUE):
+    """
+    Procesa un iterable de líneas NDJSON por bloques y genera las líneas de resultado.
+    Las líneas vacías se ignoran; los números de línea empiezan en 1.
+    """
+    bloque = []
+    for numero, linea in enumerate(lineas, 1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        bloque.append((numero, linea))
+        if len(bloque) >= tamano_bloque:
+            yield from procesar_bloque(calculador, bloque)
+            bloque = []
+
+    if bloque:
+        yield from procesar_bloque(calculador, bloque)
+
+
+async def procesar_flujo_async(fragmentos, calculador: CalculadorAmbiental, tamano_bloque: int = TAMANO_BLOQUE):
+    """
+    Versión asíncrona de procesar_flujo que recibe fragmentos de bytes
+    (por ejemplo request.stream()) y los divide en líneas a medida que llegan.
+    """
+    # Fragmentos de la línea incompleta: se unen una sola vez, cuando llega su salto de línea
+    # (concatenar y volver a dividir todo lo pendiente en cada fragmento es cuadrático)
+    pendientes = []
+    numero = 0
+    bloque = []
+
+    async for fragmento in fragmentos:
+        if b"\n" not in fragmento:
+            pendientes.append(fragmento)
+            continue
+
+        completas = fragmento.split(b"\n")
+        pendientes.append(completas[0])
+        completas[0] = b"".join(pendientes)
+        pendientes = [completas.pop()]
+
+        for linea in completas:
+            numero += 1
+            linea = linea.strip()
+            if not linea:
+                continue
+            bloque.append((numero, linea.decode("utf-8", errors="replace")))
+            if len(bloque) >= tamano_bloque:
+                for salida in procesar_bloque(calculador, bloque):
+                    yield salida
+                bloque = []
+
+    pendiente = b"".join(pendientes).strip()
+    if pendiente:
+        bloque.append((numero + 1, pendiente.decode("utf-8", errors="replace")))
+
+    if bloque:
+        for salida in procesar_bloque(calculador, bloque):
+            yield salida
+
+
+def main():
+    """Función principal de la CLI"""
+    parser = argparse.ArgumentParser(
+        description="Calcula el impacto ambiental de detecciones NDJSON en streaming"
+    )
+    parser.add_argument("entrada", nargs="?", default="-",
+                        help="Archivo NDJSON de entrada (por defecto stdin)")
+    parser.add_argument("--salida", default="-",
+                        help="Archivo NDJSON de salida (por defecto stdout)")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE,
+                        help=f"Registros por bloque de cálculo (por defecto {TAMANO_BLOQUE})")
+    args = parser.parse_args()
+
+    calculador = cargar_calculador()
+
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8")
+    salida = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8")
+
+    try:
+        for linea in procesar_flujo(entrada, calculador, args.tamano_bloque):
+            salida.write(linea)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+
+
+if __name__ == "__main__":
+    main()
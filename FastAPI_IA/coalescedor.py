@@ -0,0 +1,105 @@
+"""
+coalescedor.py
+Agrupa (micro-batching) las solicitudes de cálculo que llegan casi al mismo tiempo
+y las evalúa juntas con una sola llamada vectorizada al calculador.
+"""
+
+import asyncio
+
+from calculos import CANTIDAD_MAXIMA
+
+
+class CoalescedorCalculos:
+    """
+    Junta las solicitudes concurrentes durante una ventana corta de tiempo
+    (o hasta llenar un lote) y reparte los resultados a cada solicitud en espera.
+    """
+
+    def __init__(self, calculador, ventana_ms: float = 1.0, max_lote: int = 64):
+        """
+        Args:
+            calculador: Instancia de CalculadorAmbiental
+            ventana_ms: Latencia máxima que espera una solicitud antes de procesar el lote
+            max_lote: Cantidad de solicitudes que dispara el procesamiento inmediato
+        """
+        if ventana_ms <= 0 or max_lote < 1:
+            raise ValueError("La ventana debe ser mayor a 0 y el lote de al menos 1 solicitud")
+
+        self.calculador = calculador
+        self.ventana_ms = ventana_ms
+        self.max_lote = max_lote
+        self._pendientes = []
+        self._temporizador = None
+        self.lotes_procesados = 0
+        self.solicitudes_procesadas = 0
+
+    async def calcular(self, detecciones: list) -> dict:
+        """
+        Encola una solicitud y espera su resultado.
+
+        Args:
+            detecciones: Lista de diccionarios con 'material' y 'cantidad'
+
+        Returns:
+            El mismo resultado que CalculadorAmbiental.procesar_multiples_detecciones
+        """
+        # El lote vectorizado usa int64: las cantidades fuera de rango van por el cálculo escalar
+        if any(deteccion["cantidad"] > CANTIDAD_MAXIMA for deteccion in detecciones):
+            return self.calculador.procesar_multiples_detecciones(detecciones)
+
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendientes.append((detecciones, futuro))
+
+        if len(self._pendientes) >= self.max_lote:
+            self._procesar_pendientes()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.ventana_ms / 1000, self._procesar_pendientes)
+
+        return await futuro
+
+    def _procesar_pendientes(self):
+        """Evalúa todas las solicitudes pendientes en una sola llamada al calculador"""
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+
+        pendientes, self._pendientes = self._pendientes, []
+        if not pendientes:
+            return
+
+        self.lotes_procesados += 1
+        self.solicitudes_procesadas += len(pendientes)
+
+        try:
+            resultado = self.calculador.procesar_multiples_solicitudes(
+                [detecciones for detecciones, _ in pendientes]
+            )
+        except Exception:
+            # Si el lote falla, se calcula cada solicitud por separado para aislar el error
+            for detecciones, futuro in pendientes:
+                if futuro.done():
+                    continue
+                try:
+                    futuro.set_result(self.calculador.procesar_multiples_detecciones(detecciones))
+                except Exception as e:
+                    futuro.set_exception(e)
+            return
+
+        for (_, futuro), item in zip(pendientes, resultado["resultados"]):
+            # La solicitud pudo cancelarse (cliente desconectado) mientras esperaba
+            if not futuro.done():
+                futuro.set_result(item)
+
+    def estadisticas(self) -> dict:
+        """Retorna la configuración y los contadores del coalescedor"""
+        return {
+            "ventana_ms": self.ventana_ms,
+            "max_lote": self.max_lote,
+            "lotes_procesados": self.lotes_procesados,
+            "solicitudes_procesadas": self.solicitudes_procesadas,
+            "promedio_por_lote": (
+                round(self.solicitudes_procesadas / self.lotes_procesados, 2)
+                if self.lotes_procesados else 0.0
+            )
+        }
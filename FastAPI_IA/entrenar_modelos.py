@@ -0,0 +1,27 @@
+"""
+entrenar_modelos.py
+Reentrena los modelos de regresión lineal y guarda el artefacto de coeficientes.
+Ejecutar cuando cambien los PESOS_PROMEDIO en calculos.py:
+    python entrenar_modelos.py
+"""
+
+import argparse
+
+from calculos import RUTA_ARTEFACTO, cargar_calculador
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Reentrena los modelos y guarda el artefacto")
+    parser.add_argument("--salida", default=str(RUTA_ARTEFACTO),
+                        help=f"Ruta del artefacto (por defecto {RUTA_ARTEFACTO.name})")
+    args = parser.parse_args()
+
+    calculador = cargar_calculador(args.salida, reentrenar=True)
+
+    print(f"✅ Modelos entrenados y guardados en: {args.salida}")
+    print(f"   Checksum: {calculador.checksum}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+libro_impacto.py
+Libro de impacto por usuario sobre SQLite (embebido, sin servidor).
+Cada cálculo se guarda como registro y, en la misma transacción, se actualizan
+los totales acumulados del usuario y sus contadores por material. Así la
+consulta de "impacto total" es una búsqueda por clave, sin recorrer el historial.
+
+Un registro puede llevar una clave de idempotencia (única por usuario): si la
+misma clave llega de nuevo (reintentos, reenvíos del cliente) no se suma otra vez.
+
+También mantiene rollups por período (hora, día, semana y mes) con un índice
+ordenado por puntos, para que los rankings lean solo las primeras K filas.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Base de datos por defecto (se puede cambiar con la variable de entorno LIBRO_IMPACTO_DB)
+RUTA_LIBRO = Path(__file__).with_name("libro_impacto.db")
+
+# Períodos de los rollups ("total" usa los totales acumulados de cada usuario)
+PERIODOS = ("hora", "dia", "semana", "mes")
+PERIODO_TOTAL = "total"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS registros (
+    id INTEGER PRIMARY KEY,
+    usuario_id TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    peso_total_gramos REAL NOT NULL,
+    co2_total_evitado_kg REAL NOT NULL,
+    energia_total_ahorrada_kwh REAL NOT NULL,
+    puntos_ecologicos_totales INTEGER NOT NULL,
+    desglose TEXT NOT NULL,
+    clave_idempotencia TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_registros_usuario ON registros (usuario_id, id);
+
+CREATE TABLE IF NOT EXISTS totales_usuario (
+    usuario_id TEXT PRIMARY KEY,
+    registros INTEGER NOT NULL,
+    peso_total_gramos REAL NOT NULL,
+    co2_total_evitado_kg REAL NOT NULL,
+    energia_total_ahorrada_kwh REAL NOT NULL,
+    puntos_ecologicos_totales INTEGER NOT NULL,
+    primer_registro TEXT NOT NULL,
+    ultimo_registro TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS totales_material (
+    usuario_id TEXT NOT NULL,
+    material TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    peso_estimado_gramos REAL NOT NULL,
+    co2_evitado_kg REAL NOT NULL,
+    energia_ahorrada_kwh REAL NOT NULL,
+    puntos_ecologicos INTEGER NOT NULL,
+    PRIMARY KEY (usuario_id, material)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollups (
+    periodo TEXT NOT NULL,
+    inicio TEXT NOT NULL,
+    usuario_id TEXT NOT NULL,
+    registros INTEGER NOT NULL,
+    peso_total_gramos REAL NOT NULL,
+    co2_total_evitado_kg REAL NOT NULL,
+    energia_total_ahorrada_kwh REAL NOT NULL,
+    puntos_ecologicos_totales INTEGER NOT NULL,
+    PRIMARY KEY (periodo, inicio, usuario_id)
+) WITHOUT ROWID;
+
+-- Índices ordenados por puntos: el top-K recorre solo K entradas del índice
+CREATE INDEX IF NOT EXISTS idx_rollups_ranking
+    ON rollups (periodo, inicio, puntos_ecologicos_totales DESC, usuario_id);
+CREATE INDEX IF NOT EXISTS idx_rollups_usuario
+    ON rollups (usuario_id, periodo, inicio);
+CREATE INDEX IF NOT EXISTS idx_totales_ranking
+    ON totales_usuario (puntos_ecologicos_totales DESC, usuario_id);
+"""
+
+# Se crea aparte del esquema: las bases anteriores reciben la columna con ALTER TABLE
+# (los registros sin clave quedan en NULL, que no choca con el índice único)
+SQL_INDICE_IDEMPOTENCIA = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_registros_idempotencia
+    ON registros (usuario_id, clave_idempotencia)
+"""
+
+SQL_REGISTRO = """
+INSERT INTO registros (usuario_id, fecha, peso_total_gramos, co2_total_evitado_kg,
+    energia_total_ahorrada_kwh, puntos_ecologicos_totales, desglose, clave_idempotencia)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (usuario_id, clave_idempotencia) DO NOTHING
+"""
+
+SQL_TOTALES_USUARIO = """
+INSERT INTO totales_usuario VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (usuario_id) DO UPDATE SET
+    registros = registros + 1,
+    peso_total_gramos = peso_total_gramos + excluded.peso_total_gramos,
+    co2_total_evitado_kg = co2_total_evitado_kg + excluded.co2_total_evitado_kg,
+    energia_total_ahorrada_kwh = energia_total_ahorrada_kwh + excluded.energia_total_ahorrada_kwh,
+    puntos_ecologicos_totales = puntos_ecologicos_totales + excluded.puntos_ecologicos_totales,
+    ultimo_registro = excluded.ultimo_registro
+"""
+
+SQL_TOTALES_MATERIAL = """
+INSERT INTO totales_material VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (usuario_id, material) DO UPDATE SET
+    cantidad = cantidad + excluded.cantidad,
+    peso_estimado_gramos = peso_estimado_gramos + excluded.peso_estimado_gramos,
+    co2_evitado_kg = co2_evitado_kg + excluded.co2_evitado_kg,
+    energia_ahorrada_kwh = energia_ahorrada_kwh + excluded.energia_ahorrada_kwh,
+    puntos_ecologicos = puntos_ecologicos + excluded.puntos_ecologicos
+"""
+
+SQL_ROLLUPS = """
+INSERT INTO rollups VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (periodo, inicio, usuario_id) DO UPDATE SET
+    registros = registros + 1,
+    peso_total_gramos = peso_total_gramos + excluded.peso_total_gramos,
+    co2_total_evitado_kg = co2_total_evitado_kg + excluded.co2_total_evitado_kg,
+    energia_total_ahorrada_kwh = energia_total_ahorrada_kwh + excluded.energia_total_ahorrada_kwh,
+    puntos_ecologicos_totales = puntos_ecologicos_totales + excluded.puntos_ecologicos_totales
+"""
+
+
+def inicio_periodo(fecha: datetime, periodo: str) -> str:
+    """
+    Calcula el inicio del período (en UTC) al que pertenece una fecha.
+    Las semanas empiezan el lunes (ISO 8601).
+
+    Args:
+        fecha: Fecha a clasificar (sin zona horaria se asume UTC)
+        periodo: Uno de PERIODOS
+
+    Returns:
+        Inicio del período como texto ISO (por ejemplo "2026-10-12" o "2026-10-18T09:00")
+    """
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    fecha = fecha.astimezone(timezone.utc)
+
+    if periodo == "hora":
+        return fecha.strftime("%Y-%m-%dT%H:00")
+    if periodo == "dia":
+        return fecha.date().isoformat()
+    if periodo == "semana":
+        return (fecha.date() - timedelta(days=fecha.weekday())).isoformat()
+    if periodo == "mes":
+        return fecha.date().replace(day=1).isoformat()
+    raise ValueError(f"Período desconocido: {periodo}. Opciones: {', '.join(PERIODOS)}")
+
+
+def _redondear_totales(fila) -> dict:
+    """Totales de una fila redondeados igual que el calculador (las sumas de REAL acumulan error)"""
+    return {
+        "peso_total_gramos": round(fila["peso_total_gramos"], 2),
+        "co2_total_evitado_kg": round(fila["co2_total_evitado_kg"], 3),
+        "energia_total_ahorrada_kwh": round(fila["energia_total_ahorrada_kwh"], 3),
+        "puntos_ecologicos_totales": fila["puntos_ecologicos_totales"]
+    }
+
+
+class LibroImpacto:
+    """Registro de cálculos por usuario con totales acumulados de forma incremental"""
+
+    def __init__(self, ruta=RUTA_LIBRO):
+        """
+        Args:
+            ruta: Archivo de la base de datos SQLite (":memory:" para una base temporal)
+        """
+        self.ruta = str(ruta)
+        # Una conexión compartida; el bloqueo serializa las escrituras entre hilos
+        self.conexion = sqlite3.connect(self.ruta, check_same_thread=False, timeout=5.0)
+        self.conexion.row_factory = sqlite3.Row
+        self._bloqueo = threading.Lock()
+
+        # WAL permite leer mientras otro proceso (worker) escribe
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(ESQUEMA)
+        columnas = {fila["name"] for fila in self.conexion.execute("PRAGMA table_info(registros)")}
+        if "clave_idempotencia" not in columnas:
+            self.conexion.execute("ALTER TABLE registros ADD COLUMN clave_idempotencia TEXT")
+        self.conexion.execute(SQL_INDICE_IDEMPOTENCIA)
+
+    def registrar(self, usuario_id: str, resultado: dict, fecha: datetime = None,
+                  clave_idempotencia: str = None) -> int:
+        """
+        Guarda un cálculo y actualiza los totales y rollups del usuario en una sola transacción.
+
+        Args:
+            usuario_id: Identificador del usuario
+            resultado: Salida de CalculadorAmbiental.procesar_multiples_detecciones
+            fecha: Momento del cálculo (por defecto, ahora en UTC)
+            clave_idempotencia: Si el usuario ya tiene un registro con esta clave, no se registra de nuevo
+
+        Returns:
+            ID del registro creado, o None si la clave de idempotencia ya estaba registrada
+        """
+        fecha = fecha or datetime.now(timezone.utc)
+        periodos = [(periodo, inicio_periodo(fecha, periodo)) for periodo in PERIODOS]
+        fecha = fecha.isoformat(timespec="seconds")
+        resumen = resultado["resumen_total"]
+        desglose = resultado["desglose_por_material"]
+        totales = (
+            resumen["peso_total_gramos"],
+            resumen["co2_total_evitado_kg"],
+            resumen["energia_total_ahorrada_kwh"],
+            resumen["puntos_ecologicos_totales"]
+        )
+
+        with self._bloqueo, self.conexion:
+            cursor = self.conexion.execute(
+                SQL_REGISTRO,
+                (usuario_id, fecha, *totales, json.dumps(desglose, ensure_ascii=False), clave_idempotencia)
+            )
+            if cursor.rowcount == 0:
+                # Repetición de un registro ya guardado: los totales no cambian
+                return None
+
+            self.conexion.execute(SQL_TOTALES_USUARIO, (usuario_id, *totales, fecha, fecha))
+            self.conexion.executemany(SQL_TOTALES_MATERIAL, [
+                (
+                    usuario_id,
+                    item["material"],
+                    item["cantidad"],
+                    item["peso_estimado_gramos"],
+                    item["co2_evitado_kg"],
+                    item["energia_ahorrada_kwh"],
+                    item["puntos_ecologicos"]
+                )
+                for item in desglose
+            ])
+            self.conexion.executemany(SQL_ROLLUPS, [
+                (periodo, inicio, usuario_id, *totales) for periodo, inicio in periodos
+            ])
+
+        return cursor.lastrowid
+
+    def impacto_usuario(self, usuario_id: str) -> dict:
+        """
+        Obtiene el impacto acumulado de un usuario (búsquedas por clave primaria).
+
+        Args:
+            usuario_id: Identificador del usuario
+
+        Returns:
+            Diccionario con los totales y el desglose por material, o None si no tiene registros
+        """
+        # Se lee con el bloqueo tomado: la conexión es compartida y, sin él, se podrían
+        # ver los totales del usuario ya actualizados y los de sus materiales todavía no
+        with self._bloqueo:
+            fila = self.conexion.execute(
+                "SELECT * FROM totales_usuario WHERE usuario_id = ?", (usuario_id,)
+            ).fetchone()
+            if fila is None:
+                return None
+
+            materiales = self.conexion.execute(
+                "SELECT * FROM totales_material WHERE usuario_id = ? ORDER BY material", (usuario_id,)
+            ).fetchall()
+
+        # Las sumas de REAL acumulan error de punto flotante: se redondean igual que el calculador
+        return {
+            "usuario_id": usuario_id,
+            "registros": fila["registros"],
+            "primer_registro": fila["primer_registro"],
+            "ultimo_registro": fila["ultimo_registro"],
+            "resumen_total": _redondear_totales(fila),
+            "desglose_por_material": [
+                {
+                    "material": m["material"],
+                    "cantidad": m["cantidad"],
+                    "peso_estimado_gramos": round(m["peso_estimado_gramos"], 2),
+                    "co2_evitado_kg": round(m["co2_evitado_kg"], 3),
+                    "energia_ahorrada_kwh": round(m["energia_ahorrada_kwh"], 3),
+                    "puntos_ecologicos": m["puntos_ecologicos"]
+                }
+                for m in materiales
+            ]
+        }
+
+    def ranking(self, periodo: str = "semana", fecha: datetime = None, limite: int = 10) -> dict:
+        """
+        Obtiene los K usuarios con más puntos ecológicos en un período.
+        Se lee en orden desde el índice por puntos, sin recorrer los registros.
+
+        Args:
+            periodo: Uno de PERIODOS o PERIODO_TOTAL (acumulado histórico)
+            fecha: Fecha dentro del período a consultar (por defecto, ahora en UTC)
+            limite: Cantidad de posiciones (K)
+
+        Returns:
+            Diccionario con el período, su inicio y las posiciones del ranking
+        """
+        if periodo == PERIODO_TOTAL:
+            inicio = None
+            with self._bloqueo:
+                filas = self.conexion.execute(
+                    "SELECT * FROM totales_usuario "
+                    "ORDER BY puntos_ecologicos_totales DESC, usuario_id LIMIT ?",
+                    (limite,)
+                ).fetchall()
+        else:
+            inicio = inicio_periodo(fecha or datetime.now(timezone.utc), periodo)
+            with self._bloqueo:
+                filas = self.conexion.execute(
+                    "SELECT * FROM rollups WHERE periodo = ? AND inicio = ? "
+                    "ORDER BY puntos_ecologicos_totales DESC, usuario_id LIMIT ?",
+                    (periodo, inicio, limite)
+                ).fetchall()
+
+        return {
+            "periodo": periodo,
+            "inicio": inicio,
+            "posiciones": [
+                {"posicion": posicion, "usuario_id": fila["usuario_id"], "registros": fila["registros"],
+                 **_redondear_totales(fila)}
+                for posicion, fila in enumerate(filas, 1)
+            ]
+        }
+
+    def rollups_usuario(self, usuario_id: str, periodo: str = "dia", limite: int = 30) -> list:
+        """
+        Obtiene los rollups más recientes de un usuario en un tipo de período.
+
+        Args:
+            usuario_id: Identificador del usuario
+            periodo: Uno de PERIODOS
+            limite: Cantidad máxima de períodos (del más reciente al más antiguo)
+
+        Returns:
+            Lista de diccionarios con el inicio del período y sus totales
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Período desconocido: {periodo}. Opciones: {', '.join(PERIODOS)}")
+
+        with self._bloqueo:
+            filas = self.conexion.execute(
+                "SELECT * FROM rollups WHERE usuario_id = ? AND periodo = ? ORDER BY inicio DESC LIMIT ?",
+                (usuario_id, periodo, limite)
+            ).fetchall()
+
+        return [
+            {"inicio": fila["inicio"], "registros": fila["registros"], **_redondear_totales(fila)}
+            for fila in filas
+        ]
+
+    def cerrar(self):
+        """Cierra la conexión con la base de datos"""
+        self.conexion.close()
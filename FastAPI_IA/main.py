@@ -2,26 +2,128 @@
 main.py
 Servidor FastAPI que expone el endpoint
 """
-from fastapi import FastAPI, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import hashlib
+import json
 import logging
+import os
+import time
+from datetime import datetime
+from typing import Literal, Optional
 
 from modelos import (
     SolicitudCalculo,
+    SolicitudCalculoColumnar,
+    SolicitudCalculoLote,
     RespuestaCalculo,
-    ErrorRespuesta,
-    ResumenTotal,
-    ResultadoMaterial
+    RespuestaCalculoLote,
+    ImpactoUsuario,
+    RespuestaRanking,
+    RollupsUsuario,
+    ErrorRespuesta
 )
-from calculos import CalculadorAmbiental
+from cache import CacheLRU
+from calculos import (
+    TAMANO_CACHE,
+    CalculadorAmbiental,
+    cargar_calculador
+)
+from calculos_ndjson import procesar_flujo_async
+from coalescedor import CoalescedorCalculos
+from libro_impacto import RUTA_LIBRO, LibroImpacto
+from metricas import MiddlewareMetricas, RegistroMetricas
+from negociacion import RutaMsgpack
+from serializacion import (
+    TIPO_MSGPACK,
+    acepta_msgpack,
+    codificar_json,
+    codificar_msgpack,
+    construir_respuesta,
+    construir_respuesta_lote
+)
+from tabla_compartida import adjuntar_tabla
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# El calculador y la caché de respuestas se crean al iniciar la aplicación (ver lifespan)
+calculador = None
+cache_respuestas = None
+coalescedor = None
+
+# Libro de impacto por usuario (SQLite), abierto en el lifespan
+libro = None
+
+# Ventana (segundos) de la clave de idempotencia por defecto: el mismo usuario con el mismo
+# ETag dentro de la ventana se registra una sola vez (0 = solo con la cabecera Idempotency-Key)
+ventana_idempotencia = 0.0
+
+# Segmento de memoria compartida con la tabla de coeficientes (solo con servidor.py).
+# Se conserva abierto mientras viva el proceso porque el calculador lee de él.
+segmento_tabla = None
+
+# Métricas de peticiones y etapas internas (expuestas en /metrics)
+metricas = RegistroMetricas()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Carga los coeficientes desde el artefacto al iniciar el servidor.
+    Solo se reentrena (con scikit-learn) si REENTRENAR_MODELOS=1.
+    """
+    global calculador, cache_respuestas, coalescedor, segmento_tabla, libro, ventana_idempotencia
+    reentrenar = os.getenv("REENTRENAR_MODELOS") == "1"
+    tamano_cache = int(os.getenv("TAMANO_CACHE_CALCULOS", TAMANO_CACHE))
+    
+    # Con servidor.py la tabla ya está cargada en memoria compartida por el proceso principal
+    nombre_tabla = os.getenv("TABLA_COMPARTIDA")
+    if nombre_tabla and not reentrenar:
+        segmento_tabla, tabla = adjuntar_tabla(nombre_tabla)
+        calculador = CalculadorAmbiental.desde_tabla(
+            tabla, checksum=os.getenv("CHECKSUM_MODELOS"), tamano_cache=tamano_cache
+        )
+    else:
+        calculador = cargar_calculador(reentrenar=reentrenar, tamano_cache=tamano_cache)
+    cache_respuestas = CacheLRU(
+        int(os.getenv("TAMANO_CACHE_RESPUESTAS", 4096)),
+        ttl_segundos=float(os.getenv("TTL_CACHE_RESPUESTAS", 300))
+    )
+    
+    # Micro-batching de /calcular-impacto (desactivado si la ventana es 0)
+    ventana_ms = float(os.getenv("COALESCER_VENTANA_MS", 0))
+    if ventana_ms > 0:
+        coalescedor = CoalescedorCalculos(
+            calculador,
+            ventana_ms=ventana_ms,
+            max_lote=int(os.getenv("COALESCER_MAX_LOTE", 64))
+        )
+        logger.info(f"🧺 Coalescedor activo: ventana {ventana_ms} ms, lote máximo {coalescedor.max_lote}")
+    
+    if reentrenar:
+        logger.info("✅ Modelos de regresión lineal reentrenados y guardados")
+    elif segmento_tabla is not None:
+        logger.info(f"✅ Coeficientes tomados de la memoria compartida ({calculador.checksum[:12]})")
+    else:
+        logger.info(f"✅ Modelos de regresión lineal cargados desde artefacto ({calculador.checksum[:12]})")
+    
+    libro = LibroImpacto(os.getenv("LIBRO_IMPACTO_DB", RUTA_LIBRO))
+    logger.info(f"📒 Libro de impacto por usuario: {libro.ruta}")
+    ventana_idempotencia = float(os.getenv("IDEMPOTENCIA_VENTANA_S", 0))
+    
+    yield
+    
+    libro.cerrar()
+
+
 # Crear instancia de FastAPI
 app = FastAPI(
+    lifespan=lifespan,
     title="Microservicio de Cálculo Ambiental",
     description="API para calcular métricas ambientales de materiales reciclables usando IA (Regresión Lineal)",
     version="1.0.0",
@@ -29,6 +131,9 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Las rutas aceptan cuerpos JSON o MessagePack (según Content-Type)
+app.router.route_class = RutaMsgpack
+
 # Configurar CORS para permitir llamadas desde Flutter y otros clientes
 app.add_middleware(
     CORSMiddleware,
@@ -38,9 +143,154 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar el calculador ambiental (se entrena al iniciar)
-calculador = CalculadorAmbiental()
-logger.info("✅ Modelos de regresión lineal entrenados correctamente")
+# Medir todas las peticiones (se agrega al final para envolver también a CORS)
+app.add_middleware(MiddlewareMetricas, registro=metricas)
+
+
+class RespuestaNDJSON(StreamingResponse):
+    """
+    Respuesta en streaming NDJSON que se genera mientras se lee la petición.
+    No escucha desconexiones en paralelo (eso consumiría el cuerpo de la petición);
+    request.stream() ya detecta cuando el cliente se desconecta.
+    """
+    media_type = "application/x-ndjson"
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+def generar_etag(entrada) -> str:
+    """
+    Genera el ETag de una solicitud de cálculo (lista de detecciones o columnas).
+    La entrada se codifica como JSON canónico (claves ordenadas, sin espacios) y respetando
+    el orden de las entradas, que es el orden del desglose de la respuesta. Incluye el checksum de los modelos y la versión de los factores,
+    así cambia cuando cambia cualquier dato que afecte el resultado.
+    """
+    contenido = json.dumps(
+        [entrada, calculador.checksum, calculador.version_factores],
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return '"' + hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def medir_validacion(request: Request, ruta: str):
+    """
+    Registra la etapa de validación: desde que llega la petición
+    hasta que el endpoint recibe los datos ya validados por FastAPI.
+    """
+    inicio = getattr(request.state, "inicio_peticion", None)
+    if inicio is not None:
+        metricas.observar_etapa(ruta, "validacion", time.perf_counter() - inicio)
+
+
+def etag_coincide(etag: str, if_none_match: str) -> bool:
+    """
+    Verifica si el ETag está en la cabecera If-None-Match (acepta ETags débiles).
+    '*' no cuenta como coincidencia: en un POST el cliente puede no haber recibido
+    nunca este resultado, así que se calcula y se devuelve igual.
+    """
+    if not if_none_match:
+        return False
+    
+    etiquetas = [etiqueta.strip() for etiqueta in if_none_match.split(",")]
+    return any(etiqueta.removeprefix("W/") == etag for etiqueta in etiquetas)
+
+
+def clave_idempotencia(request: Request, etag: str) -> Optional[str]:
+    """
+    Clave de idempotencia del registro en el libro de impacto.
+    Usa la cabecera Idempotency-Key del cliente. Sin ella, cada envío es un registro nuevo
+    (dos envíos iguales pueden ser dos reciclajes reales), salvo que se configure
+    IDEMPOTENCIA_VENTANA_S > 0: entonces se usa el ETag de la solicitud más el tramo de
+    tiempo actual.
+    """
+    clave = request.headers.get("idempotency-key")
+    if clave:
+        return "cliente:" + clave
+    if ventana_idempotencia <= 0:
+        return None
+    return f"etag:{etag}:{int(time.time() // ventana_idempotencia)}"
+
+
+async def calcular_detecciones(detecciones: list) -> dict:
+    """Calcula una lista de detecciones (agrupada con otras solicitudes si el coalescedor está activo)"""
+    if coalescedor is not None:
+        return await coalescedor.calcular(detecciones)
+    return calculador.procesar_multiples_detecciones(detecciones)
+
+
+async def calcular_columnas(materiales: list, cantidades: list) -> dict:
+    """Calcula detecciones en columnas con una sola pasada vectorizada"""
+    return calculador.procesar_columnas(materiales, cantidades)
+
+
+async def responder_calculo(entrada, calcular, request: Request, ruta: str,
+                            usuario_id: Optional[str] = None) -> Response:
+    """
+    Calcula (o reutiliza) la respuesta de una solicitud de cálculo.
+    Compartido por /calcular-impacto y /calcular-impacto-columnar.
+    La respuesta es MessagePack si la cabecera Accept lo pide, si no JSON.
+    
+    Args:
+        entrada: Datos de la solicitud tal como llegaron (para el ETag)
+        calcular: Función sin argumentos que devuelve (await) el resultado, con la forma
+                  de CalculadorAmbiental.procesar_multiples_detecciones
+        request: Petición HTTP (para leer If-None-Match y Accept)
+        ruta: Ruta del endpoint, para las métricas de etapas
+        usuario_id: Si se indica, el resultado se registra en el libro de impacto del usuario
+    
+    Returns:
+        Respuesta con la forma de RespuestaCalculo, o 304 si el cliente ya la tiene
+    """
+    usar_msgpack = acepta_msgpack(request.headers.get("accept"))
+    tipo_contenido = TIPO_MSGPACK if usar_msgpack else "application/json"
+    
+    # Cada representación tiene su propio ETag (y su propia entrada en la caché)
+    etag_solicitud = generar_etag(entrada)
+    etag = etag_solicitud[:-1] + '-mp"' if usar_msgpack else etag_solicitud
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    
+    # El cliente ya tiene este resultado: es una revalidación, no se vuelve a registrar
+    if etag_coincide(etag, request.headers.get("if-none-match")):
+        logger.info("✅ Resultado sin cambios (304)")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+    
+    # Resultado y respuesta ya serializada en caché
+    entrada = cache_respuestas.obtener(etag)
+    if entrada is not None:
+        logger.info("✅ Respuesta obtenida de la caché")
+        resultado, cuerpo = entrada
+    else:
+        # Procesar con el calculador ambiental
+        inicio = time.perf_counter()
+        resultado = await calcular()
+        metricas.observar_etapa(ruta, "calculo", time.perf_counter() - inicio)
+        
+        # Construir y codificar la respuesta sin revalidar con Pydantic
+        # (el calculador ya produce los tipos del modelo RespuestaCalculo)
+        inicio = time.perf_counter()
+        respuesta = construir_respuesta(resultado)
+        cuerpo = codificar_msgpack(respuesta) if usar_msgpack else codificar_json(respuesta)
+        metricas.observar_etapa(ruta, "serializacion", time.perf_counter() - inicio)
+        cache_respuestas.guardar(etag, (resultado, cuerpo))
+        
+        logger.info(f"✅ Cálculo completado: {resultado['resumen_total']['puntos_ecologicos_totales']} puntos totales")
+    
+    if usuario_id is not None:
+        # La escritura en SQLite bloquea: se hace en el pool de hilos, fuera del event loop
+        inicio = time.perf_counter()
+        registro = await run_in_threadpool(
+            libro.registrar, usuario_id, resultado,
+            clave_idempotencia=clave_idempotencia(request, etag_solicitud)
+        )
+        metricas.observar_etapa(ruta, "registro", time.perf_counter() - inicio)
+        if registro is None:
+            logger.info(f"📒 Registro repetido para el usuario {usuario_id}, no se suma de nuevo")
+        else:
+            logger.info(f"📒 Resultado registrado para el usuario {usuario_id}")
+    
+    return Response(content=cuerpo, media_type=tipo_contenido, headers=cabeceras)
 
 
 @app.get("/", tags=["Root"])
@@ -66,7 +316,11 @@ async def health_check():
     return {
         "status": "healthy",
         "modelo_ia": "regresion_lineal",
-        "materiales_entrenados": list(calculador.modelos_peso.keys())
+        "materiales_entrenados": calculador.materiales,
+        "checksum_modelos": calculador.checksum,
+        "cache_calculos": calculador.cache.estadisticas(),
+        "cache_respuestas": cache_respuestas.estadisticas(),
+        "coalescedor": coalescedor.estadisticas() if coalescedor else None
     }
 
 
@@ -87,14 +341,45 @@ async def health_check():
     
     Los cálculos se realizan usando modelos de regresión lineal entrenados
     para predecir el peso según la cantidad de elementos detectados.
-    """
+    
+    Cada detección se calcula por separado y el desglose respeta el orden de entrada
+    (dos entradas del mismo material no se unen, así los puntos no cambian).
+    La respuesta incluye un `ETag`; si el cliente lo envía en `If-None-Match`
+    y el resultado no cambió, se responde `304 Not Modified` sin cuerpo.
+    
+    Acepta y responde MessagePack (`Content-Type` / `Accept: application/msgpack`)
+    con los mismos campos que el JSON, para enlaces de alto volumen entre servicios.
+    
+    Con `?usuario_id=...` el resultado se registra y se suma al impacto acumulado
+    del usuario (ver `/usuarios/{usuario_id}/impacto`). Las respuestas 304 no se registran,
+    y los reintentos con la misma cabecera `Idempotency-Key` se suman una sola vez.
+    Sin esa cabecera cada envío se registra, aunque repita las mismas detecciones.
+    """,
+    openapi_extra={
+        "requestBody": {
+            "content": {TIPO_MSGPACK: {"schema": {"$ref": "#/components/schemas/SolicitudCalculo"}}}
+        },
+        "responses": {
+            "200": {"content": {TIPO_MSGPACK: {"schema": {"$ref": "#/components/schemas/RespuestaCalculo"}}}}
+        }
+    }
 )
-async def calcular_impacto_ambiental(solicitud: SolicitudCalculo):
+async def calcular_impacto_ambiental(
+    solicitud: SolicitudCalculo,
+    request: Request,
+    usuario_id: Optional[str] = Query(
+        None,
+        min_length=1,
+        description="Si se indica, el resultado se suma al impacto acumulado del usuario"
+    )
+):
     """
     Endpoint principal para calcular el impacto ambiental.
     
     Args:
         solicitud: JSON con lista de detecciones (material y cantidad)
+        request: Petición HTTP (para leer If-None-Match)
+        usuario_id: Usuario al que se le registra el resultado (opcional)
     
     Returns:
         JSON con resumen total y desglose por material
@@ -102,10 +387,12 @@ async def calcular_impacto_ambiental(solicitud: SolicitudCalculo):
     Raises:
         HTTPException: Si hay un error en el procesamiento
     """
+    medir_validacion(request, "/calcular-impacto")
+    
     try:
         logger.info(f"📊 Procesando {len(solicitud.detecciones)} detección(es)")
         
-        # Convertir detecciones a formato dict para el calculador
+        # Convertir detecciones a diccionarios (el cálculo se hace sobre las entradas tal como llegan)
         detecciones_dict = [
             {
                 "material": det.material,
@@ -114,23 +401,152 @@ async def calcular_impacto_ambiental(solicitud: SolicitudCalculo):
             for det in solicitud.detecciones
         ]
         
-        # Procesar con el calculador ambiental
-        resultado = calculador.procesar_multiples_detecciones(detecciones_dict)
-        
-        # Construir respuesta estructurada
-        respuesta = RespuestaCalculo(
-            exito=True,
-            mensaje="Cálculo realizado exitosamente",
-            resumen_total=ResumenTotal(**resultado["resumen_total"]),
-            desglose_por_material=[
-                ResultadoMaterial(**item) 
-                for item in resultado["desglose_por_material"]
-            ]
+        return await responder_calculo(
+            detecciones_dict, lambda: calcular_detecciones(detecciones_dict),
+            request, "/calcular-impacto", usuario_id
+        )
+        
+    except ValueError as ve:
+        logger.error(f"❌ Error de validación: {str(ve)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "exito": False,
+                "mensaje": "Material desconocido o datos inválidos",
+                "detalle": str(ve)
+            }
+        )
+    
+    except Exception as e:
+        logger.error(f"❌ Error inesperado: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "exito": False,
+                "mensaje": "Error interno del servidor",
+                "detalle": str(e)
+            }
+        )
+
+
+@app.post(
+    "/calcular-impacto-columnar",
+    response_model=RespuestaCalculo,
+    status_code=status.HTTP_200_OK,
+    tags=["Cálculos Ambientales"],
+    summary="Calcular impacto ambiental con detecciones en formato columnar",
+    description="""
+    Variante de `/calcular-impacto` para listas grandes: recibe dos arreglos paralelos
+    (`materiales` y `cantidades`) que se validan como arreglos completos
+    (materiales permitidos, cantidades entre 1 y el máximo, mismo largo) en lugar de
+    crear un objeto por detección, y se calculan de forma vectorizada.
+    
+    Retorna la misma respuesta (`RespuestaCalculo`, con `ETag`) que `/calcular-impacto`.
+    """
+)
+async def calcular_impacto_columnar(
+    solicitud: SolicitudCalculoColumnar,
+    request: Request,
+    usuario_id: Optional[str] = Query(
+        None,
+        min_length=1,
+        description="Si se indica, el resultado se suma al impacto acumulado del usuario"
+    )
+):
+    """
+    Endpoint para calcular el impacto ambiental con detecciones en columnas.
+    
+    Args:
+        solicitud: JSON con los arreglos de materiales y cantidades
+        request: Petición HTTP (para leer If-None-Match)
+        usuario_id: Usuario al que se le registra el resultado (opcional)
+    
+    Returns:
+        JSON con resumen total y desglose por material
+    
+    Raises:
+        HTTPException: Si hay un error en el procesamiento
+    """
+    medir_validacion(request, "/calcular-impacto-columnar")
+    
+    try:
+        logger.info(f"📊 Procesando {len(solicitud.materiales)} detección(es) en formato columnar")
+        
+        # Las columnas se calculan (y se identifican en el ETag) sin armar un objeto por detección
+        materiales, cantidades = solicitud.materiales, solicitud.cantidades
+        return await responder_calculo(
+            {"materiales": materiales, "cantidades": cantidades},
+            lambda: calcular_columnas(materiales, cantidades),
+            request, "/calcular-impacto-columnar", usuario_id
+        )
+        
+    except ValueError as ve:
+        logger.error(f"❌ Error de validación: {str(ve)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "exito": False,
+                "mensaje": "Material desconocido o datos inválidos",
+                "detalle": str(ve)
+            }
         )
+    
+    except Exception as e:
+        logger.error(f"❌ Error inesperado: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "exito": False,
+                "mensaje": "Error interno del servidor",
+                "detalle": str(e)
+            }
+        )
+
+
+@app.post(
+    "/calcular-impacto-lote",
+    response_model=RespuestaCalculoLote,
+    status_code=status.HTTP_200_OK,
+    tags=["Cálculos Ambientales"],
+    summary="Calcular impacto ambiental de varias solicitudes en una sola petición",
+    description="""
+    Recibe una lista de solicitudes (cada una con su `id` y sus detecciones)
+    y las calcula todas en una sola pasada vectorizada del calculador.
+    
+    Retorna el resultado de cada solicitud con el mismo formato que
+    `/calcular-impacto`, más un resumen total del lote.
+    
+    El cálculo usa enteros de 64 bits, así que ninguna cantidad puede superar
+    1.000.000 (`CANTIDAD_MAXIMA`); si alguna lo hace se responde 422.
+    """
+)
+async def calcular_impacto_lote(lote: SolicitudCalculoLote):
+    """
+    Endpoint para calcular el impacto ambiental de muchas solicitudes a la vez.
+    
+    Args:
+        lote: JSON con la lista de solicitudes identificadas
+    
+    Returns:
+        JSON con el resultado por solicitud y el resumen total
+    
+    Raises:
+        HTTPException: Si hay un error en el procesamiento
+    """
+    try:
+        logger.info(f"📦 Procesando lote de {len(lote.solicitudes)} solicitud(es)")
+        
+        # Convertir cada solicitud a lista de diccionarios
+        resultado = calculador.procesar_multiples_solicitudes([
+            [{"material": det.material, "cantidad": det.cantidad} for det in solicitud.detecciones]
+            for solicitud in lote.solicitudes
+        ])
         
-        logger.info(f"✅ Cálculo completado: {respuesta.resumen_total.puntos_ecologicos_totales} puntos totales")
+        respuesta = construir_respuesta_lote([solicitud.id for solicitud in lote.solicitudes], resultado)
         
-        return respuesta
+        logger.info(f"✅ Lote completado: {resultado['resumen_total']['puntos_ecologicos_totales']} puntos totales")
+        
+        return Response(content=codificar_json(respuesta), media_type="application/json")
         
     except ValueError as ve:
         logger.error(f"❌ Error de validación: {str(ve)}")
@@ -155,18 +571,146 @@ async def calcular_impacto_ambiental(solicitud: SolicitudCalculo):
         )
 
 
+@app.post(
+    "/calcular-impacto-stream",
+    tags=["Cálculos Ambientales"],
+    summary="Calcular impacto ambiental en streaming (NDJSON)",
+    description="""
+    Recibe detecciones en formato NDJSON (un objeto JSON por línea, con
+    `material`, `cantidad` y opcionalmente `id`) y devuelve una línea NDJSON
+    de resultado por cada registro a medida que se calculan.
+    
+    La entrada se procesa por bloques, por lo que la memoria se mantiene
+    constante sin importar el tamaño del archivo. Las líneas inválidas
+    devuelven `{"linea": n, "error": "..."}` sin detener el procesamiento.
+    """,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}}
+        }
+    }
+)
+async def calcular_impacto_stream(request: Request):
+    """
+    Endpoint de streaming para exportaciones grandes de historial de detecciones.
+    
+    Ejemplo: curl -X POST --data-binary @detecciones.ndjson /calcular-impacto-stream
+    """
+    logger.info("🌊 Procesando detecciones en streaming")
+    
+    return RespuestaNDJSON(procesar_flujo_async(request.stream(), calculador))
+
+
+@app.get(
+    "/usuarios/{usuario_id}/impacto",
+    response_model=ImpactoUsuario,
+    tags=["Usuarios"],
+    summary="Impacto ambiental acumulado de un usuario",
+    description="""
+    Retorna los totales acumulados (peso, CO₂, energía y puntos) y el desglose por material
+    de todos los cálculos registrados con `?usuario_id=` en `/calcular-impacto`.
+    Los totales se mantienen al registrar cada cálculo, así la consulta no recorre el historial.
+    """,
+    responses={404: {"model": ErrorRespuesta}}
+)
+async def impacto_usuario(usuario_id: str):
+    """
+    Consulta el impacto acumulado de un usuario.
+    
+    Args:
+        usuario_id: Identificador del usuario
+    
+    Raises:
+        HTTPException: Si el usuario no tiene cálculos registrados
+    """
+    impacto = libro.impacto_usuario(usuario_id)
+    if impacto is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "exito": False,
+                "mensaje": "Usuario sin cálculos registrados",
+                "detalle": usuario_id
+            }
+        )
+    
+    return Response(content=codificar_json(impacto), media_type="application/json")
+
+
+@app.get(
+    "/usuarios/{usuario_id}/rollups",
+    response_model=RollupsUsuario,
+    tags=["Usuarios"],
+    summary="Impacto de un usuario por hora, día, semana o mes",
+    description="""
+    Retorna los totales del usuario por período (del más reciente al más antiguo).
+    Los rollups se actualizan al registrar cada cálculo, sin recorrer el historial.
+    """
+)
+async def rollups_usuario(
+    usuario_id: str,
+    periodo: Literal["hora", "dia", "semana", "mes"] = Query("dia", description="Tipo de período"),
+    limite: int = Query(30, ge=1, le=366, description="Cantidad máxima de períodos")
+):
+    """
+    Consulta los rollups de un usuario.
+    
+    Args:
+        usuario_id: Identificador del usuario
+        periodo: Tipo de período
+        limite: Cantidad máxima de períodos
+    """
+    respuesta = {
+        "usuario_id": usuario_id,
+        "periodo": periodo,
+        "rollups": libro.rollups_usuario(usuario_id, periodo, limite)
+    }
+    return Response(content=codificar_json(respuesta), media_type="application/json")
+
+
+@app.get(
+    "/ranking",
+    response_model=RespuestaRanking,
+    tags=["Usuarios"],
+    summary="Ranking de puntos ecológicos (top-K)",
+    description="""
+    Retorna los K usuarios con más puntos ecológicos en la hora, día, semana o mes
+    que contiene `fecha` (por defecto, el período actual en UTC), o en el total histórico.
+    Se lee desde un índice ordenado por puntos, sin recorrer los registros.
+    """
+)
+async def ranking(
+    periodo: Literal["hora", "dia", "semana", "mes", "total"] = Query("semana", description="Tipo de período"),
+    fecha: Optional[datetime] = Query(None, description="Fecha dentro del período a consultar (ISO 8601)"),
+    limite: int = Query(10, ge=1, le=100, description="Cantidad de posiciones (K)")
+):
+    """
+    Consulta el ranking de puntos ecológicos.
+    
+    Args:
+        periodo: Tipo de período
+        fecha: Fecha dentro del período (por defecto, ahora)
+        limite: Cantidad de posiciones
+    """
+    respuesta = libro.ranking(periodo, fecha, limite)
+    return Response(content=codificar_json(respuesta), media_type="application/json")
+
+
 @app.post(
     "/calcular-simple",
     tags=["Cálculos Ambientales"],
     summary="Cálculo simple para un solo tipo de material",
     description="Endpoint simplificado para calcular métricas de un único material"
 )
-async def calcular_simple(material: str, cantidad: int):
+async def calcular_simple(material: str, cantidad: int, request: Request):
     """
     Endpoint simplificado para un solo material.
     
     Ejemplo: /calcular-simple?material=botella_plastico&cantidad=5
     """
+    medir_validacion(request, "/calcular-simple")
+    
     try:
         # Validar material
         materiales_validos = ["botella_plastico", "botella_vidrio", "lata_aluminio"]
@@ -183,12 +727,18 @@ async def calcular_simple(material: str, cantidad: int):
             )
         
         # Procesar detección
+        inicio = time.perf_counter()
         resultado = calculador.procesar_deteccion(material, cantidad)
+        metricas.observar_etapa("/calcular-simple", "calculo", time.perf_counter() - inicio)
         
-        return {
+        inicio = time.perf_counter()
+        cuerpo = codificar_json({
             "exito": True,
             "resultado": resultado
-        }
+        })
+        metricas.observar_etapa("/calcular-simple", "serializacion", time.perf_counter() - inicio)
+        
+        return Response(content=cuerpo, media_type="application/json")
         
     except Exception as e:
         raise HTTPException(
@@ -197,19 +747,27 @@ async def calcular_simple(material: str, cantidad: int):
         )
 
 
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def exportar_metricas():
+    """Métricas del servicio en formato de texto de Prometheus"""
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/materiales", tags=["Información"])
 async def obtener_materiales_soportados():
     """Obtener información de los materiales soportados y sus factores"""
-    from calculos import PESOS_PROMEDIO, FACTOR_CO2, FACTOR_ENERGIA, PUNTOS_BASE
+    from calculos import PESOS_PROMEDIO
     
+    # Factores de la misma tabla con la que calcula el calculador (la compartida con servidor.py)
     materiales_info = []
     for material in PESOS_PROMEDIO.keys():
+        factores = calculador.coeficientes_material(material)
         materiales_info.append({
             "nombre": material,
             "peso_promedio_gr": PESOS_PROMEDIO[material],
-            "co2_evitado_kg_por_kg": FACTOR_CO2[material],
-            "energia_ahorrada_kwh_por_kg": FACTOR_ENERGIA[material],
-            "puntos_base_por_unidad": PUNTOS_BASE[material]
+            "co2_evitado_kg_por_kg": factores["factor_co2"],
+            "energia_ahorrada_kwh_por_kg": factores["factor_energia"],
+            "puntos_base_por_unidad": factores["puntos_base"]
         })
     
     return {
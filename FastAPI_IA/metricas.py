@@ -0,0 +1,142 @@
+"""
+metricas.py
+Métricas del servicio en formato de texto de Prometheus:
+conteo de peticiones por ruta y estado, histogramas de latencia por ruta
+y tiempos de las etapas internas (validación, cálculo, serialización).
+"""
+
+import time
+from bisect import bisect_left
+
+# Límites superiores (en segundos) de los buckets de los histogramas
+BUCKETS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Etiqueta usada para peticiones que no coinciden con ninguna ruta (evita cardinalidad infinita)
+RUTA_DESCONOCIDA = "sin_ruta"
+
+
+class Histograma:
+    """Histograma acumulativo de observaciones con buckets fijos"""
+
+    def __init__(self, limites=BUCKETS_LATENCIA):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)  # el último bucket es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        """Registra una observación"""
+        self.conteos[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class RegistroMetricas:
+    """Acumula las métricas del servicio y las exporta en formato Prometheus"""
+
+    def __init__(self, prefijo: str = "ecodetect"):
+        self.prefijo = prefijo
+        self.peticiones = {}   # (ruta, metodo, estado) -> cantidad
+        self.latencias = {}    # (ruta, metodo) -> Histograma
+        self.etapas = {}       # (ruta, etapa) -> Histograma
+
+    def registrar_peticion(self, ruta: str, metodo: str, estado: int, segundos: float):
+        """Registra una petición terminada con su código de estado y su latencia"""
+        clave = (ruta, metodo, estado)
+        self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+
+        histograma = self.latencias.get((ruta, metodo))
+        if histograma is None:
+            histograma = self.latencias[(ruta, metodo)] = Histograma()
+        histograma.observar(segundos)
+
+    def observar_etapa(self, ruta: str, etapa: str, segundos: float):
+        """Registra la duración de una etapa interna de un endpoint"""
+        histograma = self.etapas.get((ruta, etapa))
+        if histograma is None:
+            histograma = self.etapas[(ruta, etapa)] = Histograma()
+        histograma.observar(segundos)
+
+    def exportar(self) -> str:
+        """Genera el texto de exposición de Prometheus"""
+        p = self.prefijo
+        lineas = [
+            f"# HELP {p}_peticiones_total Peticiones HTTP atendidas",
+            f"# TYPE {p}_peticiones_total counter"
+        ]
+        for (ruta, metodo, estado), cantidad in sorted(self.peticiones.items()):
+            lineas.append(f'{p}_peticiones_total{{ruta="{ruta}",metodo="{metodo}",estado="{estado}"}} {cantidad}')
+
+        lineas += [
+            f"# HELP {p}_errores_total Peticiones HTTP con estado de error (4xx y 5xx)",
+            f"# TYPE {p}_errores_total counter"
+        ]
+        errores = {}
+        for (ruta, _, estado), cantidad in self.peticiones.items():
+            if estado >= 400:
+                errores[(ruta, estado)] = errores.get((ruta, estado), 0) + cantidad
+        for (ruta, estado), cantidad in sorted(errores.items()):
+            lineas.append(f'{p}_errores_total{{ruta="{ruta}",estado="{estado}"}} {cantidad}')
+
+        lineas += [
+            f"# HELP {p}_latencia_segundos Latencia de las peticiones HTTP por ruta",
+            f"# TYPE {p}_latencia_segundos histogram"
+        ]
+        for (ruta, metodo), histograma in sorted(self.latencias.items()):
+            lineas += _lineas_histograma(f"{p}_latencia_segundos", f'ruta="{ruta}",metodo="{metodo}"', histograma)
+
+        lineas += [
+            f"# HELP {p}_etapa_segundos Duración de las etapas internas de los endpoints",
+            f"# TYPE {p}_etapa_segundos histogram"
+        ]
+        for (ruta, etapa), histograma in sorted(self.etapas.items()):
+            lineas += _lineas_histograma(f"{p}_etapa_segundos", f'ruta="{ruta}",etapa="{etapa}"', histograma)
+
+        return "\n".join(lineas) + "\n"
+
+
+def _lineas_histograma(nombre: str, etiquetas: str, histograma: Histograma) -> list:
+    """Convierte un histograma en sus líneas _bucket (acumuladas), _sum y _count"""
+    lineas = []
+    acumulado = 0
+    for limite, conteo in zip(histograma.limites + (float("inf"),), histograma.conteos):
+        acumulado += conteo
+        le = "+Inf" if limite == float("inf") else repr(limite)
+        lineas.append(f'{nombre}_bucket{{{etiquetas},le="{le}"}} {acumulado}')
+    lineas.append(f"{nombre}_sum{{{etiquetas}}} {histograma.suma}")
+    lineas.append(f"{nombre}_count{{{etiquetas}}} {histograma.total}")
+    return lineas
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mide cada petición HTTP.
+    Guarda el instante de inicio en request.state.inicio_peticion para que
+    los endpoints puedan medir la etapa de validación.
+    """
+
+    def __init__(self, app, registro: RegistroMetricas):
+        self.app = app
+        self.registro = registro
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        scope.setdefault("state", {})["inicio_peticion"] = inicio
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # La ruta se toma de la plantilla que resolvió el router (no de la URL concreta)
+            ruta = getattr(scope.get("route"), "path", None) or RUTA_DESCONOCIDA
+            self.registro.registrar_peticion(ruta, scope["method"], estado, time.perf_counter() - inicio)
@@ -4,10 +4,13 @@ Define la estructura de los JSON que va a recibir y enviar
 """
 
 from pydantic import BaseModel, Field, validator
-from typing import List, Literal
+from typing import List, Literal, Optional, get_args
+
+from calculos import CANTIDAD_MAXIMA
 
 # Tipos de materiales permitidos
 TipoMaterial = Literal["botella_plastico", "botella_vidrio", "lata_aluminio"]
+MATERIALES_PERMITIDOS = frozenset(get_args(TipoMaterial))
 
 class DeteccionMaterial(BaseModel):
     """Modelo para una detección individual de material"""
@@ -49,6 +52,78 @@ class SolicitudCalculo(BaseModel):
         return v
 
 
+class SolicitudCalculoColumnar(BaseModel):
+    """
+    Solicitud de cálculo en formato columnar (arreglos paralelos).
+    Se valida por arreglo completo en lugar de crear un objeto por detección.
+    """
+    materiales: List[str] = Field(
+        ...,
+        min_items=1,
+        description="Material de cada detección",
+        examples=[["botella_plastico", "lata_aluminio", "botella_plastico"]]
+    )
+    cantidades: List[int] = Field(
+        ...,
+        min_items=1,
+        description=f"Cantidad de cada detección (mismo largo que materiales, entre 1 y {CANTIDAD_MAXIMA})",
+        examples=[[3, 2, 1]]
+    )
+    
+    @validator('materiales')
+    def validar_materiales_permitidos(cls, v):
+        desconocidos = set(v) - MATERIALES_PERMITIDOS
+        if desconocidos:
+            raise ValueError(
+                f"Materiales no permitidos: {sorted(desconocidos)}. Opciones: {sorted(MATERIALES_PERMITIDOS)}"
+            )
+        return v
+    
+    @validator('cantidades')
+    def validar_cantidades(cls, v, values):
+        if min(v) <= 0:
+            raise ValueError('Todas las cantidades deben ser mayores a 0')
+        if max(v) > CANTIDAD_MAXIMA:
+            raise ValueError(f'Ninguna cantidad puede superar {CANTIDAD_MAXIMA}')
+        if 'materiales' in values and len(v) != len(values['materiales']):
+            raise ValueError('materiales y cantidades deben tener la misma longitud')
+        return v
+
+
+class SolicitudCalculoIdentificada(SolicitudCalculo):
+    """Solicitud de cálculo con identificador, usada dentro de un lote"""
+    id: str = Field(
+        ...,
+        min_length=1,
+        description="Identificador de la solicitud (por ejemplo, el ID del análisis)",
+        examples=["analisis-001"]
+    )
+
+
+class SolicitudCalculoLote(BaseModel):
+    """Modelo para calcular varias solicitudes en una sola petición"""
+    solicitudes: List[SolicitudCalculoIdentificada] = Field(
+        ...,
+        min_items=1,
+        description="Lista de solicitudes de cálculo, cada una con su identificador",
+        examples=[[
+            {"id": "analisis-001", "detecciones": [{"material": "botella_plastico", "cantidad": 3}]},
+            {"id": "analisis-002", "detecciones": [{"material": "lata_aluminio", "cantidad": 2}]}
+        ]]
+    )
+    
+    @validator('solicitudes')
+    def validar_cantidades_maximas(cls, v):
+        # El lote se calcula con arreglos int64: las cantidades se acotan aquí,
+        # no en DeteccionMaterial, para no cambiar lo que acepta /calcular-impacto
+        for solicitud in v:
+            if any(det.cantidad > CANTIDAD_MAXIMA for det in solicitud.detecciones):
+                raise ValueError(
+                    f'La solicitud {solicitud.id} tiene una cantidad mayor a {CANTIDAD_MAXIMA}'
+                )
+        return v
+
+
 class ResultadoMaterial(BaseModel):
     """Resultado del cálculo para un material específico"""
     material: str = Field(..., description="Tipo de material")
@@ -75,8 +150,67 @@ class RespuestaCalculo(BaseModel):
     desglose_por_material: List[ResultadoMaterial] = Field(..., description="Detalle por cada material")
 
 
+class ResultadoSolicitud(RespuestaCalculo):
+    """Respuesta del cálculo de una solicitud dentro de un lote"""
+    id: str = Field(..., description="Identificador de la solicitud")
+
+
+class RespuestaCalculoLote(BaseModel):
+    """Respuesta del cálculo ambiental por lotes"""
+    exito: bool = Field(default=True, description="Indica si el cálculo fue exitoso")
+    mensaje: str = Field(default="Cálculo por lote realizado exitosamente", description="Mensaje informativo")
+    total_solicitudes: int = Field(..., description="Cantidad de solicitudes procesadas")
+    resumen_total: ResumenTotal = Field(..., description="Resumen consolidado de todas las solicitudes")
+    resultados: List[ResultadoSolicitud] = Field(..., description="Resultado de cada solicitud")
+
+
+class ImpactoUsuario(BaseModel):
+    """Impacto acumulado de un usuario (todos sus cálculos registrados)"""
+    usuario_id: str = Field(..., description="Identificador del usuario")
+    registros: int = Field(..., description="Cantidad de cálculos registrados")
+    primer_registro: str = Field(..., description="Fecha del primer cálculo (ISO 8601, UTC)")
+    ultimo_registro: str = Field(..., description="Fecha del último cálculo (ISO 8601, UTC)")
+    resumen_total: ResumenTotal = Field(..., description="Totales acumulados")
+    desglose_por_material: List[ResultadoMaterial] = Field(..., description="Totales acumulados por material")
+
+
+class PosicionRanking(BaseModel):
+    """Posición de un usuario en el ranking de puntos ecológicos"""
+    posicion: int = Field(..., description="Posición en el ranking (desde 1)")
+    usuario_id: str = Field(..., description="Identificador del usuario")
+    registros: int = Field(..., description="Cálculos registrados en el período")
+    peso_total_gramos: float = Field(..., description="Peso total en gramos")
+    co2_total_evitado_kg: float = Field(..., description="CO2 total evitado en kg")
+    energia_total_ahorrada_kwh: float = Field(..., description="Energía total ahorrada en kWh")
+    puntos_ecologicos_totales: int = Field(..., description="Puntos ecológicos del período")
+
+
+class RespuestaRanking(BaseModel):
+    """Ranking (top-K) de puntos ecológicos en un período"""
+    periodo: str = Field(..., description="Tipo de período (hora, dia, semana, mes o total)")
+    inicio: Optional[str] = Field(None, description="Inicio del período en UTC (null para el total histórico)")
+    posiciones: List[PosicionRanking] = Field(..., description="Usuarios ordenados por puntos")
+
+
+class RollupPeriodo(BaseModel):
+    """Totales de un usuario en un período"""
+    inicio: str = Field(..., description="Inicio del período en UTC")
+    registros: int = Field(..., description="Cálculos registrados en el período")
+    peso_total_gramos: float = Field(..., description="Peso total en gramos")
+    co2_total_evitado_kg: float = Field(..., description="CO2 total evitado en kg")
+    energia_total_ahorrada_kwh: float = Field(..., description="Energía total ahorrada en kWh")
+    puntos_ecologicos_totales: int = Field(..., description="Puntos ecológicos del período")
+
+
+class RollupsUsuario(BaseModel):
+    """Totales de un usuario por período, del más reciente al más antiguo"""
+    usuario_id: str = Field(..., description="Identificador del usuario")
+    periodo: str = Field(..., description="Tipo de período (hora, dia, semana o mes)")
+    rollups: List[RollupPeriodo] = Field(..., description="Totales de cada período")
+
+
 class ErrorRespuesta(BaseModel):
     """Modelo para respuestas de error"""
     exito: bool = Field(default=False)
     mensaje: str = Field(..., description="Descripción del error")
-    detalle: str = Field(default="", description="Detalle adicional del error")
\ No newline at end of file
+    detalle: str = Field(default="", description="Detalle adicional del error")
@@ -0,0 +1,53 @@
+"""
+negociacion.py
+Soporte de peticiones MessagePack en las rutas de FastAPI.
+FastAPI solo interpreta cuerpos JSON, así que la ruta personalizada decodifica
+los cuerpos application/msgpack y los entrega a la validación de Pydantic como si
+fueran JSON (mismos modelos, mismos errores 422).
+"""
+
+from fastapi import HTTPException, Request, status
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+
+from serializacion import decodificar_msgpack, es_msgpack, msgpack
+
+
+class PeticionMsgpack(Request):
+    """Petición con cuerpo MessagePack que se presenta a FastAPI como JSON"""
+
+    @property
+    def headers(self):
+        if not hasattr(self, "_cabeceras_json"):
+            cabeceras = MutableHeaders(scope=dict(self.scope, headers=list(self.scope["headers"])))
+            cabeceras["content-type"] = "application/json"
+            self._cabeceras_json = cabeceras
+        return self._cabeceras_json
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = decodificar_msgpack(await self.body())
+        return self._json
+
+
+class RutaMsgpack(APIRoute):
+    """Ruta que acepta cuerpos JSON o MessagePack según Content-Type"""
+
+    def get_route_handler(self):
+        manejador_original = super().get_route_handler()
+
+        async def manejador(request: Request):
+            if es_msgpack(request.headers.get("content-type")):
+                if msgpack is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                        detail={
+                            "exito": False,
+                            "mensaje": "MessagePack no disponible en el servidor",
+                            "detalle": "Instale msgpack o envíe la solicitud en JSON"
+                        }
+                    )
+                request = PeticionMsgpack(request.scope, request.receive)
+            return await manejador_original(request)
+
+        return manejador
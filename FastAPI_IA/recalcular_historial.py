@@ -0,0 +1,300 @@
+"""
+recalcular_historial.py
+Recalcula registros históricos de detecciones después de cambiar los factores
+(FACTOR_CO2, FACTOR_ENERGIA, PUNTOS_BASE) en calculos.py.
+
+Lee el archivo de entrada (JSONL o CSV) por bloques, calcula cada bloque de forma
+vectorizada con CalculadorAmbiental.procesar_lote en varios procesos y escribe los
+resultados en el mismo orden de entrada. Después de escribir cada bloque guarda un
+checkpoint, así una ejecución interrumpida se puede reanudar con --reanudar.
+
+Uso:
+    python recalcular_historial.py historial.jsonl --salida recalculado.jsonl
+    python recalcular_historial.py historial.csv --salida recalculado.csv --procesos 8
+    python recalcular_historial.py historial.csv --salida recalculado.csv --reanudar
+
+Cada registro JSONL: {"id": "opcional", "material": "botella_plastico", "cantidad": 3}
+El CSV debe tener las columnas material y cantidad (las demás columnas se conservan).
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import get_context
+from pathlib import Path
+
+from calculos import CANTIDAD_MAXIMA, MATERIALES, cargar_calculador, version_factores
+from calculos_ndjson import TAMANO_BLOQUE, procesar_bloque
+
+# Columnas que se agregan a cada fila del CSV de salida
+COLUMNAS_RESULTADO = ("peso_estimado_gramos", "co2_evitado_kg", "energia_ahorrada_kwh", "puntos_ecologicos", "error")
+
+# Segundos entre cada reporte de avance
+INTERVALO_REPORTE = 5.0
+
+# Calculador de cada proceso trabajador (se carga una vez en _iniciar_trabajador)
+_calculador = None
+
+
+def _iniciar_trabajador():
+    """Carga el calculador en el proceso trabajador (sin caché: cada fila se calcula en el lote)"""
+    global _calculador
+    _calculador = cargar_calculador(tamano_cache=0)
+
+
+def detectar_formato(ruta: str) -> str:
+    """Formato del archivo según su extensión ('csv' o 'jsonl')"""
+    return "csv" if Path(ruta).suffix.lower() == ".csv" else "jsonl"
+
+
+def agrupar_en_bloques(filas, tamano_bloque: int):
+    """
+    Agrupa un iterable de filas en bloques, leyendo la entrada de forma incremental.
+
+    Args:
+        filas: Iterable de tuplas (numero_linea, fila)
+        tamano_bloque: Filas por bloque
+
+    Yields:
+        Listas de hasta tamano_bloque filas
+    """
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) >= tamano_bloque:
+            yield bloque
+            bloque = []
+
+    if bloque:
+        yield bloque
+
+
+def recalcular_bloque_csv(calculador, filas: list, columnas: list) -> str:
+    """
+    Recalcula un bloque de filas CSV.
+
+    Args:
+        calculador: Instancia de CalculadorAmbiental
+        filas: Lista de tuplas (numero_linea, fila como diccionario)
+        columnas: Columnas del CSV de salida
+
+    Returns:
+        Texto CSV del bloque (sin encabezado)
+    """
+    validas = []
+    errores = {}
+    for posicion, (numero, fila) in enumerate(filas):
+        material = fila.get("material")
+        try:
+            cantidad = int(fila.get("cantidad"))
+        except (TypeError, ValueError):
+            cantidad = 0
+
+        if material not in MATERIALES:
+            errores[posicion] = f"Material desconocido: {material}"
+        elif cantidad <= 0:
+            errores[posicion] = "La cantidad debe ser un entero mayor a 0"
+        elif cantidad > CANTIDAD_MAXIMA:
+            # Mismo límite que parsear_registro: el lote se calcula con enteros de 64 bits
+            errores[posicion] = f"La cantidad no puede superar {CANTIDAD_MAXIMA}"
+        else:
+            validas.append((posicion, material, cantidad))
+
+    columnas_lote = {}
+    if validas:
+        lote = calculador.procesar_lote(
+            [material for _, material, _ in validas],
+            [cantidad for _, _, cantidad in validas]
+        )
+        columnas_lote = {clave: valores.tolist() for clave, valores in lote.items()}
+
+    salida = io.StringIO()
+    escritor = csv.DictWriter(salida, fieldnames=columnas, extrasaction="ignore", lineterminator="\n")
+    j = 0
+    for posicion, (numero, fila) in enumerate(filas):
+        fila = dict(fila)
+        if posicion in errores:
+            fila.update({columna: "" for columna in COLUMNAS_RESULTADO})
+            fila["error"] = f"línea {numero}: {errores[posicion]}"
+        else:
+            for columna in COLUMNAS_RESULTADO[:-1]:
+                fila[columna] = columnas_lote[columna][j]
+            fila["error"] = ""
+            j += 1
+        escritor.writerow(fila)
+
+    return salida.getvalue()
+
+
+def _recalcular(tarea):
+    """Trabajo de cada proceso: recalcula un bloque y retorna su texto de salida"""
+    formato, filas, columnas = tarea
+    if formato == "csv":
+        return recalcular_bloque_csv(_calculador, filas, columnas), len(filas)
+    return "".join(procesar_bloque(_calculador, filas)), len(filas)
+
+
+def cargar_checkpoint(ruta: Path) -> dict:
+    """Lee el checkpoint (None si no existe)"""
+    if not ruta.exists():
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_checkpoint(ruta: Path, estado: dict):
+    """Guarda el checkpoint de forma atómica (archivo temporal + reemplazo)"""
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def _escribir_bloque(pendiente, salida, estado: dict, ruta_checkpoint: Path) -> int:
+    """Espera un bloque en vuelo, lo escribe y actualiza el checkpoint"""
+    texto, filas = pendiente.get()
+    salida.write(texto)
+    salida.flush()
+    os.fsync(salida.fileno())
+
+    estado["bloques"] += 1
+    estado["filas"] += filas
+    estado["bytes_salida"] = salida.tell()
+    guardar_checkpoint(ruta_checkpoint, estado)
+    return filas
+
+
+def _reportar(filas_sesion: int, segundos: float, estado: dict):
+    """Muestra el avance y la velocidad de la sesión actual"""
+    velocidad = filas_sesion / segundos if segundos > 0 else 0.0
+    print(f"⏱️  {estado['filas']:,} filas recalculadas ({velocidad:,.0f} filas/s)", flush=True)
+
+
+def recalcular(ruta_entrada: str, ruta_salida: str, procesos: int, tamano_bloque: int = TAMANO_BLOQUE,
+               reanudar: bool = False) -> dict:
+    """
+    Recalcula todo el archivo de entrada y escribe los resultados.
+
+    Args:
+        ruta_entrada: Archivo JSONL o CSV con los registros históricos
+        ruta_salida: Archivo de resultados (mismo formato que la entrada)
+        procesos: Cantidad de procesos de cálculo
+        tamano_bloque: Filas por bloque
+        reanudar: Continuar desde el checkpoint de una ejecución anterior
+
+    Returns:
+        Estado final (bloques y filas recalculados)
+
+    Raises:
+        ValueError: Si el checkpoint no corresponde a esta entrada o a los factores actuales,
+                    o si el CSV no tiene las columnas material y cantidad
+    """
+    formato = detectar_formato(ruta_entrada)
+    ruta_checkpoint = Path(ruta_salida + ".checkpoint.json")
+    version = version_factores()
+
+    estado = cargar_checkpoint(ruta_checkpoint) if reanudar else None
+    if estado is not None:
+        if estado["entrada"] != str(Path(ruta_entrada).resolve()) or estado["tamano_bloque"] != tamano_bloque:
+            raise ValueError("El checkpoint corresponde a otra entrada o a otro tamaño de bloque")
+        if estado["version_factores"] != version:
+            raise ValueError("Los factores cambiaron desde el checkpoint, es necesario recalcular desde el inicio")
+        print(f"↩️  Reanudando desde el bloque {estado['bloques']} ({estado['filas']:,} filas ya recalculadas)")
+    else:
+        estado = {
+            "entrada": str(Path(ruta_entrada).resolve()),
+            "tamano_bloque": tamano_bloque,
+            "version_factores": version,
+            "bloques": 0,
+            "filas": 0,
+            "bytes_salida": 0
+        }
+
+    with open(ruta_entrada, encoding="utf-8", newline="") as entrada, \
+            open(ruta_salida, "a" if estado["bloques"] else "w", encoding="utf-8", newline="") as salida:
+        # Descartar lo escrito después del último checkpoint (un bloque a medio escribir)
+        salida.truncate(estado["bytes_salida"])
+
+        columnas = None
+        if formato == "csv":
+            lector = csv.DictReader(entrada)
+            columnas_entrada = lector.fieldnames or []
+            if "material" not in columnas_entrada or "cantidad" not in columnas_entrada:
+                raise ValueError("El CSV debe tener las columnas material y cantidad")
+            columnas = columnas_entrada + [c for c in COLUMNAS_RESULTADO if c not in columnas_entrada]
+            filas = ((lector.line_num, fila) for fila in lector)
+            if estado["bloques"] == 0:
+                csv.writer(salida, lineterminator="\n").writerow(columnas)
+        else:
+            filas = (
+                (numero, linea.strip())
+                for numero, linea in enumerate(entrada, 1)
+                if linea.strip()
+            )
+
+        bloques = agrupar_en_bloques(filas, tamano_bloque)
+
+        # Saltar los bloques ya recalculados (se leen pero no se calculan)
+        for _ in range(estado["bloques"]):
+            next(bloques, None)
+
+        filas_sesion = 0
+        inicio = ultimo_reporte = time.perf_counter()
+
+        with get_context("spawn").Pool(procesos, initializer=_iniciar_trabajador) as pool:
+            # Ventana acotada de bloques en vuelo: la memoria no depende del tamaño de la entrada
+            en_vuelo = deque()
+            for bloque in bloques:
+                en_vuelo.append(pool.apply_async(_recalcular, ((formato, bloque, columnas),)))
+                if len(en_vuelo) >= procesos * 2:
+                    filas_sesion += _escribir_bloque(en_vuelo.popleft(), salida, estado, ruta_checkpoint)
+
+                if time.perf_counter() - ultimo_reporte >= INTERVALO_REPORTE:
+                    ultimo_reporte = time.perf_counter()
+                    _reportar(filas_sesion, ultimo_reporte - inicio, estado)
+
+            while en_vuelo:
+                filas_sesion += _escribir_bloque(en_vuelo.popleft(), salida, estado, ruta_checkpoint)
+
+        _reportar(filas_sesion, time.perf_counter() - inicio, estado)
+
+    # Terminado: el checkpoint ya no hace falta
+    ruta_checkpoint.unlink(missing_ok=True)
+    return estado
+
+
+def main():
+    """Función principal de la CLI"""
+    parser = argparse.ArgumentParser(
+        description="Recalcula registros históricos de detecciones con los factores actuales"
+    )
+    parser.add_argument("entrada", help="Archivo JSONL o CSV con los registros históricos")
+    parser.add_argument("--salida", help="Archivo de resultados (por defecto <entrada>_recalculado.<ext>)")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1,
+                        help="Procesos de cálculo (por defecto uno por núcleo)")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE,
+                        help=f"Registros por bloque de cálculo (por defecto {TAMANO_BLOQUE})")
+    parser.add_argument("--reanudar", action="store_true",
+                        help="Continuar desde el checkpoint de una ejecución interrumpida")
+    args = parser.parse_args()
+
+    entrada = Path(args.entrada)
+    salida = args.salida or str(entrada.with_name(f"{entrada.stem}_recalculado{entrada.suffix}"))
+
+    print(f"🔁 Recalculando {entrada} -> {salida} ({args.procesos} procesos, factores {version_factores()})")
+    try:
+        estado = recalcular(str(entrada), salida, args.procesos, args.tamano_bloque, args.reanudar)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"✅ {estado['filas']:,} filas recalculadas en {estado['bloques']} bloques: {salida}")
+
+
+if __name__ == "__main__":
+    main()
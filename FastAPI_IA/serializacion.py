@@ -0,0 +1,151 @@
+"""
+serializacion.py
+Construcción y codificación rápida de las respuestas de cálculo.
+Arma directamente los diccionarios con la forma de los modelos de modelos.py
+(sin instanciar ni revalidar objetos Pydantic) y los codifica con orjson si está instalado.
+También codifica y decodifica MessagePack (formato binario compacto) si msgpack está instalado.
+El esquema OpenAPI sigue definido por los response_model de main.py.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa json de la librería estándar
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional: sin él solo se habla JSON
+    msgpack = None
+
+MENSAJE_EXITO = "Cálculo realizado exitosamente"
+MENSAJE_EXITO_LOTE = "Cálculo por lote realizado exitosamente"
+
+# Tipo de contenido MessagePack (se aceptan también los alias usados por otros clientes)
+TIPO_MSGPACK = "application/msgpack"
+TIPOS_MSGPACK = frozenset({TIPO_MSGPACK, "application/x-msgpack", "application/vnd.msgpack"})
+
+
+def construir_respuesta(resultado: dict, mensaje: str = MENSAJE_EXITO) -> dict:
+    """
+    Arma una respuesta con la forma de RespuestaCalculo.
+
+    Args:
+        resultado: Salida de CalculadorAmbiental.procesar_multiples_detecciones
+
+    Returns:
+        Diccionario listo para codificar
+    """
+    return {
+        "exito": True,
+        "mensaje": mensaje,
+        "resumen_total": resultado["resumen_total"],
+        "desglose_por_material": resultado["desglose_por_material"]
+    }
+
+
+def construir_respuesta_lote(ids: list, resultado: dict) -> dict:
+    """
+    Arma una respuesta con la forma de RespuestaCalculoLote.
+
+    Args:
+        ids: Identificadores de las solicitudes, en el mismo orden que los resultados
+        resultado: Salida de CalculadorAmbiental.procesar_multiples_solicitudes
+
+    Returns:
+        Diccionario listo para codificar
+    """
+    resultados = []
+    for id_solicitud, item in zip(ids, resultado["resultados"]):
+        respuesta = construir_respuesta(item)
+        respuesta["id"] = id_solicitud
+        resultados.append(respuesta)
+
+    return {
+        "exito": True,
+        "mensaje": MENSAJE_EXITO_LOTE,
+        "total_solicitudes": len(resultados),
+        "resumen_total": resultado["resumen_total"],
+        "resultados": resultados
+    }
+
+
+def codificar_json(datos) -> bytes:
+    """
+    Codifica a JSON UTF-8 compacto (orjson si está disponible).
+    Lo que orjson no soporta (por ejemplo enteros de más de 64 bits) se codifica con json.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(datos)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def codificar_msgpack(datos) -> bytes:
+    """Codifica a MessagePack (los float se guardan en 64 bits, sin perder precisión)"""
+    return msgpack.packb(datos, use_bin_type=True)
+
+
+def decodificar_msgpack(cuerpo: bytes):
+    """
+    Decodifica un cuerpo MessagePack.
+
+    Raises:
+        ValueError: Si el cuerpo no es MessagePack válido
+    """
+    try:
+        return msgpack.unpackb(cuerpo, raw=False)
+    except Exception as e:
+        raise ValueError(f"MessagePack inválido: {e}")
+
+
+def es_msgpack(tipo_contenido: str) -> bool:
+    """Verifica si una cabecera Content-Type corresponde a MessagePack"""
+    if not tipo_contenido:
+        return False
+    return tipo_contenido.split(";", 1)[0].strip().lower() in TIPOS_MSGPACK
+
+
+def _calidades_accept(accept: str) -> dict:
+    """
+    Convierte la cabecera Accept en {tipo: q}. Un q ausente vale 1 y uno
+    inválido se toma como 0 (rechazado).
+    """
+    calidades = {}
+    for rango in accept.split(","):
+        tipo, *parametros = rango.split(";")
+        tipo = tipo.strip().lower()
+        if not tipo:
+            continue
+        calidad = 1.0
+        for parametro in parametros:
+            nombre, _, valor = parametro.strip().partition("=")
+            if nombre.strip().lower() == "q":
+                try:
+                    calidad = float(valor)
+                except ValueError:
+                    calidad = 0.0
+        calidades[tipo] = max(calidad, calidades.get(tipo, 0.0))
+    return calidades
+
+
+def acepta_msgpack(accept: str) -> bool:
+    """
+    Verifica si la cabecera Accept prefiere MessagePack (y msgpack está instalado).
+    Se compara el q de msgpack con el de JSON (application/json, o si no aparece,
+    application/* o */*): se elige msgpack solo si su q es mayor que 0 y no menor
+    que el de JSON. Así "application/json, application/msgpack;q=0.1" sigue en JSON.
+    """
+    if msgpack is None or not accept:
+        return False
+
+    calidades = _calidades_accept(accept)
+    calidad_msgpack = max((calidades.get(tipo, 0.0) for tipo in TIPOS_MSGPACK), default=0.0)
+    calidad_json = next(
+        (calidades[tipo] for tipo in ("application/json", "application/*", "*/*") if tipo in calidades),
+        0.0
+    )
+    return calidad_msgpack > 0 and calidad_msgpack >= calidad_json
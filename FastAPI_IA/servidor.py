@@ -0,0 +1,77 @@
+"""
+servidor.py
+Lanzador de producción del microservicio con varios workers de uvicorn.
+
+El proceso principal carga el artefacto una sola vez y publica la tabla de
+coeficientes y factores en memoria compartida; cada worker la usa en modo solo
+lectura. Todos los workers atienden el mismo socket.
+
+Señales (en el proceso principal):
+    SIGHUP         reinicio escalonado: cada worker se reemplaza por uno nuevo
+                   que ya está listo antes de detener el anterior
+    SIGTTIN/SIGTTOU  agrega o quita un worker
+    SIGINT/SIGTERM   detiene todos los workers y libera la memoria compartida
+
+Los workers que terminan de forma inesperada se vuelven a iniciar.
+Si el artefacto cambia (reentrenamiento), se debe reiniciar el proceso principal.
+
+Uso:
+    python servidor.py --workers 4 --port 8000
+"""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+
+import uvicorn
+
+from calculos import cargar_calculador
+from tabla_compartida import publicar_tabla
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DIRECTORIO = Path(__file__).resolve().parent
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Servidor multi-proceso del microservicio de cálculo ambiental")
+    parser.add_argument("--host", default="0.0.0.0", help="Dirección de escucha (por defecto 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=8000, help="Puerto de escucha (por defecto 8000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Cantidad de workers (por defecto uno por núcleo)")
+    parser.add_argument("--log-level", default="info", help="Nivel de log de uvicorn")
+    args = parser.parse_args()
+    
+    # Cargar y validar el artefacto una sola vez para todos los workers
+    calculador = cargar_calculador(tamano_cache=0)
+    segmento = publicar_tabla(calculador.tabla_coeficientes)
+    
+    # Los workers (procesos spawn) heredan estas variables y se adjuntan a la tabla en el lifespan
+    os.environ["TABLA_COMPARTIDA"] = segmento.name
+    os.environ["CHECKSUM_MODELOS"] = calculador.checksum
+    logger.info(
+        f"🧮 Tabla de coeficientes publicada en memoria compartida ({segmento.name}, "
+        f"artefacto {calculador.checksum[:12]})"
+    )
+    
+    try:
+        logger.info(f"🚀 Iniciando {args.workers} worker(s) en {args.host}:{args.port}...")
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            app_dir=str(DIRECTORIO),
+            log_level=args.log_level
+        )
+    finally:
+        segmento.close()
+        segmento.unlink()
+        logger.info("🧹 Memoria compartida liberada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+tabla_compartida.py
+Publica la tabla compilada de coeficientes y factores en un segmento de memoria
+compartida, para que todos los workers de servidor.py la usen en modo solo lectura
+en lugar de cargar y validar el artefacto cada uno por su cuenta.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from calculos import COLUMNAS_TABLA, MATERIALES
+
+# Forma y tipo fijos de la tabla (una fila por material, ver COLUMNAS_TABLA)
+FORMA_TABLA = (len(MATERIALES), len(COLUMNAS_TABLA))
+TIPO_TABLA = np.float64
+
+
+def publicar_tabla(tabla: np.ndarray) -> shared_memory.SharedMemory:
+    """
+    Copia la tabla de coeficientes a un segmento nuevo de memoria compartida.
+    El proceso que la publica es el dueño: debe llamar a close() y unlink() al terminar.
+    
+    Args:
+        tabla: Tabla compilada del calculador (CalculadorAmbiental.tabla_coeficientes)
+    
+    Returns:
+        Segmento de memoria compartida (su nombre se pasa a los workers)
+    """
+    tabla = np.ascontiguousarray(tabla, dtype=TIPO_TABLA)
+    if tabla.shape != FORMA_TABLA:
+        raise ValueError(f"Forma de tabla inválida: {tabla.shape} (se esperaba {FORMA_TABLA})")
+    
+    segmento = shared_memory.SharedMemory(create=True, size=tabla.nbytes)
+    np.ndarray(FORMA_TABLA, dtype=TIPO_TABLA, buffer=segmento.buf)[:] = tabla
+    return segmento
+
+
+def adjuntar_tabla(nombre: str):
+    """
+    Abre un segmento publicado por publicar_tabla y lo expone como arreglo de solo lectura.
+    
+    Args:
+        nombre: Nombre del segmento de memoria compartida
+    
+    Returns:
+        Tupla (segmento, tabla). Se debe conservar la referencia al segmento
+        mientras se use la tabla.
+    
+    Raises:
+        FileNotFoundError: Si el segmento no existe
+    """
+    # Los workers de servidor.py comparten el resource_tracker del proceso principal,
+    # así que adjuntarse no agrega un dueño nuevo: el segmento solo se libera
+    # cuando el proceso que lo publicó llama a unlink()
+    segmento = shared_memory.SharedMemory(name=nombre)
+    
+    tabla = np.ndarray(FORMA_TABLA, dtype=TIPO_TABLA, buffer=segmento.buf)
+    tabla.flags.writeable = False
+    return segmento, tabla
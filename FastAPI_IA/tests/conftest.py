@@ -0,0 +1,79 @@
+"""
+conftest.py
+Fixtures compartidas por las pruebas del microservicio.
+Los módulos del servicio están en el directorio padre (se importan como en main.py).
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main  # noqa: E402
+from calculos import FACTOR_CO2, FACTOR_ENERGIA, MATERIALES, PUNTOS_BASE, cargar_calculador  # noqa: E402
+
+
+def detecciones_aleatorias(semilla: int, cantidad: int = 50) -> list:
+    """Lista reproducible de detecciones con materiales y cantidades (1 a 500) al azar"""
+    generador = random.Random(semilla)
+    return [
+        {"material": generador.choice(MATERIALES), "cantidad": generador.randint(1, 500)}
+        for _ in range(cantidad)
+    ]
+
+
+def calcular_referencia(calculador, detecciones: list) -> dict:
+    """
+    Cálculo original de procesar_multiples_detecciones (antes de la tabla compilada,
+    las cachés y la vectorización): predicción de la regresión en float64 de NumPy,
+    round() por detección y totales acumulados en el orden de entrada.
+    """
+    desglose = []
+    for deteccion in detecciones:
+        material, cantidad = deteccion["material"], deteccion["cantidad"]
+        coeficiente, intercepto = calculador.coeficientes[material]
+        peso = round(np.float64(cantidad) * np.float64(coeficiente) + np.float64(intercepto), 2)
+        desglose.append({
+            "material": material,
+            "cantidad": cantidad,
+            "peso_estimado_gramos": peso,
+            "co2_evitado_kg": round(peso / 1000 * FACTOR_CO2[material], 3),
+            "energia_ahorrada_kwh": round(peso / 1000 * FACTOR_ENERGIA[material], 3),
+            "puntos_ecologicos": max(PUNTOS_BASE[material] * cantidad + int(peso / 100), cantidad)
+        })
+
+    return {
+        "resumen_total": {
+            "peso_total_gramos": round(sum(item["peso_estimado_gramos"] for item in desglose), 2),
+            "co2_total_evitado_kg": round(sum(item["co2_evitado_kg"] for item in desglose), 3),
+            "energia_total_ahorrada_kwh": round(sum(item["energia_ahorrada_kwh"] for item in desglose), 3),
+            "puntos_ecologicos_totales": sum(item["puntos_ecologicos"] for item in desglose)
+        },
+        "desglose_por_material": desglose
+    }
+
+
+@pytest.fixture(scope="session")
+def calculador():
+    """Calculador cargado desde el artefacto del repositorio"""
+    return cargar_calculador()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def cliente(tmp_path, monkeypatch):
+    """Cliente HTTP contra la aplicación (con su lifespan) y un libro de impacto temporal"""
+    monkeypatch.setenv("LIBRO_IMPACTO_DB", str(tmp_path / "libro_impacto.db"))
+    async with main.lifespan(main.app):
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://prueba") as cliente:
+            yield cliente
@@ -0,0 +1,59 @@
+"""
+test_calcular_impacto_lote.py
+Pruebas de POST /calcular-impacto-lote.
+"""
+
+import pytest
+
+from calculos import CANTIDAD_MAXIMA
+from conftest import calcular_referencia, detecciones_aleatorias
+
+pytestmark = pytest.mark.anyio
+
+DETECCIONES = [
+    {"material": "botella_vidrio", "cantidad": 1},
+    {"material": "lata_aluminio", "cantidad": 4},
+    {"material": "botella_vidrio", "cantidad": 1}
+]
+
+
+async def test_lote_igual_al_calculo_original(cliente, calculador):
+    respuesta = await cliente.post("/calcular-impacto-lote", json={"solicitudes": [
+        {"id": "a", "detecciones": DETECCIONES},
+        {"id": "b", "detecciones": DETECCIONES[:1]}
+    ]})
+
+    assert respuesta.status_code == 200
+    resultados = respuesta.json()["resultados"]
+    for resultado, detecciones in zip(resultados, (DETECCIONES, DETECCIONES[:1])):
+        esperado = calcular_referencia(calculador, detecciones)
+        assert resultado["resumen_total"] == esperado["resumen_total"]
+        assert resultado["desglose_por_material"] == esperado["desglose_por_material"]
+
+
+async def test_lote_igual_a_una_peticion_por_solicitud(cliente):
+    solicitudes = [
+        {"id": f"analisis-{i}", "detecciones": detecciones_aleatorias(i, cantidad=1 + i)} for i in range(5)
+    ]
+
+    respuesta = (await cliente.post("/calcular-impacto-lote", json={"solicitudes": solicitudes})).json()
+
+    assert respuesta["total_solicitudes"] == 5
+    for solicitud, resultado in zip(solicitudes, respuesta["resultados"]):
+        individual = (await cliente.post("/calcular-impacto", json={"detecciones": solicitud["detecciones"]})).json()
+        assert resultado == {**individual, "id": solicitud["id"]}
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {"solicitudes": []},
+    {"solicitudes": [{"id": "", "detecciones": DETECCIONES}]},
+    {"solicitudes": [{"id": "a", "detecciones": [{"material": "carton", "cantidad": 1}]}]},
+    {"solicitudes": [{"id": "a", "detecciones": [{"material": "lata_aluminio", "cantidad": CANTIDAD_MAXIMA + 1}]}]},
+    {"solicitudes": [{"id": "a", "detecciones": [
+        {"material": "lata_aluminio", "cantidad": 99999999999999999999999}
+    ]}]}
+])
+async def test_lote_invalido_responde_422(cliente, cuerpo):
+    respuesta = await cliente.post("/calcular-impacto-lote", json=cuerpo)
+
+    assert respuesta.status_code == 422
@@ -0,0 +1,38 @@
+"""
+test_calculos.py
+Pruebas del calculador (cálculo por detección y por lista de detecciones).
+Los resultados se comparan con el cálculo original (ver calcular_referencia en conftest.py).
+"""
+
+import pytest
+
+from calculos import CANTIDAD_MAXIMA
+from conftest import calcular_referencia
+
+CASOS = [
+    [{"material": "botella_plastico", "cantidad": 5}, {"material": "lata_aluminio", "cantidad": 2}],
+    # Entradas repetidas del mismo material: los puntos se truncan por entrada (22, no 23)
+    [{"material": "botella_vidrio", "cantidad": 1}, {"material": "botella_vidrio", "cantidad": 1}],
+    [{"material": "lata_aluminio", "cantidad": 3}, {"material": "botella_plastico", "cantidad": 1},
+     {"material": "lata_aluminio", "cantidad": 7}],
+    [{"material": "botella_vidrio", "cantidad": CANTIDAD_MAXIMA}]
+]
+
+
+@pytest.mark.parametrize("detecciones", CASOS)
+def test_procesar_multiples_detecciones_igual_al_calculo_original(calculador, detecciones):
+    assert calculador.procesar_multiples_detecciones(detecciones) == calcular_referencia(calculador, detecciones)
+
+
+def test_entradas_repetidas_no_se_unen(calculador):
+    resultado = calculador.procesar_multiples_detecciones(CASOS[1])
+
+    assert resultado["resumen_total"]["puntos_ecologicos_totales"] == 22
+    assert len(resultado["desglose_por_material"]) == 2
+
+
+def test_material_desconocido(calculador):
+    with pytest.raises(ValueError):
+        calculador.procesar_deteccion("carton", 1)
+    with pytest.raises(ValueError):
+        calculador.calcular_co2_evitado("carton", 100.0)
@@ -0,0 +1,101 @@
+"""
+test_coalescedor.py
+Pruebas del coalescedor (micro-batching) de solicitudes de cálculo.
+"""
+
+import asyncio
+
+import pytest
+
+from coalescedor import CoalescedorCalculos
+from conftest import calcular_referencia, detecciones_aleatorias
+
+pytestmark = pytest.mark.anyio
+
+CANTIDAD_ENORME = 99999999999999999999999
+
+
+async def test_cantidad_fuera_de_rango_usa_el_calculo_escalar(calculador):
+    coalescedor = CoalescedorCalculos(calculador, ventana_ms=5)
+    normal = [{"material": "botella_plastico", "cantidad": 3}]
+    enorme = [{"material": "lata_aluminio", "cantidad": CANTIDAD_ENORME}]
+
+    resultado_normal, resultado_enorme = await asyncio.gather(
+        coalescedor.calcular(normal), coalescedor.calcular(enorme)
+    )
+
+    assert resultado_normal == calcular_referencia(calculador, normal)
+    assert resultado_enorme == calcular_referencia(calculador, enorme)
+    # Solo la solicitud normal pasó por el lote vectorizado
+    assert coalescedor.solicitudes_procesadas == 1
+
+
+async def test_solicitudes_concurrentes_se_reparten_en_orden(calculador):
+    coalescedor = CoalescedorCalculos(calculador, ventana_ms=50, max_lote=64)
+    solicitudes = [detecciones_aleatorias(i, cantidad=1 + i % 7) for i in range(20)]
+
+    resultados = await asyncio.gather(*(coalescedor.calcular(detecciones) for detecciones in solicitudes))
+
+    for detecciones, resultado in zip(solicitudes, resultados):
+        assert resultado == calcular_referencia(calculador, detecciones)
+    assert coalescedor.lotes_procesados == 1
+    assert coalescedor.solicitudes_procesadas == 20
+
+
+async def test_lote_lleno_se_procesa_sin_esperar_la_ventana(calculador):
+    coalescedor = CoalescedorCalculos(calculador, ventana_ms=10_000, max_lote=4)
+    solicitudes = [detecciones_aleatorias(i, cantidad=3) for i in range(8)]
+
+    resultados = await asyncio.wait_for(
+        asyncio.gather(*(coalescedor.calcular(detecciones) for detecciones in solicitudes)), timeout=5
+    )
+
+    assert resultados == [calcular_referencia(calculador, detecciones) for detecciones in solicitudes]
+    assert coalescedor.estadisticas()["lotes_procesados"] == 2
+    assert coalescedor.estadisticas()["promedio_por_lote"] == 4.0
+
+
+async def test_error_de_una_solicitud_no_afecta_a_las_demas(calculador):
+    coalescedor = CoalescedorCalculos(calculador, ventana_ms=20)
+    valida = [{"material": "lata_aluminio", "cantidad": 2}]
+    invalida = [{"material": "carton", "cantidad": 1}]
+
+    resultados = await asyncio.gather(
+        coalescedor.calcular(valida), coalescedor.calcular(invalida), return_exceptions=True
+    )
+
+    assert resultados[0] == calcular_referencia(calculador, valida)
+    assert isinstance(resultados[1], ValueError)
+
+
+async def test_solicitud_cancelada_no_bloquea_el_lote(calculador):
+    coalescedor = CoalescedorCalculos(calculador, ventana_ms=20)
+    detecciones = [{"material": "botella_plastico", "cantidad": 1}]
+
+    cancelada = asyncio.ensure_future(coalescedor.calcular(detecciones))
+    await asyncio.sleep(0)
+    cancelada.cancel()
+
+    assert await coalescedor.calcular(detecciones) == calcular_referencia(calculador, detecciones)
+
+
+def test_configuracion_invalida(calculador):
+    with pytest.raises(ValueError):
+        CoalescedorCalculos(calculador, ventana_ms=0)
+    with pytest.raises(ValueError):
+        CoalescedorCalculos(calculador, max_lote=0)
+
+
+async def test_endpoint_con_coalescedor(cliente, calculador, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "coalescedor", CoalescedorCalculos(calculador, ventana_ms=20))
+    solicitudes = [detecciones_aleatorias(100 + i, cantidad=4) for i in range(6)]
+
+    respuestas = await asyncio.gather(*(
+        cliente.post("/calcular-impacto", json={"detecciones": detecciones}) for detecciones in solicitudes
+    ))
+
+    for detecciones, respuesta in zip(solicitudes, respuestas):
+        assert respuesta.json()["resumen_total"] == calcular_referencia(calculador, detecciones)["resumen_total"]
+    assert main.coalescedor.solicitudes_procesadas == 6
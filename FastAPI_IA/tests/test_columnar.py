@@ -0,0 +1,72 @@
+"""
+test_columnar.py
+Pruebas de /calcular-impacto-columnar y de CalculadorAmbiental.procesar_columnas.
+"""
+
+import random
+
+import pytest
+
+from calculos import CANTIDAD_MAXIMA, MATERIALES
+from conftest import calcular_referencia
+
+pytestmark = pytest.mark.anyio
+
+MATERIALES_SOLICITUD = ["botella_vidrio", "lata_aluminio", "botella_vidrio"]
+CANTIDADES_SOLICITUD = [1, 4, 1]
+
+
+def columnas_aleatorias(semilla: int, cantidad: int) -> tuple:
+    generador = random.Random(semilla)
+    materiales = [generador.choice(MATERIALES) for _ in range(cantidad)]
+    cantidades = [generador.randint(1, CANTIDAD_MAXIMA) for _ in range(cantidad)]
+    return materiales, cantidades
+
+
+@pytest.mark.parametrize("semilla", range(3))
+def test_procesar_columnas_igual_al_calculo_original(calculador, semilla):
+    materiales, cantidades = columnas_aleatorias(semilla, 2000)
+    detecciones = [{"material": m, "cantidad": c} for m, c in zip(materiales, cantidades)]
+
+    assert calculador.procesar_columnas(materiales, cantidades) == calcular_referencia(calculador, detecciones)
+
+
+async def test_columnar_igual_a_calcular_impacto(cliente):
+    columnar = await cliente.post("/calcular-impacto-columnar", json={
+        "materiales": MATERIALES_SOLICITUD, "cantidades": CANTIDADES_SOLICITUD
+    })
+    por_objeto = await cliente.post("/calcular-impacto", json={"detecciones": [
+        {"material": m, "cantidad": c} for m, c in zip(MATERIALES_SOLICITUD, CANTIDADES_SOLICITUD)
+    ]})
+
+    assert columnar.status_code == 200
+    assert columnar.content == por_objeto.content
+
+
+async def test_columnar_etag_responde_304(cliente):
+    cuerpo = {"materiales": MATERIALES_SOLICITUD, "cantidades": CANTIDADES_SOLICITUD}
+    primera = await cliente.post("/calcular-impacto-columnar", json=cuerpo)
+
+    segunda = await cliente.post(
+        "/calcular-impacto-columnar", json=cuerpo, headers={"If-None-Match": primera.headers["etag"]}
+    )
+    otra = await cliente.post(
+        "/calcular-impacto-columnar", json={**cuerpo, "cantidades": [1, 4, 2]},
+        headers={"If-None-Match": primera.headers["etag"]}
+    )
+
+    assert segunda.status_code == 304
+    assert otra.status_code == 200
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {"materiales": ["lata_aluminio"], "cantidades": [99999999999999999999999]},
+    {"materiales": ["lata_aluminio"], "cantidades": [CANTIDAD_MAXIMA + 1]},
+    {"materiales": ["lata_aluminio"], "cantidades": [0]},
+    {"materiales": ["carton"], "cantidades": [1]},
+    {"materiales": ["lata_aluminio", "botella_vidrio"], "cantidades": [1]}
+])
+async def test_columnar_invalido_responde_422(cliente, cuerpo):
+    respuesta = await cliente.post("/calcular-impacto-columnar", json=cuerpo)
+
+    assert respuesta.status_code == 422
@@ -0,0 +1,26 @@
+"""
+test_endpoints.py
+Pruebas de los endpoints de cálculo con httpx.ASGITransport (sin levantar un servidor).
+"""
+
+import pytest
+
+from conftest import calcular_referencia
+
+pytestmark = pytest.mark.anyio
+
+DETECCIONES = [
+    {"material": "botella_vidrio", "cantidad": 1},
+    {"material": "lata_aluminio", "cantidad": 4},
+    {"material": "botella_vidrio", "cantidad": 1}
+]
+
+
+async def test_calcular_impacto_igual_al_calculo_original(cliente, calculador):
+    respuesta = await cliente.post("/calcular-impacto", json={"detecciones": DETECCIONES})
+
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    esperado = calcular_referencia(calculador, DETECCIONES)
+    assert cuerpo["resumen_total"] == esperado["resumen_total"]
+    assert cuerpo["desglose_por_material"] == esperado["desglose_por_material"]
@@ -0,0 +1,60 @@
+"""
+test_etag.py
+Pruebas del ETag de /calcular-impacto: 304 en revalidaciones y claves distintas
+para detecciones distintas.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+DETECCIONES = [
+    {"material": "botella_vidrio", "cantidad": 1},
+    {"material": "lata_aluminio", "cantidad": 4},
+    {"material": "botella_vidrio", "cantidad": 1}
+]
+
+
+async def test_etag_responde_304(cliente):
+    primera = await cliente.post("/calcular-impacto", json={"detecciones": DETECCIONES})
+    etag = primera.headers["etag"]
+
+    segunda = await cliente.post(
+        "/calcular-impacto", json={"detecciones": DETECCIONES}, headers={"If-None-Match": etag}
+    )
+
+    assert segunda.status_code == 304
+    assert segunda.content == b""
+    assert segunda.headers["etag"] == etag
+
+
+async def test_etag_debil_responde_304(cliente):
+    primera = await cliente.post("/calcular-impacto", json={"detecciones": DETECCIONES})
+
+    segunda = await cliente.post(
+        "/calcular-impacto", json={"detecciones": DETECCIONES},
+        headers={"If-None-Match": f'"otro", W/{primera.headers["etag"]}'}
+    )
+
+    assert segunda.status_code == 304
+
+
+async def test_asterisco_no_responde_304(cliente):
+    respuesta = await cliente.post(
+        "/calcular-impacto", json={"detecciones": DETECCIONES}, headers={"If-None-Match": "*"}
+    )
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()["resumen_total"]["puntos_ecologicos_totales"] > 0
+
+
+async def test_entradas_repetidas_no_cambian_los_puntos(cliente):
+    repetidas = [{"material": "botella_vidrio", "cantidad": 1}] * 2
+    unida = [{"material": "botella_vidrio", "cantidad": 2}]
+
+    respuesta_repetidas = await cliente.post("/calcular-impacto", json={"detecciones": repetidas})
+    respuesta_unida = await cliente.post("/calcular-impacto", json={"detecciones": unida})
+
+    assert respuesta_repetidas.json()["resumen_total"]["puntos_ecologicos_totales"] == 22
+    assert respuesta_unida.json()["resumen_total"]["puntos_ecologicos_totales"] == 23
+    assert respuesta_repetidas.headers["etag"] != respuesta_unida.headers["etag"]
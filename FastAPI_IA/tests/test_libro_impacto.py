@@ -0,0 +1,132 @@
+"""
+test_libro_impacto.py
+Pruebas del libro de impacto: idempotencia de los registros, migración de bases
+anteriores, lecturas consistentes y registro desde /calcular-impacto?usuario_id=...
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from libro_impacto import LibroImpacto
+
+pytestmark = pytest.mark.anyio
+
+DETECCIONES = [
+    {"material": "botella_plastico", "cantidad": 5},
+    {"material": "lata_aluminio", "cantidad": 2}
+]
+
+
+def test_libro_clave_idempotencia(calculador, tmp_path):
+    libro = LibroImpacto(tmp_path / "libro.db")
+    resultado = calculador.procesar_multiples_detecciones(DETECCIONES)
+
+    try:
+        assert libro.registrar("ana", resultado, clave_idempotencia="op-1") is not None
+        assert libro.registrar("ana", resultado, clave_idempotencia="op-1") is None
+        assert libro.registrar("ana", resultado, clave_idempotencia="op-2") is not None
+        # Sin clave, cada registro se suma; la misma clave en otro usuario no choca
+        assert libro.registrar("ana", resultado) is not None
+        assert libro.registrar("luis", resultado, clave_idempotencia="op-1") is not None
+
+        impacto = libro.impacto_usuario("ana")
+        assert impacto["registros"] == 3
+        assert impacto["resumen_total"]["puntos_ecologicos_totales"] == \
+            3 * resultado["resumen_total"]["puntos_ecologicos_totales"]
+        assert libro.rollups_usuario("ana", "dia")[0]["registros"] == 3
+    finally:
+        libro.cerrar()
+
+
+def test_libro_migra_bases_sin_columna_de_idempotencia(calculador, tmp_path):
+    ruta = tmp_path / "libro_anterior.db"
+    conexion = sqlite3.connect(ruta)
+    conexion.execute(
+        "CREATE TABLE registros (id INTEGER PRIMARY KEY, usuario_id TEXT NOT NULL, fecha TEXT NOT NULL, "
+        "peso_total_gramos REAL NOT NULL, co2_total_evitado_kg REAL NOT NULL, "
+        "energia_total_ahorrada_kwh REAL NOT NULL, puntos_ecologicos_totales INTEGER NOT NULL, "
+        "desglose TEXT NOT NULL)"
+    )
+    conexion.close()
+
+    libro = LibroImpacto(ruta)
+    try:
+        resultado = calculador.procesar_multiples_detecciones(DETECCIONES)
+        assert libro.registrar("ana", resultado, clave_idempotencia="op-1") is not None
+        assert libro.registrar("ana", resultado, clave_idempotencia="op-1") is None
+    finally:
+        libro.cerrar()
+
+
+def test_lecturas_consistentes_durante_registros(calculador, tmp_path):
+    libro = LibroImpacto(tmp_path / "libro.db")
+    resultado = calculador.procesar_multiples_detecciones(DETECCIONES)
+    terminado = threading.Event()
+
+    def registrar_en_bucle():
+        for _ in range(200):
+            libro.registrar("ana", resultado)
+        terminado.set()
+
+    hilo = threading.Thread(target=registrar_en_bucle)
+    hilo.start()
+    try:
+        while not terminado.is_set():
+            impacto = libro.impacto_usuario("ana")
+            if impacto is None:
+                continue
+            # Los totales del usuario y los de sus materiales corresponden al mismo registro
+            assert impacto["resumen_total"]["puntos_ecologicos_totales"] == \
+                sum(m["puntos_ecologicos"] for m in impacto["desglose_por_material"])
+    finally:
+        hilo.join()
+        libro.cerrar()
+
+
+async def registros_usuario(cliente, usuario_id: str) -> int:
+    respuesta = await cliente.get(f"/usuarios/{usuario_id}/impacto")
+    return respuesta.json()["registros"] if respuesta.status_code == 200 else 0
+
+
+async def test_envios_repetidos_se_registran_y_304_no(cliente):
+    cuerpo = {"detecciones": DETECCIONES}
+
+    primera = await cliente.post("/calcular-impacto?usuario_id=ana", json=cuerpo)
+    # Sin Idempotency-Key, otro envío igual es otro reciclaje (aunque sea un acierto de caché)
+    segunda = await cliente.post("/calcular-impacto?usuario_id=ana", json=cuerpo)
+    revalidacion = await cliente.post(
+        "/calcular-impacto?usuario_id=ana", json=cuerpo, headers={"If-None-Match": primera.headers["etag"]}
+    )
+
+    assert segunda.status_code == 200
+    assert revalidacion.status_code == 304
+    assert await registros_usuario(cliente, "ana") == 2
+
+    impacto = (await cliente.get("/usuarios/ana/impacto")).json()
+    assert impacto["resumen_total"]["puntos_ecologicos_totales"] == \
+        2 * primera.json()["resumen_total"]["puntos_ecologicos_totales"]
+
+
+async def test_idempotency_key(cliente):
+    cuerpo = {"detecciones": DETECCIONES}
+
+    for clave in ("op-1", "op-2", "op-1"):
+        respuesta = await cliente.post(
+            "/calcular-impacto?usuario_id=luis", json=cuerpo, headers={"Idempotency-Key": clave}
+        )
+        assert respuesta.status_code == 200
+
+    assert await registros_usuario(cliente, "luis") == 2
+
+
+async def test_ventana_de_idempotencia_configurada(cliente, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "ventana_idempotencia", 60)
+    monkeypatch.setattr(main.time, "time", lambda: 6000.0)
+    for _ in range(2):
+        await cliente.post("/calcular-impacto?usuario_id=eva", json={"detecciones": DETECCIONES})
+
+    assert await registros_usuario(cliente, "eva") == 1
@@ -0,0 +1,63 @@
+"""
+test_metricas.py
+Pruebas de las métricas en formato Prometheus (metricas.py y /metrics).
+"""
+
+import re
+
+import pytest
+
+from metricas import BUCKETS_LATENCIA, Histograma, RegistroMetricas
+
+pytestmark = pytest.mark.anyio
+
+
+def test_histograma_usa_el_bucket_del_limite_superior():
+    histograma = Histograma(limites=(0.1, 1.0))
+    for valor in (0.05, 0.1, 0.5, 2.0):
+        histograma.observar(valor)
+
+    assert histograma.conteos == [2, 1, 1]
+    assert histograma.total == 4
+    assert histograma.suma == pytest.approx(2.65)
+
+
+def test_exportar_buckets_acumulados_y_errores():
+    registro = RegistroMetricas(prefijo="prueba")
+    registro.registrar_peticion("/calcular-impacto", "POST", 200, 0.002)
+    registro.registrar_peticion("/calcular-impacto", "POST", 422, 0.0001)
+    registro.observar_etapa("/calcular-impacto", "calculo", 0.003)
+
+    texto = registro.exportar()
+
+    assert 'prueba_peticiones_total{ruta="/calcular-impacto",metodo="POST",estado="200"} 1' in texto
+    assert 'prueba_errores_total{ruta="/calcular-impacto",estado="422"} 1' in texto
+    assert 'prueba_latencia_segundos_bucket{ruta="/calcular-impacto",metodo="POST",le="0.0005"} 1' in texto
+    assert 'prueba_latencia_segundos_bucket{ruta="/calcular-impacto",metodo="POST",le="+Inf"} 2' in texto
+    assert 'prueba_latencia_segundos_count{ruta="/calcular-impacto",metodo="POST"} 2' in texto
+    assert 'prueba_etapa_segundos_count{ruta="/calcular-impacto",etapa="calculo"} 1' in texto
+    buckets = re.findall(r'prueba_etapa_segundos_bucket\{[^}]*\} (\d+)', texto)
+    assert len(buckets) == len(BUCKETS_LATENCIA) + 1
+    assert [int(b) for b in buckets] == sorted(int(b) for b in buckets)
+
+
+def contador(texto: str, serie: str) -> int:
+    coincidencia = re.search(re.escape(serie) + r" (\d+)", texto)
+    return int(coincidencia.group(1)) if coincidencia else 0
+
+
+async def test_metrics_cuenta_peticiones_por_plantilla_de_ruta(cliente):
+    serie_ok = 'ecodetect_peticiones_total{ruta="/calcular-impacto",metodo="POST",estado="200"}'
+    serie_usuario = 'ecodetect_peticiones_total{ruta="/usuarios/{usuario_id}/impacto",metodo="GET",estado="404"}'
+    serie_etapa = 'ecodetect_etapa_segundos_count{ruta="/calcular-impacto",etapa="validacion"}'
+    antes = (await cliente.get("/metrics")).text
+
+    await cliente.post("/calcular-impacto", json={"detecciones": [{"material": "lata_aluminio", "cantidad": 2}]})
+    await cliente.get("/usuarios/nadie/impacto")
+    respuesta = await cliente.get("/metrics")
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/plain")
+    assert contador(respuesta.text, serie_ok) == contador(antes, serie_ok) + 1
+    assert contador(respuesta.text, serie_usuario) == contador(antes, serie_usuario) + 1
+    assert contador(respuesta.text, serie_etapa) == contador(antes, serie_etapa) + 1
@@ -0,0 +1,60 @@
+"""
+test_msgpack.py
+Pruebas de la negociación de MessagePack por cabecera Accept.
+"""
+
+import pytest
+
+import serializacion
+from serializacion import acepta_msgpack
+
+pytestmark = pytest.mark.anyio
+
+DETECCIONES = [
+    {"material": "botella_vidrio", "cantidad": 1},
+    {"material": "lata_aluminio", "cantidad": 4}
+]
+
+
+@pytest.mark.parametrize("accept, esperado", [
+    ("application/msgpack", True),
+    ("application/x-msgpack", True),
+    ("application/json, application/msgpack", True),
+    ("application/msgpack;q=0.9, */*;q=0.5", True),
+    ("application/json, application/msgpack;q=0.1", False),
+    ("application/msgpack;q=0.5, application/json;q=0.8", False),
+    ("application/msgpack;q=0.5, */*", False),
+    ("application/msgpack;q=0", False),
+    ("application/msgpack;q=abc", False),
+    ("application/json", False),
+    ("*/*", False),
+    ("", False)
+])
+def test_acepta_msgpack_compara_calidades(accept, esperado):
+    if serializacion.msgpack is None:
+        pytest.skip("msgpack no está instalado")
+
+    assert acepta_msgpack(accept) is esperado
+
+
+async def test_msgpack_mismo_resultado(cliente):
+    msgpack = pytest.importorskip("msgpack")
+
+    respuesta = await cliente.post(
+        "/calcular-impacto", json={"detecciones": DETECCIONES}, headers={"Accept": "application/msgpack"}
+    )
+    por_json = await cliente.post("/calcular-impacto", json={"detecciones": DETECCIONES})
+
+    assert respuesta.status_code == 200
+    assert msgpack.unpackb(respuesta.content) == por_json.json()
+    assert respuesta.headers["etag"] != por_json.headers["etag"]
+
+
+async def test_json_preferido_responde_json(cliente):
+    respuesta = await cliente.post(
+        "/calcular-impacto", json={"detecciones": DETECCIONES},
+        headers={"Accept": "application/json, application/msgpack;q=0.1"}
+    )
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("application/json")
@@ -0,0 +1,81 @@
+"""
+test_ndjson.py
+Pruebas del cálculo en streaming NDJSON (calculos_ndjson.py y /calcular-impacto-stream).
+"""
+
+import asyncio
+import json
+import random
+
+import pytest
+
+from calculos import CANTIDAD_MAXIMA
+from calculos_ndjson import parsear_registro, procesar_flujo, procesar_flujo_async
+from conftest import detecciones_aleatorias
+
+CANTIDAD_ENORME = 99999999999999999999999
+
+
+def test_parsear_registro_cantidad_maxima():
+    assert parsear_registro(json.dumps({"material": "lata_aluminio", "cantidad": CANTIDAD_MAXIMA}))["cantidad"] == CANTIDAD_MAXIMA
+
+    with pytest.raises(ValueError, match="no puede superar"):
+        parsear_registro(json.dumps({"material": "lata_aluminio", "cantidad": CANTIDAD_ENORME}))
+    with pytest.raises(ValueError):
+        parsear_registro('{"material": "lata_aluminio", "cantidad": 0}')
+    with pytest.raises(ValueError):
+        parsear_registro('{"material": "carton", "cantidad": 1}')
+
+
+def test_procesar_flujo_cantidad_enorme_no_corta_el_flujo(calculador):
+    lineas = [
+        '{"id": "a", "material": "botella_plastico", "cantidad": 2}',
+        json.dumps({"id": "b", "material": "botella_vidrio", "cantidad": CANTIDAD_ENORME}),
+        '{"id": "c", "material": "lata_aluminio", "cantidad": 1}'
+    ]
+
+    salida = [json.loads(linea) for linea in procesar_flujo(lineas, calculador)]
+
+    assert salida[0] == {"id": "a", **calculador.procesar_deteccion("botella_plastico", 2)}
+    assert salida[1]["linea"] == 2 and "error" in salida[1]
+    assert salida[2] == {"id": "c", **calculador.procesar_deteccion("lata_aluminio", 1)}
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_procesar_flujo_async_igual_con_cualquier_fragmentacion(calculador, semilla):
+    generador = random.Random(semilla)
+    lineas = [json.dumps(d) for d in detecciones_aleatorias(semilla, cantidad=300)]
+    lineas[5] = ""
+    lineas[9] = '{"material": "lata_aluminio", "cantidad": -1}'
+    datos = "\n".join(lineas).encode("utf-8")
+
+    cortes = sorted(generador.sample(range(1, len(datos)), 40))
+    fragmentos = [datos[a:b] for a, b in zip([0] + cortes, cortes + [len(datos)])]
+
+    async def recolectar():
+        async def generar():
+            for fragmento in fragmentos:
+                yield fragmento
+        return [linea async for linea in procesar_flujo_async(generar(), calculador, tamano_bloque=64)]
+
+    assert asyncio.run(recolectar()) == list(procesar_flujo(lineas, calculador, tamano_bloque=64))
+
+
+@pytest.mark.anyio
+async def test_stream_cantidad_enorme_informa_la_linea(cliente, calculador):
+    lineas = [
+        {"id": "a", "material": "botella_plastico", "cantidad": 3},
+        {"id": "b", "material": "botella_vidrio", "cantidad": CANTIDAD_ENORME},
+        {"id": "c", "material": "lata_aluminio", "cantidad": 2}
+    ]
+    datos = "\n".join(json.dumps(linea) for linea in lineas) + "\n"
+
+    respuesta = await cliente.post(
+        "/calcular-impacto-stream", content=datos, headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert respuesta.status_code == 200
+    salida = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert salida[0] == {"id": "a", **calculador.procesar_deteccion("botella_plastico", 3)}
+    assert salida[1]["linea"] == 2 and "error" in salida[1]
+    assert salida[2] == {"id": "c", **calculador.procesar_deteccion("lata_aluminio", 2)}
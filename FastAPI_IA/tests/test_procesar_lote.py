@@ -0,0 +1,81 @@
+"""
+test_procesar_lote.py
+Pruebas del cálculo vectorizado (procesar_lote y procesar_multiples_solicitudes).
+Los resultados se comparan con el cálculo original (ver calcular_referencia en conftest.py).
+"""
+
+import numpy as np
+import pytest
+
+from calculos import CANTIDAD_MAXIMA, codificar_materiales
+from conftest import calcular_referencia, detecciones_aleatorias
+
+
+def test_procesar_lote_igual_a_procesar_deteccion(calculador):
+    detecciones = detecciones_aleatorias(42, cantidad=200)
+
+    lote = calculador.procesar_lote(
+        [d["material"] for d in detecciones], [d["cantidad"] for d in detecciones]
+    )
+
+    for j, deteccion in enumerate(detecciones):
+        esperado = calculador.procesar_deteccion(deteccion["material"], deteccion["cantidad"])
+        assert lote["peso_estimado_gramos"][j] == esperado["peso_estimado_gramos"]
+        assert lote["co2_evitado_kg"][j] == esperado["co2_evitado_kg"]
+        assert lote["energia_ahorrada_kwh"][j] == esperado["energia_ahorrada_kwh"]
+        assert lote["puntos_ecologicos"][j] == esperado["puntos_ecologicos"]
+
+
+def test_procesar_lote_con_ids_igual_que_con_nombres(calculador):
+    detecciones = detecciones_aleatorias(7, cantidad=50)
+    materiales = [d["material"] for d in detecciones]
+    cantidades = [d["cantidad"] for d in detecciones]
+
+    por_nombre = calculador.procesar_lote(materiales, cantidades)
+    por_id = calculador.procesar_lote(codificar_materiales(materiales), np.array(cantidades))
+
+    for columna, valores in por_nombre.items():
+        assert np.array_equal(valores, por_id[columna])
+
+
+def test_procesar_lote_totales_por_grupo(calculador):
+    solicitudes = [detecciones_aleatorias(i, cantidad=3 + i) for i in range(4)]
+    detecciones = [d for solicitud in solicitudes for d in solicitud]
+    grupos = [i for i, solicitud in enumerate(solicitudes) for _ in solicitud]
+
+    lote = calculador.procesar_lote(
+        [d["material"] for d in detecciones], [d["cantidad"] for d in detecciones], grupos
+    )
+
+    for i, solicitud in enumerate(solicitudes):
+        esperado = calcular_referencia(calculador, solicitud)["resumen_total"]
+        assert {clave: valores[i].item() for clave, valores in lote["totales"].items()} == esperado
+
+
+@pytest.mark.parametrize("materiales, cantidades", [
+    (["lata_aluminio", "carton"], [1, 2]),
+    (["lata_aluminio"], [1, 2]),
+    (np.array([5]), [1])
+])
+def test_procesar_lote_datos_invalidos(calculador, materiales, cantidades):
+    with pytest.raises(ValueError):
+        calculador.procesar_lote(materiales, cantidades)
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_procesar_multiples_solicitudes_igual_por_solicitud(calculador, semilla):
+    solicitudes = [detecciones_aleatorias(semilla * 10 + i, cantidad=1 + i) for i in range(8)]
+
+    lote = calculador.procesar_multiples_solicitudes(solicitudes)
+
+    for detecciones, resultado in zip(solicitudes, lote["resultados"]):
+        assert resultado == calcular_referencia(calculador, detecciones)
+    todas = [d for detecciones in solicitudes for d in detecciones]
+    assert lote["resumen_total"] == calcular_referencia(calculador, todas)["resumen_total"]
+
+
+def test_cantidad_maxima_cabe_en_int64(calculador):
+    lote = calculador.procesar_lote(["lata_aluminio"], [CANTIDAD_MAXIMA])
+
+    assert lote["puntos_ecologicos"].dtype == np.int64
+    assert lote["puntos_ecologicos"][0] == calculador.procesar_deteccion("lata_aluminio", CANTIDAD_MAXIMA)["puntos_ecologicos"]
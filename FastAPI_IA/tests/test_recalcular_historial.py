@@ -0,0 +1,115 @@
+"""
+test_recalcular_historial.py
+Pruebas del recálculo offline de registros históricos (CSV y JSONL, reanudación).
+"""
+
+import csv
+import json
+
+import pytest
+
+from calculos import CANTIDAD_MAXIMA, version_factores
+from recalcular_historial import COLUMNAS_RESULTADO, guardar_checkpoint, recalcular, recalcular_bloque_csv
+
+COLUMNAS = ["id", "material", "cantidad", *COLUMNAS_RESULTADO]
+
+
+def leer_csv(texto: str) -> list:
+    return list(csv.DictReader(texto.splitlines(), fieldnames=COLUMNAS))
+
+
+def test_bloque_csv_informa_errores_por_fila(calculador):
+    filas = [
+        (2, {"id": "a", "material": "lata_aluminio", "cantidad": "3"}),
+        (3, {"id": "b", "material": "lata_aluminio", "cantidad": "99999999999999999999"}),
+        (4, {"id": "c", "material": "botella_vidrio", "cantidad": str(CANTIDAD_MAXIMA + 1)}),
+        (5, {"id": "d", "material": "carton", "cantidad": "1"}),
+        (6, {"id": "e", "material": "botella_plastico", "cantidad": "cero"}),
+        (7, {"id": "f", "material": "botella_plastico", "cantidad": str(CANTIDAD_MAXIMA)})
+    ]
+
+    salida = leer_csv(recalcular_bloque_csv(calculador, filas, COLUMNAS))
+
+    assert [fila["id"] for fila in salida] == ["a", "b", "c", "d", "e", "f"]
+    for fila, (material, cantidad) in ((salida[0], ("lata_aluminio", 3)),
+                                       (salida[5], ("botella_plastico", CANTIDAD_MAXIMA))):
+        esperado = calculador.procesar_deteccion(material, cantidad)
+        assert fila["error"] == ""
+        assert int(fila["puntos_ecologicos"]) == esperado["puntos_ecologicos"]
+        assert float(fila["peso_estimado_gramos"]) == esperado["peso_estimado_gramos"]
+    assert salida[1]["error"] == f"línea 3: La cantidad no puede superar {CANTIDAD_MAXIMA}"
+    assert salida[2]["error"] == f"línea 4: La cantidad no puede superar {CANTIDAD_MAXIMA}"
+    assert salida[3]["error"].startswith("línea 5: Material desconocido")
+    assert salida[4]["error"].startswith("línea 6: La cantidad debe ser")
+    assert all(fila["puntos_ecologicos"] == "" for fila in salida[1:5])
+
+
+def escribir_historial_csv(ruta, total: int):
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f, lineterminator="\n")
+        escritor.writerow(["id", "material", "cantidad"])
+        for i in range(total):
+            cantidad = CANTIDAD_MAXIMA * 2 if i == 7 else i % 50 + 1
+            escritor.writerow([f"r{i}", ("botella_plastico", "botella_vidrio", "lata_aluminio")[i % 3], cantidad])
+
+
+def test_cantidad_fuera_de_rango_no_detiene_el_csv(tmp_path):
+    entrada, salida = tmp_path / "historial.csv", tmp_path / "recalculado.csv"
+    escribir_historial_csv(entrada, 20)
+
+    estado = recalcular(str(entrada), str(salida), procesos=1, tamano_bloque=8)
+
+    filas = list(csv.DictReader(open(salida, encoding="utf-8")))
+    assert estado["filas"] == 20 and len(filas) == 20
+    assert filas[7]["error"].endswith(f"La cantidad no puede superar {CANTIDAD_MAXIMA}")
+    assert sum(1 for fila in filas if fila["error"]) == 1
+
+
+def test_jsonl_y_csv_rechazan_la_misma_cantidad(tmp_path):
+    entrada = tmp_path / "historial.jsonl"
+    entrada.write_text(json.dumps({"material": "lata_aluminio", "cantidad": CANTIDAD_MAXIMA * 2}) + "\n")
+
+    recalcular(str(entrada), str(tmp_path / "recalculado.jsonl"), procesos=1)
+
+    resultado = json.loads((tmp_path / "recalculado.jsonl").read_text())
+    assert resultado["error"] == f"La cantidad no puede superar {CANTIDAD_MAXIMA}"
+
+
+def test_reanudar_desde_el_checkpoint(tmp_path):
+    entrada = tmp_path / "historial.csv"
+    escribir_historial_csv(entrada, 40)
+    completo = tmp_path / "completo.csv"
+    recalcular(str(entrada), str(completo), procesos=1, tamano_bloque=8)
+    esperado = completo.read_bytes()
+
+    # Simular una ejecución interrumpida: 2 bloques confirmados y uno a medio escribir
+    interrumpido = tmp_path / "interrumpido.csv"
+    lineas = esperado.splitlines(keepends=True)
+    confirmado = b"".join(lineas[:1 + 2 * 8])
+    interrumpido.write_bytes(confirmado + lineas[17][:5])
+    guardar_checkpoint(tmp_path / "interrumpido.csv.checkpoint.json", {
+        "entrada": str(entrada.resolve()),
+        "tamano_bloque": 8,
+        "version_factores": version_factores(),
+        "bloques": 2,
+        "filas": 16,
+        "bytes_salida": len(confirmado)
+    })
+
+    estado = recalcular(str(entrada), str(interrumpido), procesos=1, tamano_bloque=8, reanudar=True)
+
+    assert estado["filas"] == 40
+    assert interrumpido.read_bytes() == esperado
+    assert not (tmp_path / "interrumpido.csv.checkpoint.json").exists()
+
+
+def test_reanudar_con_otros_factores_falla(tmp_path):
+    entrada = tmp_path / "historial.csv"
+    escribir_historial_csv(entrada, 4)
+    guardar_checkpoint(tmp_path / "salida.csv.checkpoint.json", {
+        "entrada": str(entrada.resolve()), "tamano_bloque": 8, "version_factores": "otra",
+        "bloques": 1, "filas": 4, "bytes_salida": 0
+    })
+
+    with pytest.raises(ValueError, match="factores cambiaron"):
+        recalcular(str(entrada), str(tmp_path / "salida.csv"), procesos=1, tamano_bloque=8, reanudar=True)
@@ -0,0 +1,101 @@
+"""
+test_rollups.py
+Pruebas de los rollups por período y del ranking (top-K) de puntos ecológicos.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import detecciones_aleatorias
+from libro_impacto import LibroImpacto, inicio_periodo
+
+pytestmark = pytest.mark.anyio
+
+FECHA = datetime(2026, 10, 14, 9, 30, tzinfo=timezone.utc)  # miércoles
+
+
+@pytest.mark.parametrize("periodo, esperado", [
+    ("hora", "2026-10-14T09:00"),
+    ("dia", "2026-10-14"),
+    ("semana", "2026-10-12"),
+    ("mes", "2026-10-01")
+])
+def test_inicio_periodo(periodo, esperado):
+    assert inicio_periodo(FECHA, periodo) == esperado
+    # Sin zona horaria se asume UTC; con otra zona se convierte a UTC
+    assert inicio_periodo(FECHA.replace(tzinfo=None), periodo) == esperado
+    assert inicio_periodo(FECHA.astimezone(timezone(timedelta(hours=-3))), periodo) == esperado
+
+
+def test_inicio_periodo_desconocido():
+    with pytest.raises(ValueError):
+        inicio_periodo(FECHA, "anio")
+
+
+@pytest.fixture
+def libro(tmp_path):
+    libro = LibroImpacto(tmp_path / "libro.db")
+    yield libro
+    libro.cerrar()
+
+
+def puntos(resultado: dict) -> int:
+    return resultado["resumen_total"]["puntos_ecologicos_totales"]
+
+
+def test_rollups_suman_cada_periodo(libro, calculador):
+    resultados = [calculador.procesar_multiples_detecciones(detecciones_aleatorias(i, 5)) for i in range(3)]
+    fechas = [FECHA, FECHA + timedelta(minutes=20), FECHA + timedelta(days=1)]
+    for resultado, fecha in zip(resultados, fechas):
+        libro.registrar("ana", resultado, fecha=fecha)
+
+    dias = libro.rollups_usuario("ana", "dia")
+    semanas = libro.rollups_usuario("ana", "semana")
+
+    assert [dia["inicio"] for dia in dias] == ["2026-10-15", "2026-10-14"]
+    assert [dia["registros"] for dia in dias] == [1, 2]
+    assert dias[1]["puntos_ecologicos_totales"] == puntos(resultados[0]) + puntos(resultados[1])
+    assert semanas == [{
+        "inicio": "2026-10-12",
+        "registros": 3,
+        **libro.impacto_usuario("ana")["resumen_total"]
+    }]
+    assert len(libro.rollups_usuario("ana", "hora", limite=1)) == 1
+
+
+def test_ranking_por_periodo_y_total(libro, calculador):
+    pequeno = calculador.procesar_multiples_detecciones([{"material": "botella_plastico", "cantidad": 1}])
+    grande = calculador.procesar_multiples_detecciones([{"material": "lata_aluminio", "cantidad": 50}])
+    libro.registrar("ana", grande, fecha=FECHA - timedelta(days=7))
+    libro.registrar("ana", pequeno, fecha=FECHA)
+    libro.registrar("luis", grande, fecha=FECHA)
+    libro.registrar("eva", pequeno, fecha=FECHA)
+
+    semana = libro.ranking("semana", FECHA)
+    total = libro.ranking("total")
+
+    assert semana["inicio"] == "2026-10-12"
+    assert [p["usuario_id"] for p in semana["posiciones"]] == ["luis", "ana", "eva"]
+    assert [p["posicion"] for p in semana["posiciones"]] == [1, 2, 3]
+    assert semana["posiciones"][0]["puntos_ecologicos_totales"] == puntos(grande)
+    assert total["inicio"] is None
+    assert [p["usuario_id"] for p in total["posiciones"]] == ["ana", "luis", "eva"]
+    assert total["posiciones"][0]["puntos_ecologicos_totales"] == puntos(grande) + puntos(pequeno)
+    assert len(libro.ranking("semana", FECHA, limite=2)["posiciones"]) == 2
+    assert libro.ranking("semana", FECHA + timedelta(days=30))["posiciones"] == []
+
+
+async def test_endpoints_de_rollups_y_ranking(cliente):
+    detecciones = [{"material": "lata_aluminio", "cantidad": 3}]
+    primera = await cliente.post("/calcular-impacto?usuario_id=ana", json={"detecciones": detecciones})
+    await cliente.post("/calcular-impacto?usuario_id=luis", json={"detecciones": detecciones * 2})
+
+    rollups = (await cliente.get("/usuarios/ana/rollups", params={"periodo": "mes"})).json()
+    ranking = (await cliente.get("/ranking", params={"periodo": "dia"})).json()
+
+    assert rollups["periodo"] == "mes"
+    assert rollups["rollups"][0]["puntos_ecologicos_totales"] == puntos(primera.json())
+    assert [p["usuario_id"] for p in ranking["posiciones"]] == ["luis", "ana"]
+    assert (await cliente.get("/ranking", params={"periodo": "anio"})).status_code == 422
+    assert (await cliente.get("/usuarios/ana/rollups", params={"limite": 0})).status_code == 422
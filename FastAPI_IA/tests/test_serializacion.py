@@ -0,0 +1,52 @@
+"""
+test_serializacion.py
+Pruebas de la serialización directa de respuestas (sin revalidar con Pydantic).
+"""
+
+import json
+
+import pytest
+
+import main
+from conftest import calcular_referencia
+from modelos import RespuestaCalculo
+from serializacion import codificar_json, construir_respuesta
+
+pytestmark = pytest.mark.anyio
+
+CANTIDAD_ENORME = 99999999999999999999999
+
+
+def test_respuesta_igual_a_pydantic(calculador):
+    resultado = calculador.procesar_multiples_detecciones([
+        {"material": "botella_plastico", "cantidad": 3},
+        {"material": "lata_aluminio", "cantidad": 2}
+    ])
+
+    respuesta = construir_respuesta(resultado)
+
+    assert json.loads(codificar_json(respuesta)) == RespuestaCalculo(**resultado).model_dump()
+
+
+def test_codificar_json_enteros_de_mas_de_64_bits():
+    datos = {"puntos_ecologicos_totales": CANTIDAD_ENORME, "peso_total_gramos": 1.5}
+
+    assert json.loads(codificar_json(datos)) == datos
+
+
+def test_esquema_de_deteccion_sin_maximo():
+    esquema = main.app.openapi()["components"]["schemas"]["DeteccionMaterial"]["properties"]["cantidad"]
+
+    assert "maximum" not in esquema
+    assert esquema["exclusiveMinimum"] == 0
+
+
+async def test_cantidad_enorme_igual_al_calculo_original(cliente, calculador):
+    detecciones = [{"material": "lata_aluminio", "cantidad": CANTIDAD_ENORME}]
+
+    respuesta = await cliente.post("/calcular-impacto", json={"detecciones": detecciones})
+
+    assert respuesta.status_code == 200
+    esperado = calcular_referencia(calculador, detecciones)
+    assert respuesta.json()["resumen_total"] == esperado["resumen_total"]
+    assert respuesta.json()["desglose_por_material"] == esperado["desglose_por_material"]
@@ -0,0 +1,53 @@
+"""
+test_tabla_compartida.py
+Pruebas de la tabla de coeficientes compartida entre workers (memoria compartida, solo lectura).
+"""
+
+import numpy as np
+import pytest
+
+from calculos import MATERIALES, CalculadorAmbiental
+from conftest import calcular_referencia, detecciones_aleatorias
+from tabla_compartida import adjuntar_tabla, publicar_tabla
+
+
+def test_tabla_compartida_se_usa_en_todos_los_calculos(calculador):
+    tabla = calculador.tabla_coeficientes.copy()
+    tabla.flags.writeable = False
+
+    compartido = CalculadorAmbiental.desde_tabla(tabla, checksum=calculador.checksum)
+
+    assert compartido.tabla_coeficientes is tabla
+    for i, material in enumerate(MATERIALES):
+        assert compartido.coeficientes_material(material)["factor_co2"] == tabla[i, 2]
+        assert compartido.calcular_co2_evitado(material, 1000.0) == round(tabla[i, 2], 3)
+        assert compartido.calcular_energia_ahorrada(material, 1000.0) == round(tabla[i, 3], 3)
+    detecciones = detecciones_aleatorias(3, cantidad=40)
+    assert compartido.procesar_multiples_detecciones(detecciones) == calcular_referencia(calculador, detecciones)
+
+
+def test_publicar_y_adjuntar_tabla(calculador):
+    publicado = publicar_tabla(calculador.tabla_coeficientes)
+    try:
+        segmento, tabla = adjuntar_tabla(publicado.name)
+        try:
+            assert np.array_equal(tabla, calculador.tabla_coeficientes)
+            assert not tabla.flags.writeable
+            with pytest.raises(ValueError):
+                tabla[0, 0] = 0.0
+
+            compartido = CalculadorAmbiental.desde_tabla(tabla, checksum=calculador.checksum)
+            detecciones = detecciones_aleatorias(4, cantidad=40)
+            assert compartido.procesar_multiples_detecciones(detecciones) == \
+                calculador.procesar_multiples_detecciones(detecciones)
+            del compartido, tabla
+        finally:
+            segmento.close()
+    finally:
+        publicado.close()
+        publicado.unlink()
+
+
+def test_publicar_tabla_con_forma_invalida():
+    with pytest.raises(ValueError, match="Forma de tabla inválida"):
+        publicar_tabla(np.zeros((2, 2)))
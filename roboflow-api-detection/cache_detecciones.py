@@ -0,0 +1,188 @@
+"""
+Caché en disco de resultados de detección (direccionada por contenido)
+
+La clave es el hash SHA-256 de los bytes de la imagen junto con el ID del workflow
+y los ajustes de filtrado, así volver a analizar la misma foto (reintentos, cargas
+repetidas, nuevas ejecuciones de la CLI) no paga otra inferencia remota.
+Las entradas vencen después de un TTL y, cuando la carpeta supera el tamaño máximo,
+se eliminan las menos usadas recientemente (LRU según la fecha de modificación).
+
+La usan deteccion_workflow.py y EcoDetectInt/app.py.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Carpeta de la caché (se puede cambiar con la variable de entorno ECODETECT_CACHE_DIR)
+CARPETA_CACHE = os.getenv("ECODETECT_CACHE_DIR", str(Path.home() / ".cache" / "ecodetect" / "detecciones"))
+
+# Tamaño máximo de la carpeta en bytes (al superarlo se eliminan las entradas menos usadas)
+TAMANO_MAX_BYTES = 256 * 1024 * 1024
+
+# Tiempo de vida de cada entrada en segundos (7 días)
+TTL_SEGUNDOS = 7 * 24 * 3600
+
+# Al recortar, se deja la carpeta en esta fracción del tamaño máximo (evita recortar en cada escritura)
+FRACCION_RECORTE = 0.9
+
+
+def clave_deteccion(imagen, workflow_id, **ajustes):
+    """
+    Calcula la clave de caché de una imagen.
+
+    Args:
+        imagen: Ruta de la imagen o sus bytes
+        workflow_id: ID del workflow de Roboflow
+        **ajustes: Ajustes que cambian el resultado (CONFIDENCE_MIN, AREA_MIN, ...)
+
+    Returns:
+        str: Hash SHA-256 en hexadecimal
+    """
+    h = hashlib.sha256()
+    if isinstance(imagen, (bytes, bytearray)):
+        h.update(imagen)
+    else:
+        with open(imagen, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(bloque)
+
+    h.update(b"\0" + json.dumps({"workflow_id": workflow_id, **ajustes}, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheDetecciones:
+    """Caché de resultados del workflow en disco con TTL y límite de tamaño (LRU)"""
+
+    def __init__(self, carpeta=CARPETA_CACHE, tamano_max=TAMANO_MAX_BYTES, ttl=TTL_SEGUNDOS):
+        """
+        Args:
+            carpeta: Carpeta de la caché
+            tamano_max: Tamaño máximo de la carpeta en bytes
+            ttl: Tiempo de vida de cada entrada en segundos
+        """
+        self.carpeta = Path(carpeta)
+        self.tamano_max = tamano_max
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._tamano = None  # se calcula al primer guardado
+        self._lock = threading.Lock()
+
+    def _ruta(self, clave):
+        """Ruta del archivo de una entrada (subcarpetas por prefijo para no llenar un solo directorio)"""
+        return self.carpeta / clave[:2] / f"{clave}.json"
+
+    def obtener(self, clave):
+        """
+        Busca un resultado en la caché.
+
+        Returns:
+            Resultado del workflow o None si no está o ya venció
+        """
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                entrada = json.load(f)
+        except (OSError, ValueError):
+            self.fallos += 1
+            return None
+
+        try:
+            vencida = time.time() - entrada["creado"] > self.ttl
+            resultado = entrada["resultado"]
+        except (KeyError, TypeError):
+            vencida = True  # entrada corrupta o de otro formato: se trata como fallo y se elimina
+
+        if vencida:
+            self._eliminar(ruta)
+            self.fallos += 1
+            return None
+
+        # Marcar como usada recientemente (la fecha de modificación ordena el LRU)
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+
+        self.aciertos += 1
+        return resultado
+
+    def guardar(self, clave, resultado):
+        """Guarda un resultado del workflow (escritura atómica: temporal + reemplazo)"""
+        ruta = self._ruta(clave)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+
+        temporal = ruta.with_name(f"{ruta.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({"creado": time.time(), "resultado": resultado}, f, ensure_ascii=False)
+        tamano = temporal.stat().st_size
+        try:
+            tamano -= ruta.stat().st_size  # se reemplaza una entrada existente: solo cuenta la diferencia
+        except OSError:
+            pass
+        os.replace(temporal, ruta)
+
+        with self._lock:
+            if self._tamano is None:
+                self._tamano = self._tamano_carpeta()
+            else:
+                self._tamano += tamano
+            if self._tamano > self.tamano_max:
+                self._recortar()
+
+    def obtener_o_detectar(self, clave, detectar):
+        """
+        Retorna el resultado en caché o llama a detectar() y guarda su resultado.
+        Los resultados vacíos (None, error) no se guardan.
+        """
+        resultado = self.obtener(clave)
+        if resultado is None:
+            resultado = detectar()
+            if resultado:
+                self.guardar(clave, resultado)
+        return resultado
+
+    def _entradas(self):
+        """Lista (ruta, estado) de las entradas guardadas"""
+        entradas = []
+        for ruta in self.carpeta.glob("*/*.json"):
+            try:
+                entradas.append((ruta, ruta.stat()))
+            except OSError:
+                pass  # eliminada por otro proceso mientras se recorría
+        return entradas
+
+    def _tamano_carpeta(self):
+        """Tamaño actual de la caché en bytes"""
+        return sum(estado.st_size for _, estado in self._entradas())
+
+    def _eliminar(self, ruta):
+        try:
+            ruta.unlink()
+        except OSError:
+            pass
+
+    def _recortar(self):
+        """Elimina las entradas menos usadas hasta dejar la caché bajo el límite"""
+        entradas = sorted(self._entradas(), key=lambda entrada: entrada[1].st_mtime)
+        tamano = sum(estado.st_size for _, estado in entradas)
+        limite = self.tamano_max * FRACCION_RECORTE
+
+        for ruta, estado in entradas:
+            if tamano <= limite:
+                break
+            self._eliminar(ruta)
+            tamano -= estado.st_size
+
+        self._tamano = tamano
+
+    def limpiar(self):
+        """Elimina todas las entradas"""
+        with self._lock:
+            for ruta, _ in self._entradas():
+                self._eliminar(ruta)
+            self._tamano = 0
@@ -0,0 +1,105 @@
+"""
+Cliente asíncrono del Workflow API de Roboflow
+
+Reutiliza un pool de conexiones HTTP (keep-alive) y limita las solicitudes en vuelo
+con un semáforo, así muchas imágenes se analizan a la vez sin un hilo por imagen.
+Envía la misma solicitud que InferenceHTTPClient.run_workflow.
+
+Librería necesaria: pip install httpx
+
+Ejemplo:
+    async with ClienteRoboflowAsync(API_KEY, WORKSPACE, WORKFLOW_ID) as cliente:
+        resultado = await cliente.detectar("bottle2.jpeg")
+"""
+import asyncio
+import base64
+from pathlib import Path
+
+import httpx
+
+API_URL = "https://serverless.roboflow.com"
+
+# Solicitudes simultáneas como máximo (también es el tamaño del pool de conexiones)
+MAX_CONCURRENTES = 8
+
+# Reintentos ante errores temporales del servidor (429 y 5xx) o de conexión
+REINTENTOS = 2
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class ClienteRoboflowAsync:
+    """Cliente asíncrono con pool de conexiones y concurrencia acotada"""
+
+    def __init__(self, api_key, workspace, workflow_id, api_url=API_URL,
+                 max_concurrentes=MAX_CONCURRENTES, timeout=60.0):
+        """
+        Args:
+            api_key: API Key de Roboflow
+            workspace: Workspace del workflow
+            workflow_id: ID del workflow
+            api_url: URL del servidor de inferencia
+            max_concurrentes: Solicitudes en vuelo como máximo
+            timeout: Tiempo máximo de cada solicitud en segundos
+        """
+        self.api_key = api_key
+        self.ruta_workflow = f"/{workspace}/workflows/{workflow_id}"
+        self._semaforo = asyncio.Semaphore(max_concurrentes)
+        self._cliente = httpx.AsyncClient(
+            base_url=api_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrentes, max_keepalive_connections=max_concurrentes)
+        )
+
+    async def detectar(self, imagen, use_cache=False):
+        """
+        Ejecuta el workflow sobre una imagen.
+
+        Args:
+            imagen: Ruta de la imagen o sus bytes
+            use_cache: Permitir la caché del servidor de Roboflow
+
+        Returns:
+            list: Salidas del workflow (mismo formato que run_workflow)
+
+        Raises:
+            httpx.HTTPError: Si la solicitud falla después de los reintentos
+        """
+        async with self._semaforo:
+            # La imagen se lee dentro del semáforo: solo las solicitudes en vuelo ocupan memoria
+            if isinstance(imagen, (bytes, bytearray)):
+                contenido = bytes(imagen)
+            else:
+                contenido = await asyncio.to_thread(Path(imagen).read_bytes)
+
+            payload = {
+                "api_key": self.api_key,
+                "use_cache": use_cache,
+                "enable_profiling": False,
+                "inputs": {
+                    "image": {"type": "base64", "value": base64.b64encode(contenido).decode("ascii")}
+                }
+            }
+
+            for intento in range(REINTENTOS + 1):
+                try:
+                    respuesta = await self._cliente.post(self.ruta_workflow, json=payload)
+                    if respuesta.status_code not in ESTADOS_REINTENTABLES or intento == REINTENTOS:
+                        break
+                except httpx.TransportError:
+                    if intento == REINTENTOS:
+                        raise
+                # Espera exponencial antes de reintentar (0.5 s, 1 s, ...)
+                await asyncio.sleep(0.5 * 2 ** intento)
+
+        respuesta.raise_for_status()
+        return respuesta.json()["outputs"]
+
+    async def cerrar(self):
+        """Cierra las conexiones del pool"""
+        await self._cliente.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.cerrar()
@@ -1,12 +1,25 @@
 """
 Script de detección usando Workflow API de Roboflow
 """
-#Librerías necesarias: pip install roboflow inference-sdk pillow
+#Librerías necesarias: pip install roboflow inference-sdk pillow numpy
+#Opcional: pip install pyarrow (exportación columnar)
+import argparse
+import asyncio
+import glob
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from inference_sdk import InferenceHTTPClient
 from pathlib import Path
 import os
-from PIL import Image, ImageDraw, ImageFont
+import requests
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from cache_detecciones import CacheDetecciones, clave_deteccion
+from exportar_columnar import CARPETA_EXPORTACION, MATERIAL_POR_CATEGORIA, ExportadorColumnar, pyarrow_disponible
+from imagenes_workflow import MODOS_OUTPUT_IMAGE, nombre_salida, procesar_imagenes_salida, sin_imagenes
+from postprocesamiento import normalizar_clase, postprocesar, resolver_clase
+from preprocesamiento import escalar_resultado, preprocesar_imagen
 
 # datos de API de Roboflow
 API_KEY = "2b7LoZjjvB3oRq9ZGGCx"
@@ -27,6 +40,58 @@ WORKFLOW_ID = "detect-count-and-visualize-3"
 CONFIDENCE_MIN = 0.85  # Solo detecciones con 85% o más de confianza
 AREA_MIN = 5000       # Área mínima del objeto en píxeles cuadrados (ancho × alto)
 
+# Supresión de no máximos (NMS) después de los filtros: de cada grupo de cajas superpuestas
+# (IoU mayor a IOU_NMS) se conserva la de mayor confianza. Desactivada por defecto (None) porque
+# cambia el conteo y los puntos respecto de los análisis anteriores; activarla con un umbral, ej. 0.5.
+# MODO_NMS: "por_clase" (solo entre cajas de la misma clase) o "agnostico" (entre todas)
+IOU_NMS = None
+MODO_NMS = "por_clase"
+
+# Preprocesamiento antes de enviar a Roboflow: lado mayor en píxeles (0 para enviar la original) y calidad JPEG
+# Las cajas se vuelven a escalar al tamaño original, así AREA_MIN se sigue midiendo sobre la foto original
+LADO_MAX_ENVIO = 1280
+CALIDAD_JPEG_ENVIO = 85
+
+# Imagen anotada (output_image, base64 de cientos de KB) que devuelve el workflow:
+# "descartar", "externalizar" (archivo en resultados_imagenes/ referenciado desde el JSON) o "conservar"
+MODO_OUTPUT_IMAGE = "externalizar"
+
+# Caché local de resultados del workflow (carpeta en ECODETECT_CACHE_DIR, ver cache_detecciones.py)
+USAR_CACHE_DETECCIONES = True
+cache_detecciones = CacheDetecciones() if USAR_CACHE_DETECCIONES else None
+
+# Exportación columnar (Parquet) de detecciones, conteos e impacto (requiere pyarrow)
+EXPORTAR_COLUMNAR = True
+
+# Cálculo de impacto ambiental con el microservicio FastAPI_IA. Desactivado por defecto (la CLI
+# funciona sin red local); se activa con la variable de entorno FASTAPI_URL o con --fastapi-url,
+# por ejemplo http://localhost:8000/calcular-impacto
+FASTAPI_URL = os.getenv("FASTAPI_URL") or None
+
+# Modo por lotes: extensiones de imagen aceptadas y cantidad de análisis simultáneos
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png'}
+WORKERS_LOTE = 8
+
+# Mapeo de clases posibles a categorías
+MAPEO_CLASES = {
+    'botella_plastico': 'botellas_plastico',
+    'botella_plastica': 'botellas_plastico',
+    'plastic': 'botellas_plastico',
+    'plastico': 'botellas_plastico',
+    'pet': 'botellas_plastico',
+    'botella_vidrio': 'botellas_vidrio',
+    'glass': 'botellas_vidrio',
+    'vidrio': 'botellas_vidrio',
+    'lata_aluminio': 'latas_aluminio',
+    'lata': 'latas_aluminio',
+    'can': 'latas_aluminio',
+    'aluminum': 'latas_aluminio',
+    'aluminio': 'latas_aluminio'
+}
+
+# Categorías del conteo por tipo, en orden
+CATEGORIAS_CONTEO = ("botellas_plastico", "botellas_vidrio", "latas_aluminio")
+
 
 def conectar_cliente():
     """Conecta con el servidor de inferencia de Roboflow"""
@@ -38,16 +103,45 @@ def conectar_cliente():
     print(f"  Workspace: {WORKSPACE}")
     print(f"  Workflow: {WORKFLOW_ID}")
     print(f"  Confianza mínima: {CONFIDENCE_MIN*100:.0f}%")
-    print(f"  Área mínima: {AREA_MIN} px²\n")
+    print(f"  Área mínima: {AREA_MIN} px²")
+    print(f"  NMS: {'desactivado' if IOU_NMS is None else f'IoU {IOU_NMS} ({MODO_NMS})'}\n")
     return client
 
-def detectar_objetos_workflow(client, imagen_path):
+def clave_cache(imagen_path):
+    """
+    Clave de caché de una imagen: sus bytes, el workflow, el preprocesamiento y los filtros de detección.
+    No incluye MODO_OUTPUT_IMAGE: la caché guarda el resultado sin la imagen anotada,
+    así la comparten la CLI y EcoDetectInt/app.py
+    """
+    return clave_deteccion(
+        imagen_path, WORKFLOW_ID, confidence_min=CONFIDENCE_MIN, area_min=AREA_MIN,
+        lado_max=LADO_MAX_ENVIO, calidad_jpeg=CALIDAD_JPEG_ENVIO
+    )
+
+def leer_cache(clave):
+    """
+    Busca un resultado en la caché local. Con MODO_OUTPUT_IMAGE = "conservar" no se consulta:
+    las entradas no traen la imagen anotada en base64
+    """
+    if MODO_OUTPUT_IMAGE == "conservar":
+        return None
+    return cache_detecciones.obtener(clave)
+
+def preparar_resultado(resultado, imagen_path):
+    """
+    Descarta o externaliza la output_image según MODO_OUTPUT_IMAGE, venga el resultado
+    de la caché (donde ya no la trae) o del workflow
+    """
+    return procesar_imagenes_salida(resultado, MODO_OUTPUT_IMAGE, nombre_salida(imagen_path))
+
+def detectar_objetos_workflow(client, imagen_path, detallado=True):
     """
     Detecta objetos usando el workflow de Roboflow
     
     Args:
         client: Cliente de inferencia
         imagen_path: Ruta a la imagen
+        detallado: Mostrar el avance en consola (False en el modo por lotes)
     
     Returns:
         dict: Resultados del workflow
@@ -56,33 +150,55 @@ def detectar_objetos_workflow(client, imagen_path):
         print(f"✗ Error: La imagen '{imagen_path}' no existe")
         return None
     
-    print(f"📸 Analizando: {imagen_path}")
+    if detallado:
+        print(f"📸 Analizando: {imagen_path}")
+    
+    clave = None
+    if cache_detecciones is not None:
+        clave = clave_cache(imagen_path)
+        result = leer_cache(clave)
+        if result is not None:
+            if detallado:
+                print(f"♻️  Resultado tomado de la caché local\n")
+            return preparar_resultado(result, imagen_path)
     
     try:
+        # Reducir y recodificar antes de subir (la subida domina la latencia)
+        preprocesada = preprocesar_imagen(imagen_path, LADO_MAX_ENVIO, CALIDAD_JPEG_ENVIO)
+        if detallado and preprocesada.escala_x != 1:
+            print(f"🗜️  Enviando {preprocesada.tamano_enviado[0]}x{preprocesada.tamano_enviado[1]} px "
+                  f"(original {preprocesada.tamano_original[0]}x{preprocesada.tamano_original[1]} px, "
+                  f"{len(preprocesada.contenido) / 1024:.0f} KB)")
+        
         # Ejecutar workflow
         result = client.run_workflow(
             workspace_name=WORKSPACE,
             workflow_id=WORKFLOW_ID,
             images={
-                "image": imagen_path
+                "image": preprocesada.base64
             },
             use_cache=False  # Desactivar cache para ver resultados actualizados
         )
         
-        print(f"✓ Análisis completado\n")
+        # Coordenadas de vuelta a la imagen original; en la caché se guarda sin la output_image
+        result = escalar_resultado(result, preprocesada)
+        if clave is not None and result:
+            cache_detecciones.guardar(clave, sin_imagenes(result))
+        result = preparar_resultado(result, imagen_path)
+        
+        if detallado:
+            print(f"✓ Análisis completado\n")
         return result
         
     except Exception as e:
-        print(f"✗ Error en la detección: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"✗ Error en la detección de '{imagen_path}': {e}")
+        if detallado:
+            import traceback
+            traceback.print_exc()
         return None
 
-def extraer_predicciones(resultado_workflow):
-    """
-    Extrae y filtra las predicciones del resultado del workflow
-    Aplica filtros de confianza y área para reducir falsos positivos
-    """
+def obtener_predicciones(resultado_workflow):
+    """Obtiene la lista de predicciones (sin filtrar) del resultado del workflow"""
     predicciones = []
     
     if not resultado_workflow:
@@ -112,37 +228,53 @@ def extraer_predicciones(resultado_workflow):
     except Exception as e:
         print(f"⚠️  Advertencia al extraer predicciones: {e}")
     
-    # Aplicar filtros para reducir falsos positivos
-    predicciones_filtradas = []
-    total_antes = len(predicciones)
-    
-    for pred in predicciones:
-        # Filtro 1: Confianza mínima
-        confidence = pred.get('confidence', 0)
-        if confidence < CONFIDENCE_MIN:
-            continue
-        
-        # Filtro 2: Área mínima (evitar detecciones muy pequeñas)
-        width = pred.get('width', 0)
-        height = pred.get('height', 0)
-        area = width * height
-        
-        if area < AREA_MIN:
-            continue
-        
-        # Si pasa todos los filtros, incluir
-        predicciones_filtradas.append(pred)
+    return predicciones
+
+def analizar_predicciones(resultado_workflow, detallado=True):
+    """
+    Extrae, filtra, clasifica y cuenta las predicciones del workflow en una sola pasada
+    Aplica filtros de confianza y área, y NMS para descartar duplicadas (reduce falsos positivos)
+    (detallado=False omite el resumen de filtrado en consola)
     
-    total_despues = len(predicciones_filtradas)
+    Returns:
+        ResultadoPostproceso: predicciones filtradas, su categoría, conteo por tipo y estadísticas
+    """
+    resultado = postprocesar(
+        obtener_predicciones(resultado_workflow), MAPEO_CLASES, CONFIDENCE_MIN, AREA_MIN, CATEGORIAS_CONTEO,
+        iou_nms=IOU_NMS, modo_nms=MODO_NMS
+    )
     
-    if total_antes > 0:
+    estadisticas = resultado.estadisticas
+    if estadisticas["total"] > 0 and detallado:
         print(f"🔍 Filtrado de detecciones:")
-        print(f"   • Total inicial: {total_antes}")
-        print(f"   • Filtradas por baja confianza: {sum(1 for p in predicciones if p.get('confidence', 0) < CONFIDENCE_MIN)}")
-        print(f"   • Filtradas por área pequeña: {sum(1 for p in predicciones if (p.get('width', 0) * p.get('height', 0)) < AREA_MIN and p.get('confidence', 0) >= CONFIDENCE_MIN)}")
-        print(f"   • Detecciones válidas: {total_despues}\n")
+        print(f"   • Total inicial: {estadisticas['total']}")
+        print(f"   • Filtradas por baja confianza: {estadisticas['baja_confianza']}")
+        print(f"   • Filtradas por área pequeña: {estadisticas['area_pequena']}")
+        if IOU_NMS is not None:
+            print(f"   • Duplicadas suprimidas (NMS, IoU > {IOU_NMS}): {estadisticas['suprimidas_nms']}")
+        print(f"   • Detecciones válidas: {estadisticas['validas']}\n")
+    
+    return resultado
+
+def extraer_predicciones(resultado_workflow, detallado=True):
+    """
+    Extrae y filtra las predicciones del resultado del workflow
+    (ver analizar_predicciones para obtener también el conteo en la misma pasada)
+    """
+    return analizar_predicciones(resultado_workflow, detallado).predicciones
+
+def clasificar_prediccion(pred):
+    """
+    Obtiene la categoría de una predicción según su clase
+    (coincidencia exacta o parcial, memorizada por nombre de clase)
+    
+    Args:
+        pred: Predicción del workflow
     
-    return predicciones_filtradas
+    Returns:
+        str: Categoría del conteo (ej. 'botellas_plastico') o None si no coincide
+    """
+    return resolver_clase(normalizar_clase(pred.get('class', '')), tuple(MAPEO_CLASES.items()))
 
 def contar_por_tipo(predicciones):
     """
@@ -154,46 +286,39 @@ def contar_por_tipo(predicciones):
     Returns:
         dict: Conteo por tipo
     """
-    conteo = {
-        "botellas_plastico": 0,
-        "botellas_vidrio": 0,
-        "latas_aluminio": 0
-    }
+    conteo = dict.fromkeys(CATEGORIAS_CONTEO, 0)
+    for pred in predicciones or []:
+        categoria = clasificar_prediccion(pred)
+        if categoria in conteo:
+            conteo[categoria] += 1
+    return conteo
+
+def calcular_impacto(conteo):
+    """
+    Calcula el impacto ambiental del conteo con el microservicio FastAPI_IA
     
-    if not predicciones:
-        return conteo
-    
-    # Mapeo de clases posibles a categorías
-    mapeo_clases = {
-        'botella_plastico': 'botellas_plastico',
-        'botella_plastica': 'botellas_plastico',
-        'plastic': 'botellas_plastico',
-        'plastico': 'botellas_plastico',
-        'pet': 'botellas_plastico',
-        'botella_vidrio': 'botellas_vidrio',
-        'glass': 'botellas_vidrio',
-        'vidrio': 'botellas_vidrio',
-        'lata_aluminio': 'latas_aluminio',
-        'lata': 'latas_aluminio',
-        'can': 'latas_aluminio',
-        'aluminum': 'latas_aluminio',
-        'aluminio': 'latas_aluminio'
-    }
+    Args:
+        conteo: Conteo por tipo
     
-    for pred in predicciones:
-        clase = pred.get('class', '').lower().replace(' ', '_')
-        
-        # Buscar coincidencia exacta primero
-        if clase in mapeo_clases:
-            conteo[mapeo_clases[clase]] += 1
-        else:
-            # Buscar coincidencia parcial
-            for clave, categoria in mapeo_clases.items():
-                if clave in clase or clase in clave:
-                    conteo[categoria] += 1
-                    break
+    Returns:
+        dict: Respuesta de /calcular-impacto, o None si está desactivado, no hay objetos o el servicio no responde
+    """
+    detecciones = [
+        {"material": MATERIAL_POR_CATEGORIA[categoria], "cantidad": cantidad}
+        for categoria, cantidad in conteo.items()
+        if cantidad > 0
+    ]
     
-    return conteo
+    if not FASTAPI_URL or not detecciones:
+        return None
+    
+    try:
+        response = requests.post(FASTAPI_URL, json={"detecciones": detecciones}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        print(f"⚠️  No se pudo calcular el impacto ambiental: {e}")
+        return None
 
 def mostrar_resultados(predicciones):
     """Muestra las predicciones en consola con formato"""
@@ -308,7 +433,8 @@ def guardar_imagen_con_detecciones(predicciones, nombre_imagen):
         os.makedirs(carpeta_salida, exist_ok=True)
         
         # Cargar imagen
-        img = Image.open(nombre_imagen)
+        # Con la orientación EXIF aplicada, igual que la imagen enviada a Roboflow
+        img = ImageOps.exif_transpose(Image.open(nombre_imagen))
         draw = ImageDraw.Draw(img)
         
         # Intentar cargar una fuente, si falla usar la predeterminada
@@ -401,8 +527,230 @@ def guardar_imagen_con_detecciones(predicciones, nombre_imagen):
         import traceback
         traceback.print_exc()
 
+def listar_imagenes(entrada):
+    """
+    Obtiene las imágenes a analizar a partir de un directorio o un patrón glob
+    
+    Args:
+        entrada: Directorio (ej. 'fotos/') o patrón (ej. 'fotos/**/*.jpg')
+    
+    Returns:
+        list: Rutas de las imágenes, ordenadas
+    """
+    if os.path.isdir(entrada):
+        rutas = [str(ruta) for ruta in Path(entrada).iterdir()]
+    else:
+        rutas = glob.glob(entrada, recursive=True)
+    
+    return sorted(ruta for ruta in rutas if Path(ruta).suffix.lower() in EXTENSIONES_IMAGEN)
+
+def registro_imagen(imagen, resultado, inicio, con_impacto):
+    """
+    Arma el registro de una imagen del modo por lotes (una línea del JSONL)
+    
+    Args:
+        imagen: Ruta de la imagen
+        resultado: Resultado del workflow (None si falló)
+        inicio: Instante (time.perf_counter) en que empezó el análisis
+        con_impacto: Calcular el impacto ambiental con FastAPI_IA
+    """
+    if resultado is None:
+        return {"imagen": imagen, "estado": "error", "latencia_s": round(time.perf_counter() - inicio, 3)}
+    
+    analisis = analizar_predicciones(resultado, detallado=False)
+    predicciones, conteo = analisis.predicciones, analisis.conteo
+    impacto = calcular_impacto(conteo) if con_impacto else None
+    
+    return {
+        "imagen": imagen,
+        "estado": "ok",
+        "latencia_s": round(time.perf_counter() - inicio, 3),
+        "total_objetos": sum(conteo.values()),
+        "conteo_por_tipo": conteo,
+        "impacto": impacto,
+        "predicciones": predicciones
+    }
+
+def analizar_imagen_lote(client, imagen, con_impacto):
+    """Analiza una imagen sin salida en consola (se ejecuta en un hilo del modo por lotes)"""
+    inicio = time.perf_counter()
+    resultado = detectar_objetos_workflow(client, imagen, detallado=False)
+    return registro_imagen(imagen, resultado, inicio, con_impacto)
+
+async def analizar_imagen_async(cliente, imagen, con_impacto):
+    """Analiza una imagen con el cliente asíncrono (modo por lotes con --async)"""
+    inicio = time.perf_counter()
+    resultado = clave = None
+    if cache_detecciones is not None:
+        # Hashear y leer la caché toca el disco: fuera del event loop
+        clave = await asyncio.to_thread(clave_cache, imagen)
+        resultado = await asyncio.to_thread(leer_cache, clave)
+    
+    if resultado is None:
+        try:
+            preprocesada = await asyncio.to_thread(preprocesar_imagen, imagen, LADO_MAX_ENVIO, CALIDAD_JPEG_ENVIO)
+            resultado = await cliente.detectar(preprocesada.contenido)
+            resultado = await asyncio.to_thread(escalar_resultado, resultado, preprocesada)
+        except Exception as e:
+            print(f"✗ Error en la detección de '{imagen}': {e}")
+            resultado = None
+        
+        if clave is not None and resultado:
+            await asyncio.to_thread(cache_detecciones.guardar, clave, sin_imagenes(resultado))
+    
+    # Externalizar la output_image escribe en disco: fuera del event loop
+    if resultado:
+        resultado = await asyncio.to_thread(preparar_resultado, resultado, imagen)
+    
+    # El cálculo de impacto usa requests (bloqueante): se ejecuta fuera del event loop
+    return await asyncio.to_thread(registro_imagen, imagen, resultado, inicio, con_impacto)
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+class ResumenLote:
+    """Escribe los registros del modo por lotes a medida que llegan y acumula las estadísticas"""
+    
+    def __init__(self, archivo_salida, total):
+        self.archivo_salida = archivo_salida
+        self.salida = open(archivo_salida, 'w', encoding='utf-8')
+        self.total = total
+        self.latencias = []
+        self.errores = 0
+        self.total_objetos = 0
+        self.inicio = time.perf_counter()
+        
+        self.exportador = None
+        if EXPORTAR_COLUMNAR and pyarrow_disponible():
+            self.exportador = ExportadorColumnar(CARPETA_EXPORTACION)
+    
+    def agregar(self, registro):
+        """Escribe el registro de una imagen en el JSONL y lo suma a las estadísticas"""
+        self.salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self.salida.flush()
+        
+        self.latencias.append(registro["latencia_s"])
+        if registro["estado"] == "ok":
+            self.total_objetos += registro["total_objetos"]
+            if self.exportador is not None:
+                self.exportador.agregar_analisis(
+                    registro["imagen"],
+                    registro["predicciones"],
+                    [clasificar_prediccion(pred) for pred in registro["predicciones"]],
+                    registro["conteo_por_tipo"],
+                    registro["impacto"]
+                )
+        else:
+            self.errores += 1
+        
+        print(f"[{len(self.latencias)}/{self.total}] {registro['imagen']}: {registro['estado']} "
+              f"({registro['latencia_s']:.2f} s)")
+    
+    def cerrar(self):
+        """Cierra la salida y muestra el rendimiento y los percentiles de latencia"""
+        self.salida.close()
+        if self.exportador is not None:
+            self.exportador.cerrar()
+        
+        duracion = time.perf_counter() - self.inicio
+        ordenadas = sorted(self.latencias)
+        
+        print("\n" + "="*70)
+        print("RESUMEN DEL LOTE")
+        print("="*70)
+        print(f"🖼️  Imágenes: {len(self.latencias)} de {self.total} ({self.errores} con error)")
+        print(f"📊 Objetos detectados: {self.total_objetos}")
+        if cache_detecciones is not None:
+            print(f"♻️  Caché local: {cache_detecciones.aciertos} acierto(s), {cache_detecciones.fallos} fallo(s)")
+        print(f"⏱️  Tiempo total: {duracion:.2f} s ({len(self.latencias) / duracion:.2f} imágenes/s)")
+        # Si el lote se cortó antes de terminar alguna imagen (ej. error al conectar) no hay latencias
+        if ordenadas:
+            print(f"⏱️  Latencia p50: {percentil(ordenadas, 50):.2f} s | p95: {percentil(ordenadas, 95):.2f} s | "
+                  f"p99: {percentil(ordenadas, 99):.2f} s")
+        print(f"💾 Resultados guardados en: {self.archivo_salida}")
+        print("="*70 + "\n")
+
+async def procesar_lote_async(imagenes, resumen, workers, con_impacto):
+    """Analiza las imágenes con el cliente asíncrono (un solo hilo, conexiones reutilizadas)"""
+    from cliente_async import ClienteRoboflowAsync
+    
+    async with ClienteRoboflowAsync(API_KEY, WORKSPACE, WORKFLOW_ID, max_concurrentes=workers) as cliente:
+        tareas = [analizar_imagen_async(cliente, imagen, con_impacto) for imagen in imagenes]
+        for tarea in asyncio.as_completed(tareas):
+            resumen.agregar(await tarea)
+
+def procesar_lote(entrada, archivo_salida, workers=WORKERS_LOTE, con_impacto=True, usar_async=False):
+    """
+    Analiza muchas imágenes en paralelo y escribe un resultado por línea (JSONL)
+    a medida que terminan. Al final muestra el rendimiento y los percentiles de latencia.
+    
+    Args:
+        entrada: Directorio o patrón glob de imágenes
+        archivo_salida: Archivo JSONL de resultados
+        workers: Cantidad máxima de análisis simultáneos
+        con_impacto: Calcular el impacto ambiental con FastAPI_IA
+        usar_async: Usar el cliente asíncrono (requiere httpx) en lugar de un hilo por análisis
+    """
+    imagenes = listar_imagenes(entrada)
+    if not imagenes:
+        print(f"⚠️  No se encontraron imágenes en: {entrada}\n")
+        return
+    
+    modo = "cliente asíncrono" if usar_async else "hilos"
+    print(f"📂 {len(imagenes)} imagen(es) a analizar con {workers} solicitud(es) simultáneas ({modo})\n")
+    
+    resumen = ResumenLote(archivo_salida, len(imagenes))
+    try:
+        if usar_async:
+            asyncio.run(procesar_lote_async(imagenes, resumen, workers, con_impacto))
+        else:
+            client = conectar_cliente()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futuros = [pool.submit(analizar_imagen_lote, client, imagen, con_impacto) for imagen in imagenes]
+                for futuro in as_completed(futuros):
+                    resumen.agregar(futuro.result())
+    finally:
+        resumen.cerrar()
+
 def main():
     """Función principal"""
+    global cache_detecciones, MODO_OUTPUT_IMAGE, FASTAPI_URL
+    
+    parser = argparse.ArgumentParser(description="Detección de reciclables con Roboflow Workflow")
+    parser.add_argument("entrada", nargs="?",
+                        help="Directorio o patrón glob de imágenes (modo por lotes, sin preguntas)")
+    parser.add_argument("--salida", default="resultados_lote.jsonl",
+                        help="Archivo JSONL del modo por lotes (por defecto resultados_lote.jsonl)")
+    parser.add_argument("--workers", type=int, default=WORKERS_LOTE,
+                        help=f"Análisis simultáneos en el modo por lotes (por defecto {WORKERS_LOTE})")
+    parser.add_argument("--fastapi-url", default=FASTAPI_URL,
+                        help="URL de /calcular-impacto de FastAPI_IA para calcular el impacto ambiental "
+                             "(por defecto la variable de entorno FASTAPI_URL; sin ella no se calcula)")
+    parser.add_argument("--sin-impacto", action="store_true",
+                        help="No calcular el impacto ambiental con FastAPI_IA en el modo por lotes")
+    parser.add_argument("--async", dest="usar_async", action="store_true",
+                        help="Modo por lotes con el cliente asíncrono (pool de conexiones, requiere httpx)")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="No usar la caché local de resultados (siempre consulta a Roboflow)")
+    parser.add_argument("--output-image", choices=MODOS_OUTPUT_IMAGE, default=MODO_OUTPUT_IMAGE,
+                        help=f"Qué hacer con la imagen anotada del workflow (por defecto {MODO_OUTPUT_IMAGE})")
+    args = parser.parse_args()
+    
+    if args.sin_cache:
+        cache_detecciones = None
+    MODO_OUTPUT_IMAGE = args.output_image
+    FASTAPI_URL = args.fastapi_url
+    
+    if args.entrada:
+        print("\n" + "="*70)
+        print("🤖 SISTEMA DE DETECCIÓN DE RECICLABLES - MODO POR LOTES")
+        print("="*70 + "\n")
+        procesar_lote(args.entrada, args.salida, args.workers, con_impacto=not args.sin_impacto,
+                      usar_async=args.usar_async)
+        return
+    
     print("\n" + "="*70)
     print("🤖 SISTEMA DE DETECCIÓN DE RECICLABLES - ROBOFLOW WORKFLOW")
     print("="*70 + "\n")
@@ -427,8 +775,9 @@ def main():
         # Guardar resultado completo
         guardar_json_completo(resultado, imagen)
         
-        # Extraer predicciones
-        predicciones = extraer_predicciones(resultado)
+        # Extraer, filtrar, clasificar y contar predicciones (una sola pasada)
+        analisis = analizar_predicciones(resultado)
+        predicciones = analisis.predicciones
         
         if predicciones:
             # Mostrar en consola
@@ -437,12 +786,26 @@ def main():
             # Guardar predicciones
             guardar_json_predicciones(predicciones, imagen)
             
-            # Contar por tipo
-            conteo = contar_por_tipo(predicciones)
+            # Conteo por tipo
+            conteo = analisis.conteo
             guardar_json_conteo(conteo, imagen)
             
             # Guardar imagen con detecciones visualizadas
             guardar_imagen_con_detecciones(predicciones, imagen)
+            
+            # Exportar a Parquet (detecciones, conteo e impacto) para análisis
+            if EXPORTAR_COLUMNAR:
+                if pyarrow_disponible():
+                    with ExportadorColumnar(CARPETA_EXPORTACION) as exportador:
+                        exportador.agregar_analisis(
+                            imagen,
+                            predicciones,
+                            analisis.categorias,
+                            conteo,
+                            calcular_impacto(conteo)
+                        )
+                else:
+                    print("⚠️  pyarrow no está instalado: se omite la exportación columnar")
         else:
             print("⚠️  No se pudieron extraer predicciones del workflow")
             print("📄 Revisa el archivo workflow_completo_*.json para ver la estructura\n")
@@ -0,0 +1,212 @@
+"""
+Exportación columnar (Parquet) de detecciones, conteos e impacto ambiental
+
+Agrega los resultados de cada análisis a tres datasets Parquet particionados por
+fecha y material (formato Hive: fecha=2025-11-18/material=botella_plastico/...).
+Las filas se acumulan en memoria y se escriben por lotes, así las consultas de
+meses de datos leen solo las columnas y particiones que necesitan.
+
+Librería necesaria: pip install pyarrow
+"""
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pyarrow es opcional: sin él no se exporta
+    pa = None
+    ds = None
+
+# Carpeta base de los datasets (una subcarpeta por dataset)
+CARPETA_EXPORTACION = "exportacion_columnar"
+
+# Filas acumuladas antes de escribir un lote
+TAMANO_LOTE = 5000
+
+# Material de las detecciones que no coinciden con ninguna categoría
+SIN_CLASIFICAR = "sin_clasificar"
+
+# Categorías del conteo -> nombre del material en la API de cálculo (FastAPI_IA)
+MATERIAL_POR_CATEGORIA = {
+    "botellas_plastico": "botella_plastico",
+    "botellas_vidrio": "botella_vidrio",
+    "latas_aluminio": "lata_aluminio"
+}
+
+if pa is not None:
+    ESQUEMAS = {
+        "detecciones": pa.schema([
+            ("fecha", pa.string()),
+            ("material", pa.string()),
+            ("imagen", pa.string()),
+            ("analizado_en", pa.timestamp("s", tz="UTC")),
+            ("detection_id", pa.string()),
+            ("clase", pa.string()),
+            ("confianza", pa.float32()),
+            ("x", pa.float32()),
+            ("y", pa.float32()),
+            ("ancho", pa.float32()),
+            ("alto", pa.float32())
+        ]),
+        "conteos": pa.schema([
+            ("fecha", pa.string()),
+            ("material", pa.string()),
+            ("imagen", pa.string()),
+            ("analizado_en", pa.timestamp("s", tz="UTC")),
+            ("cantidad", pa.int32())
+        ]),
+        "impacto": pa.schema([
+            ("fecha", pa.string()),
+            ("material", pa.string()),
+            ("imagen", pa.string()),
+            ("analizado_en", pa.timestamp("s", tz="UTC")),
+            ("cantidad", pa.int32()),
+            ("peso_estimado_gramos", pa.float64()),
+            ("co2_evitado_kg", pa.float64()),
+            ("energia_ahorrada_kwh", pa.float64()),
+            ("puntos_ecologicos", pa.int32())
+        ])
+    }
+else:
+    ESQUEMAS = {}
+
+
+def pyarrow_disponible():
+    """Indica si pyarrow está instalado"""
+    return pa is not None
+
+
+class ExportadorColumnar:
+    """
+    Acumula los resultados de los análisis y los escribe por lotes en datasets
+    Parquet particionados por fecha y material
+    """
+
+    def __init__(self, carpeta=CARPETA_EXPORTACION, tamano_lote=TAMANO_LOTE):
+        """
+        Args:
+            carpeta: Carpeta base de los datasets
+            tamano_lote: Filas acumuladas (en total) que disparan la escritura
+
+        Raises:
+            RuntimeError: Si pyarrow no está instalado
+        """
+        if pa is None:
+            raise RuntimeError("pyarrow no está instalado (pip install pyarrow)")
+
+        self.carpeta = Path(carpeta)
+        self.tamano_lote = tamano_lote
+        self.filas = {nombre: {columna: [] for columna in esquema.names} for nombre, esquema in ESQUEMAS.items()}
+        self.pendientes = 0
+        self.lotes_escritos = 0
+
+    def _agregar_fila(self, dataset, **valores):
+        """Agrega una fila al buffer de un dataset"""
+        for columna, lista in self.filas[dataset].items():
+            lista.append(valores[columna])
+        self.pendientes += 1
+
+    def agregar_analisis(self, imagen, predicciones, materiales, conteo, impacto=None, fecha=None):
+        """
+        Agrega el resultado de un análisis (una imagen).
+
+        Args:
+            imagen: Ruta o nombre de la imagen analizada
+            predicciones: Predicciones filtradas del workflow
+            materiales: Categoría de cada predicción (ver contar_por_tipo) o None si no se clasificó
+            conteo: Conteo por tipo ({"botellas_plastico": 2, ...})
+            impacto: Respuesta de /calcular-impacto de FastAPI_IA (opcional)
+            fecha: Momento del análisis (por defecto, ahora en UTC)
+        """
+        fecha = (fecha or datetime.now(timezone.utc)).replace(microsecond=0)
+        comunes = {"fecha": fecha.date().isoformat(), "imagen": str(imagen), "analizado_en": fecha}
+
+        for pred, categoria in zip(predicciones, materiales):
+            self._agregar_fila(
+                "detecciones",
+                **comunes,
+                material=MATERIAL_POR_CATEGORIA.get(categoria, SIN_CLASIFICAR),
+                detection_id=pred.get('detection_id'),
+                clase=pred.get('class'),
+                confianza=pred.get('confidence'),
+                x=pred.get('x'),
+                y=pred.get('y'),
+                ancho=pred.get('width'),
+                alto=pred.get('height')
+            )
+
+        for categoria, cantidad in conteo.items():
+            if cantidad > 0:
+                self._agregar_fila(
+                    "conteos", **comunes, material=MATERIAL_POR_CATEGORIA.get(categoria, categoria), cantidad=cantidad
+                )
+
+        if impacto:
+            for item in impacto.get("desglose_por_material", []):
+                self._agregar_fila(
+                    "impacto",
+                    **comunes,
+                    material=item["material"],
+                    cantidad=item["cantidad"],
+                    peso_estimado_gramos=item["peso_estimado_gramos"],
+                    co2_evitado_kg=item["co2_evitado_kg"],
+                    energia_ahorrada_kwh=item["energia_ahorrada_kwh"],
+                    puntos_ecologicos=item["puntos_ecologicos"]
+                )
+
+        if self.pendientes >= self.tamano_lote:
+            self.escribir_lote()
+
+    def escribir_lote(self):
+        """Escribe las filas acumuladas como archivos Parquet nuevos en cada partición"""
+        if self.pendientes == 0:
+            return
+
+        # Nombre único por lote: los lotes anteriores no se sobrescriben (se agregan archivos)
+        lote = f"lote-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+        for nombre, columnas in self.filas.items():
+            if not columnas["fecha"]:
+                continue
+
+            tabla = pa.Table.from_pydict(columnas, schema=ESQUEMAS[nombre])
+            ds.write_dataset(
+                tabla,
+                self.carpeta / nombre,
+                format="parquet",
+                partitioning=["fecha", "material"],
+                partitioning_flavor="hive",
+                basename_template=f"{lote}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore"
+            )
+
+            for lista in columnas.values():
+                lista.clear()
+
+        self.pendientes = 0
+        self.lotes_escritos += 1
+        print(f"🧱 Lote columnar escrito en: {self.carpeta}")
+
+    def cerrar(self):
+        """Escribe las filas pendientes"""
+        self.escribir_lote()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def leer_dataset(nombre, carpeta=CARPETA_EXPORTACION):
+    """
+    Abre un dataset exportado para consultarlo (con filtros y columnas).
+
+    Ejemplo:
+        leer_dataset("impacto").to_table(columns=["co2_evitado_kg"], filter=ds.field("material") == "lata_aluminio")
+    """
+    if ds is None:
+        raise RuntimeError("pyarrow no está instalado (pip install pyarrow)")
+    return ds.dataset(Path(carpeta) / nombre, format="parquet", partitioning="hive")
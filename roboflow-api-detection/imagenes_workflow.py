@@ -0,0 +1,126 @@
+"""
+Manejo de la imagen de salida (output_image) del workflow de Roboflow
+
+La respuesta del workflow trae la imagen anotada como un string base64 enorme
+(ver workflow_completo_bottle2.json: ~280 KB de los ~281 KB del archivo). Apenas
+se recibe el resultado, ese campo se descarta o se externaliza: se decodifica y
+se escribe en un archivo binario aparte, y en el JSON queda solo la referencia.
+
+Modos:
+    descartar    - elimina el campo
+    externalizar - lo escribe en un archivo y deja {"tipo": "archivo", "ruta": ...}
+    conservar    - lo deja como viene (comportamiento anterior)
+"""
+import base64
+import hashlib
+import os
+from pathlib import Path
+
+MODOS_OUTPUT_IMAGE = ("descartar", "externalizar", "conservar")
+
+# Campos de cada salida del workflow que contienen imágenes en base64
+CAMPOS_IMAGEN = ("output_image",)
+
+# Carpeta por defecto de las imágenes externalizadas
+CARPETA_IMAGENES = "resultados_imagenes"
+
+# Firmas (en base64) de los formatos de imagen más comunes -> extensión
+EXTENSIONES_BASE64 = {
+    "/9j/": ".jpg",
+    "iVBORw0KGgo": ".png",
+    "UklGR": ".webp"
+}
+
+
+def _valor_base64(campo):
+    """Obtiene el string base64 de un campo (string directo o {"type": "base64", "value": ...})"""
+    if isinstance(campo, str):
+        return campo
+    if isinstance(campo, dict) and isinstance(campo.get("value"), str):
+        return campo["value"]
+    return None
+
+
+def _extension(valor):
+    """Extensión del archivo según la firma del contenido en base64"""
+    for firma, extension in EXTENSIONES_BASE64.items():
+        if valor.startswith(firma):
+            return extension
+    return ".bin"
+
+
+def nombre_salida(imagen_path, prefijo="workflow"):
+    """
+    Prefijo de los archivos externalizados de una imagen: su nombre más un hash corto de su ruta
+    completa, así dos imágenes con el mismo nombre en carpetas distintas (modo por lotes con
+    patrones recursivos) no se sobrescriben entre sí
+
+    Returns:
+        str: Por ejemplo "workflow_bottle2_3f9a1c2e"
+    """
+    ruta = Path(imagen_path)
+    huella = hashlib.sha1(str(ruta.resolve()).encode('utf-8')).hexdigest()[:8]
+    return f"{prefijo}_{ruta.stem}_{huella}"
+
+
+def sin_imagenes(resultado):
+    """
+    Copia del resultado sin los campos de imagen en base64, para guardarla en la caché:
+    así la entrada no depende del modo de output_image de quien la guardó
+
+    Returns:
+        Lista nueva con copias superficiales de cada salida (el resultado original no se modifica)
+    """
+    if not isinstance(resultado, list):
+        return resultado
+    return [
+        {campo: valor for campo, valor in salida.items() if campo not in CAMPOS_IMAGEN}
+        if isinstance(salida, dict) else salida
+        for salida in resultado
+    ]
+
+
+def procesar_imagenes_salida(resultado, modo, nombre_base="workflow", carpeta=CARPETA_IMAGENES):
+    """
+    Descarta o externaliza las imágenes en base64 de un resultado del workflow
+
+    Args:
+        resultado: Resultado del workflow (lista de salidas, se modifica en el lugar)
+        modo: "descartar", "externalizar" o "conservar"
+        nombre_base: Prefijo de los archivos externalizados (ver nombre_salida)
+        carpeta: Carpeta de los archivos externalizados
+
+    Returns:
+        El mismo resultado, sin las imágenes en base64
+
+    Raises:
+        ValueError: Si el modo no es válido
+    """
+    if modo not in MODOS_OUTPUT_IMAGE:
+        raise ValueError(f"Modo de output_image inválido: {modo} (usar {', '.join(MODOS_OUTPUT_IMAGE)})")
+
+    if modo == "conservar" or not isinstance(resultado, list):
+        return resultado
+
+    for indice, salida in enumerate(resultado):
+        if not isinstance(salida, dict):
+            continue
+
+        for campo in CAMPOS_IMAGEN:
+            valor = _valor_base64(salida.get(campo))
+            if valor is None:
+                continue
+
+            if modo == "descartar":
+                del salida[campo]
+                continue
+
+            sufijo = f"_{indice}" if len(resultado) > 1 else ""
+            ruta = Path(carpeta) / f"{nombre_base}_{campo}{sufijo}{_extension(valor)}"
+            os.makedirs(ruta.parent, exist_ok=True)
+            with open(ruta, 'wb') as f:
+                f.write(base64.b64decode(valor))
+
+            salida[campo] = {"tipo": "archivo", "ruta": str(ruta), "bytes": ruta.stat().st_size}
+
+    return resultado
@@ -0,0 +1,232 @@
+"""
+Postprocesamiento de las predicciones del workflow
+
+Filtra por confianza y área, clasifica y cuenta las predicciones en un solo recorrido.
+La categoría de cada clase se resuelve con un diccionario precompilado más coincidencias
+parciales memorizadas (cada nombre de clase distinto se resuelve una sola vez).
+Con las cantidades de predicciones del workflow (decenas, a lo sumo miles) este recorrido
+es más rápido que convertirlas a arreglos de NumPy, así que NumPy se usa solo para el NMS.
+
+Opcionalmente, después de los filtros aplica supresión de no máximos (NMS) vectorizada
+para descartar cajas duplicadas que se superponen, por clase o sin distinguir clases.
+
+La usan deteccion_workflow.py y EcoDetectInt/app.py.
+"""
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+
+# Campos de cada predicción en el arreglo estructurado (clase: código de la clase en la imagen)
+DTYPE_PREDICCION = np.dtype([
+    ('x', 'f8'),
+    ('y', 'f8'),
+    ('width', 'f8'),
+    ('height', 'f8'),
+    ('confidence', 'f8'),
+    ('clase', 'i4')
+])
+
+# Modos de NMS: solo entre cajas de la misma clase del modelo, o entre todas
+MODOS_NMS = ("por_clase", "agnostico")
+
+
+def normalizar_clase(clase):
+    """Nombre de clase normalizado para buscarlo en el mapeo ('Plastic Bottle' -> 'plastic_bottle')"""
+    return (clase or '').lower().replace(' ', '_')
+
+
+@lru_cache(maxsize=4096)
+def resolver_clase(clase, mapeo):
+    """
+    Categoría de una clase: coincidencia exacta primero y luego parcial (en el orden del mapeo)
+
+    Args:
+        clase: Nombre de clase normalizado
+        mapeo: Tupla de pares (clave, categoría); tupla para poder memorizar el resultado
+
+    Returns:
+        str: Categoría o None si no coincide
+    """
+    exactas = _mapeo_exacto(mapeo)
+    if clase in exactas:
+        return exactas[clase]
+
+    for clave, categoria in mapeo:
+        if clave in clase or clase in clave:
+            return categoria
+
+    return None
+
+
+@lru_cache(maxsize=32)
+def _mapeo_exacto(mapeo):
+    """Diccionario de coincidencias exactas (se arma una vez por mapeo)"""
+    return dict(mapeo)
+
+
+class ResultadoPostproceso:
+    """Predicciones filtradas, su categoría, el conteo por tipo y las estadísticas de descarte"""
+
+    def __init__(self, predicciones, categorias, conteo, estadisticas):
+        """
+        Args:
+            predicciones: Predicciones que pasan los filtros (los mismos diccionarios recibidos)
+            categorias: Categoría de cada predicción filtrada (None si no coincide)
+            conteo: Conteo por categoría de las predicciones filtradas
+            estadisticas: total, baja_confianza, area_pequena, suprimidas_nms y validas
+        """
+        self.predicciones = predicciones
+        self.categorias = categorias
+        self.conteo = conteo
+        self.estadisticas = estadisticas
+
+
+def _columna(predicciones, clave):
+    """Columna numérica de las predicciones (0 donde falta la clave)"""
+    try:
+        return np.fromiter(map(itemgetter(clave), predicciones), dtype=np.float64, count=len(predicciones))
+    except KeyError:
+        return np.fromiter((pred.get(clave, 0) for pred in predicciones), dtype=np.float64, count=len(predicciones))
+
+
+def a_arreglo(predicciones):
+    """
+    Convierte las predicciones a un arreglo estructurado (columna por columna)
+
+    Returns:
+        tuple: (arreglo con DTYPE_PREDICCION, lista de nombres de clase normalizados por código)
+    """
+    arreglo = np.empty(len(predicciones), dtype=DTYPE_PREDICCION)
+    for campo in ('x', 'y', 'width', 'height', 'confidence'):
+        arreglo[campo] = _columna(predicciones, campo)
+
+    # Código por nombre de clase crudo; cada nombre distinto se normaliza una sola vez
+    codigos = {}
+    arreglo['clase'] = np.fromiter(
+        (codigos.setdefault(pred.get('class', ''), len(codigos)) for pred in predicciones),
+        dtype=np.int32, count=len(predicciones)
+    )
+    return arreglo, [normalizar_clase(clase) for clase in codigos]
+
+
+def nms(arreglo, iou_umbral, por_clase=True):
+    """
+    Supresión de no máximos vectorizada sobre un arreglo de predicciones
+
+    Recorre las cajas de mayor a menor confianza; cada caja conservada descarta de una vez
+    (con operaciones sobre arreglos) todas las restantes cuyo IoU con ella supera el umbral.
+
+    Args:
+        arreglo: Arreglo estructurado (DTYPE_PREDICCION); x, y son el centro de la caja
+        iou_umbral: IoU a partir del cual dos cajas se consideran la misma detección
+        por_clase: Solo suprimir entre cajas de la misma clase del modelo
+
+    Returns:
+        np.ndarray: Índices de las cajas conservadas, en orden ascendente
+    """
+    if len(arreglo) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    x1 = arreglo['x'] - arreglo['width'] / 2
+    y1 = arreglo['y'] - arreglo['height'] / 2
+    x2 = x1 + arreglo['width']
+    y2 = y1 + arreglo['height']
+    areas = arreglo['width'] * arreglo['height']
+
+    if por_clase:
+        # Desplazar cada clase a su propia franja horizontal: cajas de clases distintas nunca se superponen
+        desplazamiento = arreglo['clase'] * (x2.max() - x1.min() + 1)
+        x1 = x1 + desplazamiento
+        x2 = x2 + desplazamiento
+
+    orden = np.argsort(-arreglo['confidence'], kind='stable')
+    conservadas = []
+    while orden.size:
+        i = orden[0]
+        conservadas.append(i)
+        resto = orden[1:]
+
+        ancho = np.clip(np.minimum(x2[i], x2[resto]) - np.maximum(x1[i], x1[resto]), 0, None)
+        alto = np.clip(np.minimum(y2[i], y2[resto]) - np.maximum(y1[i], y1[resto]), 0, None)
+        interseccion = ancho * alto
+        union = np.maximum(areas[i] + areas[resto] - interseccion, np.finfo(np.float64).tiny)
+
+        orden = resto[interseccion / union <= iou_umbral]
+
+    return np.sort(np.array(conservadas, dtype=np.intp))
+
+
+def postprocesar(predicciones, mapeo, confianza_min=0.0, area_min=0.0, categorias=None,
+                 iou_nms=None, modo_nms="por_clase"):
+    """
+    Filtra, clasifica y cuenta las predicciones en un solo recorrido
+
+    Args:
+        predicciones: Lista de predicciones del workflow
+        mapeo: Diccionario clase -> categoría (ej. MAPEO_CLASES)
+        confianza_min: Confianza mínima
+        area_min: Área mínima (ancho × alto)
+        categorias: Categorías del conteo, en orden (por defecto las del mapeo)
+        iou_nms: Umbral de IoU de la supresión de no máximos (None para no aplicarla)
+        modo_nms: "por_clase" o "agnostico"
+
+    Returns:
+        ResultadoPostproceso
+
+    Raises:
+        ValueError: Si el modo de NMS no es válido
+    """
+    if modo_nms not in MODOS_NMS:
+        raise ValueError(f"Modo de NMS inválido: {modo_nms} (usar {', '.join(MODOS_NMS)})")
+
+    mapeo = tuple(mapeo.items())
+    if categorias is None:
+        categorias = tuple(dict.fromkeys(categoria for _, categoria in mapeo))
+
+    baja_confianza = 0
+    area_pequena = 0
+    filtradas = []
+    for pred in predicciones:
+        if pred.get('confidence', 0) < confianza_min:
+            baja_confianza += 1
+        elif pred.get('width', 0) * pred.get('height', 0) < area_min:
+            area_pequena += 1
+        else:
+            filtradas.append(pred)
+
+    suprimidas = 0
+    if iou_nms is not None and filtradas:
+        # Cajas duplicadas: se conserva la de mayor confianza de cada grupo superpuesto
+        conservadas = nms(a_arreglo(filtradas)[0], iou_nms, por_clase=modo_nms == "por_clase")
+        suprimidas = len(filtradas) - len(conservadas)
+        filtradas = [filtradas[i] for i in conservadas.tolist()]
+
+    # Categoría por nombre de clase crudo: cada nombre distinto se resuelve una sola vez
+    conteo = dict.fromkeys(categorias, 0)
+    por_clase_cruda = {}
+    categorias_filtradas = []
+    for pred in filtradas:
+        clase = pred.get('class', '')
+        if clase in por_clase_cruda:
+            categoria = por_clase_cruda[clase]
+        else:
+            categoria = resolver_clase(normalizar_clase(clase), mapeo)
+            categoria = por_clase_cruda[clase] = categoria if categoria in conteo else None
+        if categoria is not None:
+            conteo[categoria] += 1
+        categorias_filtradas.append(categoria)
+
+    return ResultadoPostproceso(
+        predicciones=filtradas,
+        categorias=categorias_filtradas,
+        conteo=conteo,
+        estadisticas={
+            "total": len(predicciones),
+            "baja_confianza": baja_confianza,
+            "area_pequena": area_pequena,
+            "suprimidas_nms": suprimidas,
+            "validas": len(filtradas)
+        }
+    )
+
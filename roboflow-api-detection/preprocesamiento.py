@@ -0,0 +1,139 @@
+"""
+Preprocesamiento de imágenes antes de enviarlas a Roboflow
+
+Las fotos de celular se suben a resolución completa aunque el detector trabaja con
+entradas mucho más chicas, y la subida domina la latencia. Aquí cada imagen se
+decodifica en modo draft (el decodificador JPEG reduce la escala al leer), se corrige
+la orientación EXIF, se reduce al lado máximo configurado y se recodifica como JPEG.
+Las cajas que devuelve el workflow se vuelven a llevar al espacio de la imagen
+original, así AREA_MIN y el dibujo de detecciones siguen siendo correctos.
+
+La usan deteccion_workflow.py y EcoDetectInt/app.py.
+"""
+import base64
+import io
+
+from PIL import Image, ImageOps
+
+# Lado mayor (en píxeles) de la imagen enviada a Roboflow (0 para enviar la original)
+LADO_MAX = 1280
+
+# Calidad de la recodificación JPEG (1-95)
+CALIDAD_JPEG = 85
+
+# Orientaciones EXIF que intercambian ancho y alto (rotaciones de 90° y 270°)
+ORIENTACIONES_ROTADAS = {5, 6, 7, 8}
+
+# Claves con coordenadas horizontales y verticales en las predicciones
+CLAVES_X = ('x', 'width')
+CLAVES_Y = ('y', 'height')
+
+
+class ImagenPreprocesada:
+    """Imagen lista para enviar y la escala para volver al espacio original"""
+
+    def __init__(self, contenido, tamano_original, tamano_enviado):
+        """
+        Args:
+            contenido: Bytes de la imagen a enviar
+            tamano_original: (ancho, alto) de la imagen original ya orientada
+            tamano_enviado: (ancho, alto) de la imagen enviada
+        """
+        self.contenido = contenido
+        self.tamano_original = tamano_original
+        self.tamano_enviado = tamano_enviado
+        self.escala_x = tamano_original[0] / tamano_enviado[0]
+        self.escala_y = tamano_original[1] / tamano_enviado[1]
+
+    @property
+    def base64(self):
+        """Contenido en base64 (formato aceptado por run_workflow)"""
+        return base64.b64encode(self.contenido).decode('ascii')
+
+
+def preprocesar_imagen(imagen_path, lado_max=LADO_MAX, calidad=CALIDAD_JPEG):
+    """
+    Reduce y recodifica una imagen para enviarla al workflow
+
+    Args:
+        imagen_path: Ruta de la imagen
+        lado_max: Lado mayor de la imagen enviada (0 para no reducir)
+        calidad: Calidad JPEG de la recodificación
+
+    Returns:
+        ImagenPreprocesada: Bytes a enviar y escala al espacio original
+    """
+    with open(imagen_path, 'rb') as f:
+        original = f.read()
+
+    img = Image.open(io.BytesIO(original))
+    ancho, alto = img.size
+    orientacion = img.getexif().get(0x0112, 1)
+    tamano_original = (alto, ancho) if orientacion in ORIENTACIONES_ROTADAS else (ancho, alto)
+
+    if not lado_max or max(ancho, alto) <= lado_max:
+        if img.format == 'JPEG' and orientacion == 1:
+            # Ya es chica y no necesita rotarse: se envía tal cual (sin pérdida extra)
+            return ImagenPreprocesada(original, tamano_original, tamano_original)
+        lado_max = max(ancho, alto)
+
+    # Modo draft: el decodificador JPEG reduce por 1/2, 1/4 o 1/8 mientras lee (no decodifica todo)
+    img.draft('RGB', (lado_max, lado_max))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.thumbnail((lado_max, lado_max), Image.LANCZOS)
+
+    salida = io.BytesIO()
+    img.save(salida, format='JPEG', quality=calidad)
+    return ImagenPreprocesada(salida.getvalue(), tamano_original, img.size)
+
+
+def escalar_resultado(resultado, preprocesada):
+    """
+    Lleva las coordenadas del resultado del workflow al espacio de la imagen original
+
+    Recorre el resultado y escala x, y, width, height (y los puntos de los polígonos)
+    de cada predicción, y el tamaño de imagen informado por el workflow.
+
+    Args:
+        resultado: Resultado del workflow (se modifica en el lugar)
+        preprocesada: ImagenPreprocesada que se envió
+
+    Returns:
+        El mismo resultado, ya escalado
+    """
+    if preprocesada.escala_x == 1 and preprocesada.escala_y == 1:
+        return resultado
+
+    def escalar(nodo):
+        if isinstance(nodo, list):
+            for elemento in nodo:
+                escalar(elemento)
+        elif isinstance(nodo, dict):
+            for clave, valor in nodo.items():
+                if clave == 'predictions' and isinstance(valor, list):
+                    for pred in valor:
+                        if isinstance(pred, dict):
+                            escalar_prediccion(pred, preprocesada.escala_x, preprocesada.escala_y)
+                elif clave == 'image' and isinstance(valor, dict) and 'width' in valor and 'height' in valor:
+                    valor['width'], valor['height'] = preprocesada.tamano_original
+                else:
+                    escalar(valor)
+
+    escalar(resultado)
+    return resultado
+
+
+def escalar_prediccion(pred, escala_x, escala_y):
+    """Escala las coordenadas de una predicción (caja y puntos)"""
+    for clave in CLAVES_X:
+        if isinstance(pred.get(clave), (int, float)):
+            pred[clave] = pred[clave] * escala_x
+    for clave in CLAVES_Y:
+        if isinstance(pred.get(clave), (int, float)):
+            pred[clave] = pred[clave] * escala_y
+    for punto in pred.get('points') or []:
+        if isinstance(punto, dict):
+            punto['x'] = punto.get('x', 0) * escala_x
+            punto['y'] = punto.get('y', 0) * escala_y
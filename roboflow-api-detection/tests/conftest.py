@@ -0,0 +1,10 @@
+"""
+conftest.py
+Configuración compartida por las pruebas de los módulos de detección.
+Los módulos están en el directorio padre (se importan como en deteccion_workflow.py).
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
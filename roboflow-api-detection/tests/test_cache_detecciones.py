@@ -0,0 +1,136 @@
+"""
+test_cache_detecciones.py
+Pruebas de la caché en disco de resultados del workflow (TTL, LRU y entradas
+compartidas entre la CLI y la interfaz web).
+"""
+
+import base64
+import io
+import json
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from cache_detecciones import CacheDetecciones, clave_deteccion
+from imagenes_workflow import sin_imagenes
+
+RESULTADO = [{"predictions": {"predictions": [{"x": 10, "y": 20, "width": 5, "height": 6, "class": "lata"}]}}]
+
+
+def test_clave_igual_para_ruta_y_bytes(tmp_path):
+    imagen = tmp_path / "foto.jpg"
+    imagen.write_bytes(b"contenido de la imagen")
+
+    assert clave_deteccion(imagen, "wf", a=1, b=2) == clave_deteccion(b"contenido de la imagen", "wf", b=2, a=1)
+    assert clave_deteccion(imagen, "wf", a=1) != clave_deteccion(imagen, "wf", a=2)
+    assert clave_deteccion(imagen, "wf", a=1) != clave_deteccion(imagen, "otro", a=1)
+
+
+def test_guardar_y_obtener(tmp_path):
+    cache = CacheDetecciones(tmp_path)
+
+    assert cache.obtener("ab" * 32) is None
+    cache.guardar("ab" * 32, RESULTADO)
+
+    assert cache.obtener("ab" * 32) == RESULTADO
+    assert (cache.aciertos, cache.fallos) == (1, 1)
+
+
+def test_entrada_vencida_se_elimina(tmp_path):
+    cache = CacheDetecciones(tmp_path, ttl=60)
+    cache.guardar("cd" * 32, RESULTADO)
+    ruta = cache._ruta("cd" * 32)
+    entrada = json.loads(ruta.read_text(encoding="utf-8"))
+    entrada["creado"] = time.time() - 61
+    ruta.write_text(json.dumps(entrada), encoding="utf-8")
+
+    assert cache.obtener("cd" * 32) is None
+    assert not ruta.exists()
+
+
+@pytest.mark.parametrize("contenido", ["{no es json", "[]", '{"creado": 1}'])
+def test_entrada_corrupta_es_un_fallo(tmp_path, contenido):
+    cache = CacheDetecciones(tmp_path)
+    ruta = cache._ruta("ef" * 32)
+    ruta.parent.mkdir(parents=True)
+    ruta.write_text(contenido, encoding="utf-8")
+
+    assert cache.obtener("ef" * 32) is None
+    assert cache.fallos == 1
+
+
+def test_recorte_elimina_las_menos_usadas(tmp_path):
+    cache = CacheDetecciones(tmp_path, tamano_max=10 ** 6)
+    claves = [f"{i:02x}" * 32 for i in range(5)]
+    for i, clave in enumerate(claves):
+        cache.guardar(clave, RESULTADO)
+        os.utime(cache._ruta(clave), (1000 + i, 1000 + i))
+    # La primera se vuelve a usar: pasa a ser la más reciente
+    cache.obtener(claves[0])
+    tamano_entrada = cache._ruta(claves[0]).stat().st_size
+
+    cache.tamano_max = tamano_entrada * 4
+    cache.guardar("ff" * 32, RESULTADO)
+
+    # Seis entradas con lugar para cuatro: se recorta hasta el 90 % y quedan las tres más recientes
+    presentes = [clave for clave in claves if cache._ruta(clave).exists()]
+    assert presentes == [claves[0], claves[4]]
+    assert cache._ruta("ff" * 32).exists()
+    assert cache._tamano == cache._tamano_carpeta() <= cache.tamano_max
+
+
+def test_reemplazar_una_entrada_no_duplica_su_tamano(tmp_path):
+    cache = CacheDetecciones(tmp_path)
+    for _ in range(3):
+        cache.guardar("aa" * 32, RESULTADO)
+
+    assert cache._tamano == cache._tamano_carpeta()
+
+
+def test_sin_imagenes_no_modifica_el_resultado():
+    resultado = [{"output_image": "base64...", "predictions": {"predictions": []}}, "otro"]
+
+    copia = sin_imagenes(resultado)
+
+    assert copia == [{"predictions": {"predictions": []}}, "otro"]
+    assert "output_image" in resultado[0]
+
+
+class ClienteFalso:
+    """Cliente de Roboflow que cuenta las llamadas y devuelve una output_image en base64"""
+
+    def __init__(self, imagen_base64):
+        self.imagen_base64 = imagen_base64
+        self.llamadas = 0
+
+    def run_workflow(self, **_):
+        self.llamadas += 1
+        return [{"output_image": self.imagen_base64, "predictions": {"predictions": list(RESULTADO[0]["predictions"]["predictions"])}}]
+
+
+def test_cache_compartida_entre_modos_de_output_image(tmp_path, monkeypatch):
+    pytest.importorskip("inference_sdk")
+    import deteccion_workflow
+
+    salida = io.BytesIO()
+    Image.new("RGB", (40, 30), "white").save(salida, format="JPEG")
+    imagen = tmp_path / "foto.jpg"
+    imagen.write_bytes(salida.getvalue())
+    cliente = ClienteFalso(base64.b64encode(salida.getvalue()).decode("ascii"))
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(deteccion_workflow, "cache_detecciones", CacheDetecciones(tmp_path / "cache"))
+    monkeypatch.setattr(deteccion_workflow, "MODO_OUTPUT_IMAGE", "externalizar")
+    externalizado = deteccion_workflow.detectar_objetos_workflow(cliente, str(imagen), detallado=False)
+
+    monkeypatch.setattr(deteccion_workflow, "MODO_OUTPUT_IMAGE", "descartar")
+    descartado = deteccion_workflow.detectar_objetos_workflow(cliente, str(imagen), detallado=False)
+
+    assert cliente.llamadas == 1
+    assert externalizado[0]["output_image"]["tipo"] == "archivo"
+    assert os.path.exists(externalizado[0]["output_image"]["ruta"])
+    assert descartado == sin_imagenes(externalizado)
+    entrada = deteccion_workflow.cache_detecciones.obtener(deteccion_workflow.clave_cache(str(imagen)))
+    assert "output_image" not in entrada[0]
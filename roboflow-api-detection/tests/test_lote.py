@@ -0,0 +1,59 @@
+"""
+test_lote.py
+Pruebas del modo por lotes de deteccion_workflow.py (percentiles y resumen).
+"""
+
+import json
+
+import pytest
+
+pytest.importorskip("inference_sdk")
+import deteccion_workflow  # noqa: E402
+from deteccion_workflow import ResumenLote, percentil  # noqa: E402
+
+
+def test_percentil_por_rango_mas_cercano():
+    ordenados = list(range(1, 101))
+
+    assert percentil(ordenados, 50) == 50
+    assert percentil(ordenados, 95) == 95
+    assert percentil(ordenados, 99) == 99
+    assert percentil([3.0], 99) == 3.0
+
+
+def test_resumen_sin_imagenes_terminadas(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(deteccion_workflow, "EXPORTAR_COLUMNAR", False)
+    resumen = ResumenLote(tmp_path / "lote.jsonl", total=3)
+
+    resumen.cerrar()
+
+    salida = capsys.readouterr().out
+    assert "Imágenes: 0 de 3" in salida
+    assert "p50" not in salida
+
+
+def test_error_al_conectar_no_queda_oculto(tmp_path, monkeypatch):
+    monkeypatch.setattr(deteccion_workflow, "EXPORTAR_COLUMNAR", False)
+    (tmp_path / "foto.jpg").write_bytes(b"")
+
+    def conectar_cliente():
+        raise ConnectionError("sin red")
+
+    monkeypatch.setattr(deteccion_workflow, "conectar_cliente", conectar_cliente)
+
+    with pytest.raises(ConnectionError, match="sin red"):
+        deteccion_workflow.procesar_lote(str(tmp_path), str(tmp_path / "lote.jsonl"), con_impacto=False)
+
+
+def test_resumen_con_latencias(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(deteccion_workflow, "EXPORTAR_COLUMNAR", False)
+    resumen = ResumenLote(tmp_path / "lote.jsonl", total=2)
+    for latencia in (0.5, 1.5):
+        resumen.agregar({"imagen": "foto.jpg", "estado": "error", "latencia_s": latencia})
+
+    resumen.cerrar()
+
+    salida = capsys.readouterr().out
+    assert "p50: 0.50 s" in salida and "p99: 1.50 s" in salida
+    lineas = (tmp_path / "lote.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(linea)["latencia_s"] for linea in lineas] == [0.5, 1.5]
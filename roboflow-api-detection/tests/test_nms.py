@@ -0,0 +1,106 @@
+"""
+test_nms.py
+Pruebas de la supresión de no máximos vectorizada contra un NMS voraz en Python puro.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from postprocesamiento import a_arreglo, nms, postprocesar
+
+MAPEO = {'plastic': 'botellas_plastico', 'glass': 'botellas_vidrio', 'lata': 'latas_aluminio'}
+
+
+def cajas_aleatorias(cantidad, semilla=0):
+    generador = random.Random(semilla)
+    return [
+        {
+            'x': generador.uniform(0, 200),
+            'y': generador.uniform(0, 200),
+            'width': generador.uniform(10, 60),
+            'height': generador.uniform(10, 60),
+            'confidence': round(generador.random(), 2),
+            'class': generador.choice(list(MAPEO)),
+        }
+        for _ in range(cantidad)
+    ]
+
+
+def iou(a, b):
+    ancho = max(0.0, min(a['x'] + a['width'] / 2, b['x'] + b['width'] / 2)
+                - max(a['x'] - a['width'] / 2, b['x'] - b['width'] / 2))
+    alto = max(0.0, min(a['y'] + a['height'] / 2, b['y'] + b['height'] / 2)
+               - max(a['y'] - a['height'] / 2, b['y'] - b['height'] / 2))
+    interseccion = ancho * alto
+    return interseccion / (a['width'] * a['height'] + b['width'] * b['height'] - interseccion)
+
+
+def nms_referencia(predicciones, iou_umbral, por_clase=True):
+    orden = sorted(range(len(predicciones)), key=lambda i: -predicciones[i]['confidence'])
+    conservadas = []
+    for i in orden:
+        if all(
+            (por_clase and predicciones[i]['class'] != predicciones[j]['class'])
+            or iou(predicciones[i], predicciones[j]) <= iou_umbral
+            for j in conservadas
+        ):
+            conservadas.append(i)
+    return sorted(conservadas)
+
+
+@pytest.mark.parametrize("por_clase", [True, False])
+@pytest.mark.parametrize("iou_umbral", [0.1, 0.3, 0.5, 0.8])
+def test_coincide_con_la_referencia(por_clase, iou_umbral):
+    predicciones = cajas_aleatorias(300, semilla=int(iou_umbral * 10))
+
+    conservadas = nms(a_arreglo(predicciones)[0], iou_umbral, por_clase=por_clase)
+
+    assert conservadas.tolist() == nms_referencia(predicciones, iou_umbral, por_clase)
+
+
+def test_sin_cajas():
+    conservadas = nms(a_arreglo([])[0], 0.5)
+
+    assert conservadas.dtype == np.intp
+    assert conservadas.size == 0
+
+
+def test_empate_de_confianza_conserva_la_primera():
+    caja = {'x': 50, 'y': 50, 'width': 20, 'height': 20, 'confidence': 0.9, 'class': 'lata'}
+
+    assert nms(a_arreglo([dict(caja), dict(caja)])[0], 0.5).tolist() == [0]
+
+
+def test_clases_distintas_solo_se_suprimen_en_modo_agnostico():
+    predicciones = [
+        {'x': 50, 'y': 50, 'width': 20, 'height': 20, 'confidence': 0.9, 'class': 'lata'},
+        {'x': 51, 'y': 50, 'width': 20, 'height': 20, 'confidence': 0.8, 'class': 'glass'},
+    ]
+    arreglo = a_arreglo(predicciones)[0]
+
+    assert nms(arreglo, 0.5, por_clase=True).tolist() == [0, 1]
+    assert nms(arreglo, 0.5, por_clase=False).tolist() == [0]
+
+
+@pytest.mark.parametrize("modo_nms", ["por_clase", "agnostico"])
+def test_postprocesar_informa_las_suprimidas(modo_nms):
+    predicciones = cajas_aleatorias(200, semilla=7)
+    esperadas = nms_referencia(predicciones, 0.4, por_clase=modo_nms == "por_clase")
+
+    resultado = postprocesar(predicciones, MAPEO, iou_nms=0.4, modo_nms=modo_nms)
+
+    assert resultado.predicciones == [predicciones[i] for i in esperadas]
+    assert resultado.estadisticas["suprimidas_nms"] == len(predicciones) - len(esperadas)
+    assert resultado.estadisticas["validas"] == len(esperadas)
+    assert sum(resultado.conteo.values()) == len(esperadas)
+
+
+def test_postprocesar_sin_nms_no_suprime():
+    predicciones = cajas_aleatorias(50)
+
+    resultado = postprocesar(predicciones, MAPEO)
+
+    assert resultado.estadisticas["suprimidas_nms"] == 0
+    assert resultado.predicciones == predicciones
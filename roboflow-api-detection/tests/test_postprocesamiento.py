@@ -0,0 +1,125 @@
+"""
+test_postprocesamiento.py
+Pruebas del filtrado, la clasificación y el conteo de predicciones contra una versión
+de referencia en Python puro (un recorrido por filtro, como antes de postprocesar).
+"""
+
+import random
+
+import pytest
+
+from postprocesamiento import normalizar_clase, postprocesar, resolver_clase
+
+MAPEO = {
+    'botella_plastico': 'botellas_plastico',
+    'plastic': 'botellas_plastico',
+    'pet': 'botellas_plastico',
+    'botella_vidrio': 'botellas_vidrio',
+    'glass': 'botellas_vidrio',
+    'lata': 'latas_aluminio',
+    'can': 'latas_aluminio',
+}
+CATEGORIAS = ("botellas_plastico", "botellas_vidrio", "latas_aluminio")
+CLASES = ["Plastic Bottle", "PET", "glass", "Botella Vidrio", "lata", "Can", "carton", "", None]
+
+
+def predicciones_aleatorias(cantidad, semilla=0):
+    generador = random.Random(semilla)
+    predicciones = []
+    for _ in range(cantidad):
+        pred = {
+            'x': generador.uniform(0, 640),
+            'y': generador.uniform(0, 480),
+            'width': generador.uniform(1, 120),
+            'height': generador.uniform(1, 120),
+            'confidence': generador.random(),
+        }
+        clase = generador.choice(CLASES)
+        if clase is not None:
+            pred['class'] = clase
+        predicciones.append(pred)
+    return predicciones
+
+
+def categoria_referencia(clase):
+    clase = (clase or '').lower().replace(' ', '_')
+    if clase in MAPEO:
+        return MAPEO[clase]
+    for clave, categoria in MAPEO.items():
+        if clave in clase or clase in clave:
+            return categoria
+    return None
+
+
+def postprocesar_referencia(predicciones, confianza_min, area_min):
+    por_confianza = [p for p in predicciones if p.get('confidence', 0) >= confianza_min]
+    filtradas = [p for p in por_confianza if p.get('width', 0) * p.get('height', 0) >= area_min]
+    categorias = [categoria_referencia(p.get('class', '')) for p in filtradas]
+    conteo = {categoria: categorias.count(categoria) for categoria in CATEGORIAS}
+    estadisticas = {
+        "total": len(predicciones),
+        "baja_confianza": len(predicciones) - len(por_confianza),
+        "area_pequena": len(por_confianza) - len(filtradas),
+        "suprimidas_nms": 0,
+        "validas": len(filtradas),
+    }
+    return filtradas, categorias, conteo, estadisticas
+
+
+@pytest.mark.parametrize("confianza_min, area_min", [(0.0, 0.0), (0.5, 0.0), (0.0, 2500.0), (0.3, 1000.0)])
+def test_coincide_con_la_referencia(confianza_min, area_min):
+    predicciones = predicciones_aleatorias(500, semilla=int(confianza_min * 10 + area_min))
+
+    resultado = postprocesar(predicciones, MAPEO, confianza_min=confianza_min, area_min=area_min)
+    filtradas, categorias, conteo, estadisticas = postprocesar_referencia(predicciones, confianza_min, area_min)
+
+    assert resultado.predicciones == filtradas
+    assert all(a is b for a, b in zip(resultado.predicciones, filtradas))
+    assert resultado.categorias == categorias
+    assert resultado.conteo == conteo
+    assert resultado.estadisticas == estadisticas
+
+
+def test_sin_predicciones():
+    resultado = postprocesar([], MAPEO, confianza_min=0.5)
+
+    assert resultado.predicciones == []
+    assert resultado.conteo == dict.fromkeys(CATEGORIAS, 0)
+    assert resultado.estadisticas["total"] == resultado.estadisticas["validas"] == 0
+
+
+def test_claves_faltantes_cuentan_como_cero():
+    predicciones = [{'class': 'lata'}, {'class': 'lata', 'confidence': 0.9}]
+
+    resultado = postprocesar(predicciones, MAPEO, confianza_min=0.5)
+
+    assert resultado.estadisticas["baja_confianza"] == 1
+    assert resultado.conteo["latas_aluminio"] == 1
+
+
+def test_categorias_limitan_el_conteo():
+    predicciones = [{'class': 'lata', 'confidence': 1}, {'class': 'glass', 'confidence': 1}]
+
+    resultado = postprocesar(predicciones, MAPEO, categorias=("latas_aluminio",))
+
+    assert resultado.conteo == {"latas_aluminio": 1}
+    assert resultado.categorias == ["latas_aluminio", None]
+
+
+def test_modo_nms_invalido():
+    with pytest.raises(ValueError, match="Modo de NMS inválido"):
+        postprocesar([], MAPEO, iou_nms=0.5, modo_nms="global")
+
+
+@pytest.mark.parametrize("clase, esperada", [
+    ("pet", "botellas_plastico"),
+    ("Plastic Bottle", "botellas_plastico"),
+    ("Botella Vidrio", "botellas_vidrio"),
+    ("lata_grande", "latas_aluminio"),
+    ("Cans", "latas_aluminio"),
+    ("carton", None),
+    ("", "botellas_plastico"),
+    ("papel", None),
+])
+def test_resolver_clase(clase, esperada):
+    assert resolver_clase(normalizar_clase(clase), tuple(MAPEO.items())) == categoria_referencia(clase) == esperada
@@ -0,0 +1,90 @@
+"""
+test_preprocesamiento.py
+Pruebas de la reducción de imágenes antes de enviarlas y del reescalado de las cajas.
+"""
+
+import io
+
+from PIL import Image
+
+from preprocesamiento import ImagenPreprocesada, escalar_resultado, preprocesar_imagen
+
+
+def guardar_imagen(ruta, tamano, formato="JPEG", orientacion=None):
+    imagen = Image.new("RGB", tamano, "white")
+    exif = Image.Exif()
+    if orientacion is not None:
+        exif[0x0112] = orientacion
+    imagen.save(ruta, format=formato, exif=exif.tobytes())
+    return ruta
+
+
+def test_imagen_grande_se_reduce(tmp_path):
+    ruta = guardar_imagen(tmp_path / "grande.jpg", (4000, 3000))
+
+    preprocesada = preprocesar_imagen(ruta, lado_max=1280, calidad=85)
+
+    assert preprocesada.tamano_original == (4000, 3000)
+    assert preprocesada.tamano_enviado == (1280, 960)
+    assert Image.open(io.BytesIO(preprocesada.contenido)).size == (1280, 960)
+    assert preprocesada.escala_x == preprocesada.escala_y == 3.125
+
+
+def test_jpeg_chico_se_envia_sin_recodificar(tmp_path):
+    ruta = guardar_imagen(tmp_path / "chica.jpg", (640, 480))
+
+    preprocesada = preprocesar_imagen(ruta, lado_max=1280)
+
+    assert preprocesada.contenido == ruta.read_bytes()
+    assert preprocesada.escala_x == preprocesada.escala_y == 1
+
+
+def test_orientacion_exif_rotada(tmp_path):
+    ruta = guardar_imagen(tmp_path / "rotada.jpg", (2000, 1000), orientacion=6)
+
+    preprocesada = preprocesar_imagen(ruta, lado_max=1000)
+
+    assert preprocesada.tamano_original == (1000, 2000)
+    assert preprocesada.tamano_enviado == (500, 1000)
+
+
+def test_png_se_recodifica_como_jpeg(tmp_path):
+    ruta = guardar_imagen(tmp_path / "foto.png", (300, 200), formato="PNG")
+
+    preprocesada = preprocesar_imagen(ruta, lado_max=1280)
+
+    assert Image.open(io.BytesIO(preprocesada.contenido)).format == "JPEG"
+    assert preprocesada.tamano_enviado == (300, 200)
+
+
+def test_escalar_resultado_vuelve_al_espacio_original():
+    preprocesada = ImagenPreprocesada(b"", (4000, 3000), (1000, 750))
+    resultado = [{
+        "predictions": {
+            "image": {"width": 1000, "height": 750},
+            "predictions": [{
+                "x": 100, "y": 50, "width": 20, "height": 10, "confidence": 0.9, "class": "lata",
+                "points": [{"x": 1, "y": 2}]
+            }]
+        },
+        "count_objects": 1
+    }]
+
+    escalado = escalar_resultado(resultado, preprocesada)
+
+    assert escalado is resultado
+    pred = resultado[0]["predictions"]["predictions"][0]
+    assert (pred["x"], pred["y"], pred["width"], pred["height"]) == (400, 200, 80, 40)
+    assert pred["points"] == [{"x": 4, "y": 8}]
+    assert pred["confidence"] == 0.9
+    assert resultado[0]["predictions"]["image"] == {"width": 4000, "height": 3000}
+    assert resultado[0]["count_objects"] == 1
+
+
+def test_escalar_resultado_sin_cambio_de_tamano():
+    preprocesada = ImagenPreprocesada(b"", (640, 480), (640, 480))
+    resultado = [{"predictions": {"predictions": [{"x": 10, "y": 20, "width": 5, "height": 6}]}}]
+
+    assert escalar_resultado(resultado, preprocesada) == [
+        {"predictions": {"predictions": [{"x": 10, "y": 20, "width": 5, "height": 6}]}}
+    ]